@@ -5,19 +5,353 @@ import logging
 import time
 import json
 import re
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 import config
 from copy import deepcopy
+from keyword_matcher import NAME_KEYWORDS, COLOR_ATTRIBUTE_NAMES, normalize
+from storage import ProductCatalogIndex, NameLookupCache, CustomerIndex
+from utils import Pagination
+
+# Status HTTP que indicam falha temporária e podem ser repetidos
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def compute_backoff(attempt, retry_delay, max_backoff, headers=None):
+    """
+    Compute how long to wait before retrying a request.
+    
+    Args:
+        attempt (int): Zero-based attempt number that failed
+        retry_delay (float): Base delay of the exponential backoff
+        max_backoff (float): Maximum delay
+        headers (Mapping, optional): Headers of the failed response, if any
+        
+    Returns:
+        float: Retry-After when the server sent one, otherwise full-jitter exponential backoff
+    """
+    retry_after = headers.get('Retry-After') if headers is not None else None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(0.0, delay), max_backoff)
+    
+    # Backoff exponencial com "full jitter", limitado por HTTP_BACKOFF_MAX_SECONDS
+    return random.uniform(0, min(max_backoff, retry_delay * (2 ** attempt)))
+
+
+def is_retryable_status(status_code):
+    """
+    Check whether a failed HTTP status may succeed on retry.
+    
+    Args:
+        status_code (int): HTTP status code
+        
+    Returns:
+        bool: True for 408/425/429 and 5xx; 4xx validation/auth errors are never retried
+    """
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+
+class HostRateLimiter:
+    """
+    Token bucket shared by every client (and thread) talking to the same API host.
+    
+    Tokens refill at `rate` per second up to `burst`. A 429 or an exhausted
+    rate-limit header blocks the whole host until the server's reset time and
+    halves the rate; successful responses slowly restore it.
+    """
+    
+    def __init__(self, rate, burst=config.HTTP_RATE_LIMIT_BURST):
+        self.max_rate = max(0.1, rate)
+        self.rate = self.max_rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self):
+        """
+        Take a token if one is available.
+        
+        Returns:
+            float: 0 if a token was taken, otherwise seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            
+            return max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+    
+    def acquire(self):
+        """Block until a request may be sent to the host."""
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+    
+    def block_for(self, seconds):
+        """
+        Pause every request to the host and slow down the refill rate.
+        
+        Args:
+            seconds (float): Time to wait before the next request
+        """
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.rate = max(0.1, self.rate / 2)
+            self.tokens = 0.0
+    
+    def record_success(self):
+        """Gradually restore the refill rate after successful responses."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+    
+    def update_from_headers(self, headers):
+        """
+        Respect rate-limit headers (X-RateLimit-Remaining / X-RateLimit-Reset or RateLimit-*).
+        
+        Args:
+            headers (Mapping): Response headers
+        """
+        remaining = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+        reset = headers.get('X-RateLimit-Reset', headers.get('RateLimit-Reset'))
+        if remaining is None or reset is None:
+            return
+        
+        try:
+            remaining = int(float(remaining))
+            reset = float(reset)
+        except ValueError:
+            return
+        
+        if remaining <= 0:
+            # Reset pode vir como timestamp (epoch) ou como segundos restantes
+            delay = reset - time.time() if reset > 1e9 else reset
+            if delay > 0:
+                with self._lock:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls and serializes creates per key.
+    
+    Callers asking for the same key while a call is in flight wait for it and
+    share its result (or exception) instead of sending their own request.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._key_locks = {}
+    
+    def do(self, key, func):
+        """
+        Run func() once for all concurrent callers with the same key.
+        
+        Args:
+            key (hashable): Identity of the call (e.g. ('category', 'camisetas'))
+            func (callable): Call to execute
+            
+        Returns:
+            Result of the shared call
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._in_flight[key] = call
+        
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        
+        try:
+            call['result'] = func()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call['done'].set()
+    
+    @contextmanager
+    def lock(self, key):
+        """
+        Serialize creates for a key: callers using the same key run one at a time.
+        
+        The key's lock is dropped once nobody holds or waits on it, so keys seen
+        once (e.g. each customer of a run) do not accumulate.
+        
+        Args:
+            key (hashable): Identity of the entity being created
+        """
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                # [lock, chamadores que o detêm ou aguardam]
+                entry = self._key_locks[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
 
 class APIClient:
     """Base API client with common functionality."""
     
-    def __init__(self, base_url, retry_count=config.MAX_RETRIES, retry_delay=config.RETRY_DELAY_SECONDS):
+    # Semáforos, limitadores e single-flight compartilhados por host, entre todos os clientes e threads
+    _host_slots = {}
+    _rate_limiters = {}
+    _single_flights = {}
+    _host_slots_lock = threading.Lock()
+    
+    def __init__(self, base_url, retry_count=config.MAX_RETRIES, retry_delay=config.RETRY_DELAY_SECONDS,
+                 pool_size=config.HTTP_POOL_SIZE, connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+                 read_timeout=config.HTTP_READ_TIMEOUT, keep_alive=config.HTTP_KEEP_ALIVE,
+                 rate_limit=None, max_backoff=config.HTTP_BACKOFF_MAX_SECONDS):
         self.base_url = base_url
         self.retry_count = retry_count
         self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.timeout = (connect_timeout, read_timeout)
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.session = self._create_session(pool_size, keep_alive)
+        self.host_slot = self._get_host_slot(base_url, config.HTTP_MAX_CONCURRENCY_PER_HOST)
+        self.rate_limiter = self._get_rate_limiter(base_url, rate_limit) if rate_limit else None
+        self.single_flight = self._get_single_flight(base_url)
+    
+    @classmethod
+    def _get_single_flight(cls, base_url):
+        """
+        Get the single-flight group shared by every client of the host of base_url.
+        
+        Args:
+            base_url (str): API base URL
+            
+        Returns:
+            SingleFlight: Coalescing group for the host
+        """
+        host = urlparse(base_url).netloc
+        with cls._host_slots_lock:
+            if host not in cls._single_flights:
+                cls._single_flights[host] = SingleFlight()
+            return cls._single_flights[host]
+    
+    @classmethod
+    def _get_rate_limiter(cls, base_url, rate):
+        """
+        Get the token bucket that paces requests to the host of base_url.
+        
+        Args:
+            base_url (str): API base URL
+            rate (float): Requests per second allowed to the host
+            
+        Returns:
+            HostRateLimiter: Limiter shared by every client of the host
+        """
+        host = urlparse(base_url).netloc
+        with cls._host_slots_lock:
+            if host not in cls._rate_limiters:
+                cls._rate_limiters[host] = HostRateLimiter(rate)
+            return cls._rate_limiters[host]
+    
+    def _get_backoff(self, attempt, response=None):
+        """
+        Compute how long to wait before retrying a request.
+        
+        Args:
+            attempt (int): Zero-based attempt number that failed
+            response (requests.Response, optional): Failed response, if any
+            
+        Returns:
+            float: Seconds to wait
+        """
+        headers = response.headers if response is not None else None
+        return compute_backoff(attempt, self.retry_delay, self.max_backoff, headers)
+    
+    @classmethod
+    def _get_host_slot(cls, base_url, max_concurrency):
+        """
+        Get the semaphore that caps concurrent requests to the host of base_url.
+        
+        Args:
+            base_url (str): API base URL
+            max_concurrency (int): Maximum simultaneous requests to the host
+            
+        Returns:
+            threading.BoundedSemaphore: Semaphore shared by every client of the host
+        """
+        host = urlparse(base_url).netloc
+        with cls._host_slots_lock:
+            if host not in cls._host_slots:
+                cls._host_slots[host] = threading.BoundedSemaphore(max(1, max_concurrency))
+            return cls._host_slots[host]
+    
+    def _create_session(self, pool_size, keep_alive):
+        """
+        Create the pooled HTTP session reused by every request of this client.
+        
+        Args:
+            pool_size (int): Maximum number of connections kept open per host
+            keep_alive (bool): Whether connections are reused between requests
+            
+        Returns:
+            requests.Session: Configured session
+        """
+        session = requests.Session()
+        # As tentativas são tratadas em _make_request, o adaptador não deve repetir requisições
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        
+        return session
+    
+    def close(self):
+        """Close the pooled connections of this client."""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def _make_request(self, method, endpoint, params=None, data=None, headers=None):
         """
@@ -40,6 +374,7 @@ class APIClient:
         method = method.upper()
         
         for attempt in range(self.retry_count + 1):
+            response = None
             try:
                 self.logger.debug(f"Making {method} request to {url} (Attempt {attempt + 1}/{self.retry_count + 1})")
                 
@@ -47,27 +382,44 @@ class APIClient:
                 if data and method in ['POST', 'PUT']:
                     self.logger.debug(f"Request body: {json.dumps(data, indent=2)}")
                 
-                response = requests.request(
-                    method=method,
-                    url=url,
-                    params=params,
-                    json=data,
-                    headers=headers
-                )
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                
+                with self.host_slot:
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        json=data,
+                        headers=headers,
+                        timeout=self.timeout
+                    )
+                
+                if self.rate_limiter:
+                    self.rate_limiter.update_from_headers(response.headers)
                 
                 # Log de resposta para depuração em caso de erro
                 if not response.ok:
                     self.logger.error(f"Response error {response.status_code}: {response.text}")
                 
                 response.raise_for_status()
+                if self.rate_limiter:
+                    self.rate_limiter.record_success()
                 return response.json()
                 
             except RequestException as e:
                 self.logger.warning(f"Request failed: {str(e)}")
                 
+                # Erros 4xx (validação, autenticação, não encontrado) não mudam com novas tentativas
+                if response is not None and not is_retryable_status(response.status_code):
+                    raise
+                
                 if attempt < self.retry_count:
-                    sleep_time = self.retry_delay * (2 ** attempt)  # Exponential backoff
-                    self.logger.info(f"Retrying in {sleep_time} seconds...")
+                    sleep_time = self._get_backoff(attempt, response)
+                    if response is not None and response.status_code == 429 and self.rate_limiter:
+                        # Pausar todas as threads que usam este host, não só esta requisição
+                        self.rate_limiter.block_for(sleep_time)
+                    self.logger.info(f"Retrying in {sleep_time:.1f} seconds...")
                     time.sleep(sleep_time)
                 else:
                     self.logger.error(f"Request failed after {self.retry_count + 1} attempts")
@@ -77,11 +429,16 @@ class APIClient:
 class BagyClient(APIClient):
     """Client for interacting with Bagy API."""
     
-    def __init__(self, api_key):
-        super().__init__(config.BAGY_BASE_URL)
+    def __init__(self, api_key, product_index=None, color_cache=None, category_cache=None):
+        super().__init__(config.BAGY_BASE_URL, rate_limit=config.BAGY_RATE_LIMIT_PER_SECOND)
         self.api_key = api_key
-        # Dicionário para cache de cores para evitar requisições repetidas
-        self.color_cache = {}
+        # Caches persistentes nome -> ID de cores e categorias, para evitar requisições repetidas
+        self.color_cache = color_cache if color_cache is not None else NameLookupCache(config.COLOR_CACHE_FILE)
+        self.category_cache = category_cache if category_cache is not None else NameLookupCache(config.CATEGORY_CACHE_FILE)
+        # Índice local external_id/SKU -> produto, para evitar varrer o catálogo a cada busca
+        self.product_index = product_index if product_index is not None else ProductCatalogIndex()
+        # Número de variações criadas em paralelo em create_product
+        self.variation_workers = config.BAGY_VARIATION_WORKERS
         
     def _get_headers(self):
         """Get default headers for Bagy API."""
@@ -90,19 +447,78 @@ class BagyClient(APIClient):
             "Content-Type": "application/json"
         }
         
-    def get_colors(self):
+    def get_colors(self, page=1, limit=100):
         """
-        Lista todas as cores disponíveis na Bagy.
+        Lista as cores disponíveis na Bagy.
         
+        Args:
+            page (int): Página da listagem
+            limit (int): Número de cores por página
+            
         Returns:
             dict: Lista de cores disponíveis
         """
-        self.logger.info("Obtendo lista de cores cadastradas na Bagy")
+        self.logger.info(f"Obtendo lista de cores cadastradas na Bagy (página {page})")
         return self._make_request(
             method="GET",
             endpoint="/colors",
+            params={"page": page, "limit": limit},
             headers=self._get_headers()
         )
+    
+    def warm_color_cache(self, force=False):
+        """
+        Load every Bagy color into the color cache with one paginated crawl, unless it is still fresh.
+        
+        Args:
+            force (bool): Crawl even if the cache is within its TTL
+            
+        Returns:
+            bool: True if the cache is fresh after the call
+        """
+        if not force and self.color_cache.is_fresh():
+            return True
+        try:
+            # Workers simultâneos compartilham uma única varredura
+            self.single_flight.do(('warm', 'colors'), lambda: self.color_cache.warm(
+                Pagination().get_all_pages(self.get_colors, data_key='data')
+            ))
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao carregar cores da Bagy: {str(e)}")
+            return False
+    
+    def warm_category_cache(self, force=False):
+        """
+        Load every Bagy category into the category cache with one paginated crawl, unless it is still fresh.
+        
+        Args:
+            force (bool): Crawl even if the cache is within its TTL
+            
+        Returns:
+            bool: True if the cache is fresh after the call
+        """
+        if not force and self.category_cache.is_fresh():
+            return True
+        try:
+            # Workers simultâneos compartilham uma única varredura
+            self.single_flight.do(('warm', 'categories'), lambda: self.category_cache.warm(
+                Pagination().get_all_pages(self.get_categories, data_key='data')
+            ))
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao carregar categorias da Bagy: {str(e)}")
+            return False
+    
+    def warm_lookup_caches(self, force=False):
+        """
+        Warm the color and category caches at the start of a sync run.
+        
+        Args:
+            force (bool): Crawl even if the caches are within their TTL
+        """
+        self.warm_color_cache(force)
+        self.warm_category_cache(force)
 
     def create_color(self, color_data):
         """
@@ -114,30 +530,33 @@ class BagyClient(APIClient):
         Returns:
             dict: Dados da cor criada
         """
-        self.logger.info(f"Criando cor na Bagy: {color_data.get('name', 'Desconhecido')}")
-        
-        # Verificar se cor já existe com o mesmo nome
-        existing_colors = self.get_colors()
-        if existing_colors and 'data' in existing_colors:
-            for color in existing_colors['data']:
-                if color.get('name').lower() == color_data.get('name', '').lower():
-                    self.logger.info(f"Cor com nome {color_data.get('name')} já existe (ID: {color.get('id')})")
-                    return color
-        
-        # Cria uma nova cor se não existir
-        response = self._make_request(
-            method="POST",
-            endpoint="/colors",
-            data=color_data,
-            headers=self._get_headers()
-        )
-        
-        if response:
-            self.logger.info(f"Cor criada com sucesso: {response.get('name', 'Desconhecido')} (ID: {response.get('id')})")
-        else:
-            self.logger.error(f"Falha ao criar cor: {color_data.get('name', 'Desconhecido')}")
-        
-        return response
+        color_name = color_data.get('name', '')
+        self.logger.info(f"Criando cor na Bagy: {color_name or 'Desconhecido'}")
+        
+        # Criações da mesma cor são serializadas: quem chega depois encontra a cor no cache
+        with self.single_flight.lock(('color', color_name.lower())):
+            # Verificar no cache se cor já existe com o mesmo nome
+            self.warm_color_cache()
+            if color_name and color_name in self.color_cache:
+                self.logger.info(f"Cor com nome {color_name} já existe (ID: {self.color_cache[color_name]})")
+                return {'id': self.color_cache[color_name], 'name': color_name}
+            
+            # Cria uma nova cor se não existir
+            response = self._make_request(
+                method="POST",
+                endpoint="/colors",
+                data=color_data,
+                headers=self._get_headers()
+            )
+            
+            if response:
+                self.logger.info(f"Cor criada com sucesso: {response.get('name', 'Desconhecido')} (ID: {response.get('id')})")
+                if response.get('id') is not None:
+                    self.color_cache[color_name or response.get('name')] = response['id']
+            else:
+                self.logger.error(f"Falha ao criar cor: {color_name or 'Desconhecido'}")
+            
+            return response
 
     def ensure_color_exists(self, color_name, hex_color="#000000"):
         """
@@ -150,23 +569,11 @@ class BagyClient(APIClient):
         Returns:
             int: ID da cor na Bagy
         """
-        # Verificar cache primeiro
-        if color_name.lower() in self.color_cache:
-            self.logger.info(f"Cor {color_name} encontrada no cache (ID: {self.color_cache[color_name.lower()]})")
-            return self.color_cache[color_name.lower()]
-            
-        self.logger.info(f"Verificando se cor {color_name} existe na Bagy")
-        
-        # Verificar se cor já existe
-        existing_colors = self.get_colors()
-        if existing_colors and 'data' in existing_colors:
-            for color in existing_colors['data']:
-                if color.get('name').lower() == color_name.lower():
-                    color_id = color.get('id')
-                    self.logger.info(f"Cor {color_name} já existe (ID: {color_id})")
-                    # Adicionar ao cache
-                    self.color_cache[color_name.lower()] = color_id
-                    return color_id
+        # Verificar cache primeiro (recarregado da Bagy apenas se expirado)
+        self.warm_color_cache()
+        if color_name in self.color_cache:
+            self.logger.info(f"Cor {color_name} encontrada no cache (ID: {self.color_cache[color_name]})")
+            return self.color_cache[color_name]
         
         # Criar cor se não existir
         color_data = {
@@ -182,7 +589,7 @@ class BagyClient(APIClient):
         if response and 'id' in response:
             color_id = response['id']
             # Adicionar ao cache
-            self.color_cache[color_name.lower()] = color_id
+            self.color_cache[color_name] = color_id
             return color_id
         else:
             self.logger.error(f"Não foi possível garantir que a cor {color_name} exista")
@@ -226,22 +633,30 @@ class BagyClient(APIClient):
             headers=self._get_headers()
         )
     
-    def get_orders(self, page=1, limit=100):
+    def get_orders(self, page=1, limit=100, updated_since=None, status=None):
         """
         Get orders from Bagy.
         
         Args:
             page (int): Page number for pagination
             limit (int): Number of orders per page
+            updated_since (str, optional): Only orders changed after this 'YYYY-MM-DD HH:MM:SS' timestamp
+            status (str, optional): Only orders with this status
             
         Returns:
             dict: Orders data
         """
         self.logger.info(f"Fetching orders from Bagy (page {page}, limit {limit})")
+        params = {"page": page, "limit": limit}
+        if updated_since:
+            params[config.BAGY_ORDERS_UPDATED_SINCE_PARAM] = updated_since
+        if status:
+            params[config.BAGY_ORDERS_STATUS_PARAM] = status
+        
         return self._make_request(
             method="GET",
             endpoint="/orders",
-            params={"page": page, "limit": limit},
+            params=params,
             headers=self._get_headers()
         )
         
@@ -274,13 +689,41 @@ class BagyClient(APIClient):
         Returns:
             dict: Created category data
         """
-        self.logger.info(f"Creating new category in Bagy: {category_data.get('name', 'Unknown')}")
-        return self._make_request(
-            method="POST",
-            endpoint="/categories",
-            data=category_data,
-            headers=self._get_headers()
-        )
+        category_name = category_data.get('name', '')
+        self.logger.info(f"Creating new category in Bagy: {category_name or 'Unknown'}")
+        
+        # Creates of the same category are serialized; later callers get the cached one
+        with self.single_flight.lock(('category', category_name.lower())):
+            if category_name and category_name in self.category_cache:
+                return {'id': self.category_cache[category_name], 'name': category_name}
+            
+            response = self._make_request(
+                method="POST",
+                endpoint="/categories",
+                data=category_data,
+                headers=self._get_headers()
+            )
+            
+            if response and response.get('id') is not None:
+                self.category_cache[category_name or response.get('name')] = response['id']
+            
+            return response
+    
+    def find_category_id(self, name):
+        """
+        Get a category ID by name from the category cache.
+        
+        The cache is re-crawled only when expired, so every distinct name costs at
+        most one API call (the create) while the cache is fresh.
+        
+        Args:
+            name (str): Category name
+            
+        Returns:
+            int or None: Category ID if the category exists, None otherwise
+        """
+        self.warm_category_cache()
+        return self.category_cache.get(name)
         
     def get_category_by_name(self, name):
         """
@@ -294,17 +737,19 @@ class BagyClient(APIClient):
         """
         self.logger.debug(f"Searching for category with name: {name}")
         try:
-            response = self._make_request(
+            # Buscas simultâneas pelo mesmo nome compartilham uma única requisição
+            response = self.single_flight.do(('category_by_name', name.lower()), lambda: self._make_request(
                 method="GET",
                 endpoint="/categories",
                 params={"name": name},
                 headers=self._get_headers()
-            )
+            ))
             
             # Check if any category matches the exact name
             if response and 'data' in response and response['data']:
                 for category in response['data']:
                     if category.get('name', '').lower() == name.lower():
+                        self.category_cache[name] = category.get('id')
                         return category
             
             return None
@@ -329,19 +774,94 @@ class BagyClient(APIClient):
             headers=self._get_headers()
         )
         
-    def get_product_by_external_id(self, external_id):
+    def build_product_index(self, force=False):
+        """
+        Build the local product index from one paginated crawl of /products.
+        
+        The crawl is skipped when the persisted index is still fresh
+        (see config.PRODUCT_INDEX_MAX_AGE_MINUTES), unless force is set.
+        
+        Args:
+            force (bool): Rebuild even if the current index is fresh
+            
+        Returns:
+            bool: True if the index is usable, False if the crawl failed
+        """
+        if not force and self.product_index.is_built():
+            return True
+        
+        def crawl():
+            # Quem esperou por outra varredura encontra o índice já pronto
+            if not force and self.product_index.is_built():
+                return True
+            self.logger.info("📇 Construindo índice local de produtos da Bagy")
+            try:
+                # Varredura consumida pelo próprio rebuild, que acompanha as alterações feitas enquanto ela roda
+                self.product_index.rebuild(Pagination().iter_items(self.get_products, data_key='data'))
+                return True
+            except Exception as e:
+                self.logger.warning(f"Erro ao construir índice de produtos: {str(e)}")
+                return False
+        
+        # Workers do pipeline que encontram o índice vencido compartilham uma única varredura
+        return self.single_flight.do(('product_index',), crawl)
+    
+    def get_product_by_external_id(self, external_id, remote=False):
         """
         Get a product by external ID from Bagy.
         
+        Lookups are answered by the local product index; the catalog is crawled
+        once to build it, so a miss costs no HTTP requests.
+        
         Args:
             external_id (str): External product ID
+            remote (bool): Ask Bagy directly, e.g. for a write that may have completed
+                without reaching the index (interrupted run)
             
         Returns:
             dict or None: Product data if found, None otherwise
         """
         self.logger.info(f"Buscando produto com external_id: {external_id}")
         
-        # Primeiro tenta buscar pelo parâmetro external_id
+        if remote:
+            product = self._find_product_by_external_id_remote(external_id)
+            if product:
+                self.product_index.upsert(product)
+            return product
+        
+        if not self.build_product_index():
+            # Sem índice confiável, consultar diretamente a API para não criar duplicados
+            return self._find_product_by_external_id_remote(external_id)
+        
+        product = self.product_index.get_by_external_id(external_id)
+        if product:
+            self.logger.info(f"Produto encontrado com external_id={external_id} (ID: {product.get('id')})")
+        return product
+    
+    def get_product_by_sku(self, sku):
+        """
+        Get a product by SKU from the local product index.
+        
+        Args:
+            sku (str): Product SKU
+            
+        Returns:
+            dict or None: Product data if found, None otherwise
+        """
+        if not self.build_product_index():
+            return None
+        return self.product_index.get_by_sku(sku)
+    
+    def _find_product_by_external_id_remote(self, external_id):
+        """
+        Query Bagy directly for a product by external ID (used when the index is unavailable).
+        
+        Args:
+            external_id (str): External product ID
+            
+        Returns:
+            dict or None: Product data if found, None otherwise
+        """
         try:
             response = self._make_request(
                 method="GET",
@@ -350,56 +870,27 @@ class BagyClient(APIClient):
                 headers=self._get_headers()
             )
             
-            if response and isinstance(response, dict) and response.get('data') and len(response['data']) > 0:
-                self.logger.info(f"Produto encontrado com external_id={external_id} (ID: {response['data'][0].get('id')})")
-                return response['data'][0]  # Return the first matching product
-        except Exception as e:
-            self.logger.warning(f"Erro na busca por external_id: {str(e)}")
-        
-        # Se não encontrou, tenta uma abordagem mais exaustiva buscando em todas as páginas
-        self.logger.info(f"Fazendo busca exaustiva por produto com external_id: {external_id}")
-        try:
-            # Busca em todas as páginas até encontrar o produto
-            page = 1
-            limit = 100
-            max_pages = 10  # Limite para não processar infinitamente
-            
-            while page <= max_pages:
-                response = self._make_request(
-                    method="GET",
-                    endpoint="/products",
-                    params={"page": page, "limit": limit},
-                    headers=self._get_headers()
-                )
-                
-                if not response or not isinstance(response, dict) or not response.get('data'):
-                    break
-                    
-                # Procura em cada produto na página
+            if response and isinstance(response, dict) and response.get('data'):
                 for product in response['data']:
-                    if product.get('external_id') == external_id:
-                        self.logger.info(f"Produto encontrado na página {page} com external_id={external_id} (ID: {product.get('id')})")
+                    if str(product.get('external_id')) == str(external_id):
                         return product
-                
-                # Se não há mais páginas, sair do loop
-                if len(response['data']) < limit:
-                    break
-                    
-                page += 1
-                
-            self.logger.warning(f"Produto não encontrado com external_id: {external_id} após busca exaustiva")
-            return None
         except Exception as e:
-            self.logger.warning(f"Erro na busca exaustiva por external_id: {str(e)}")
-            return None
+            self.logger.warning(f"Erro na busca por external_id: {str(e)}")
+        
+        return None
     
 
-    def create_product(self, product_data):
+    def create_product(self, product_data, refetch=config.BAGY_REFETCH_AFTER_CREATE):
         """
         Create a new product in Bagy.
         
+        Variations are created concurrently (up to self.variation_workers at a time);
+        failed variations are reported under 'variation_errors' in the result.
+        
         Args:
             product_data (dict): Product data
+            refetch (bool): Fetch the complete product after creating the variations
+                instead of building it from the POST responses
             
         Returns:
             dict: Created product data
@@ -417,6 +908,80 @@ class BagyClient(APIClient):
                 self.logger.info(f"✅ Produto já existe com external_id={external_id} (ID: {existing_product.get('id')})")
                 return existing_product
         
+        data, original_variations, unique_suffix = self._prepare_product_payload(data)
+        has_variations = data['type'] == 'variant'
+        
+        # 6. CRIAR PRODUTO BASE
+        product_response = self._make_request(
+            method="POST",
+            endpoint="/products",
+            data=data,
+            headers=self._get_headers()
+        )
+        
+        if not product_response or 'id' not in product_response:
+            self.logger.error(f"❌ Falha ao criar produto base: {data.get('name')}. Resposta: {product_response}")
+            return None
+        
+        product_id = product_response['id']
+        self.logger.info(f"✅ Produto base criado com sucesso: {data.get('name')} (ID: {product_id})")
+        self.product_index.upsert(product_response)
+        
+        # Se não tem variações, retornar produto criado
+        if not has_variations or not original_variations:
+            return product_response
+        
+        # 7. PROCESSAR VARIAÇÕES
+        # 7.1. Montar o payload e o nome da cor de cada variação antes de qualquer POST
+        prepared_variations = self._prepare_variations(original_variations, data, product_id, external_id, unique_suffix)
+        
+        # 7.2. Resolver todas as cores distintas em uma única passada
+        color_ids = self._resolve_colors([color_name for _, _, color_name in prepared_variations])
+        pending_variations, variation_errors = self._assign_color_ids(prepared_variations, color_ids)
+        
+        # 7.3. Criar as variações em paralelo (limitado por variation_workers e pelo limite por host)
+        created_variations = {}
+        workers = max(1, min(self.variation_workers, len(pending_variations)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._create_variation, variation_number, variation_data): (variation_number, variation_data)
+                for variation_number, variation_data in pending_variations
+            }
+            for future in as_completed(futures):
+                variation_number, variation_data = futures[future]
+                variation_response, error = future.result()
+                if variation_response:
+                    created_variations[variation_number] = variation_response
+                else:
+                    variation_errors.append({
+                        'variation': variation_number,
+                        'external_id': variation_data.get('external_id'),
+                        'error': error
+                    })
+        
+        # 8. RESUMO DE CRIAÇÃO DAS VARIAÇÕES
+        self.logger.info(f"✨ Criadas {len(created_variations)} de {len(original_variations)} variações.")
+        
+        # 9. OBTER PRODUTO COMPLETO COM TODAS AS VARIAÇÕES
+        complete_product = None
+        if refetch:
+            complete_product = self.get_product_by_id(product_id)
+        
+        return self._finish_created_product(product_response, complete_product, created_variations, variation_errors)
+    
+    def _prepare_product_payload(self, data):
+        """
+        Normalize a product payload before the base product POST.
+        
+        Fills missing dimensions and codes, moves the variations out of the
+        payload and sets the product type.
+        
+        Args:
+            data (dict): Copy of the product data (modified in place)
+            
+        Returns:
+            tuple: (data, original_variations, unique_suffix)
+        """
         # 2. VERIFICAR E CORRIGIR DIMENSÕES
         for dimension in ['height', 'width', 'depth', 'weight']:
             if dimension not in data or not data[dimension]:
@@ -457,154 +1022,233 @@ class BagyClient(APIClient):
         # 5. DEFINIR TIPO DO PRODUTO
         data['type'] = 'variant' if has_variations else 'simple'
         
-        # 6. CRIAR PRODUTO BASE
-        product_response = self._make_request(
-            method="POST",
-            endpoint="/products",
-            data=data,
-            headers=self._get_headers()
-        )
-        
-        if not product_response or 'id' not in product_response:
-            self.logger.error(f"❌ Falha ao criar produto base: {data.get('name')}. Resposta: {product_response}")
-            return None
+        return data, original_variations, unique_suffix
+    
+    def _prepare_variations(self, original_variations, data, product_id, external_id, unique_suffix):
+        """
+        Build the payload and color name of every variation of a new product.
+
+        Args:
+            original_variations (list): Variations removed from the product payload
+            data (dict): Normalized base product data
+            product_id (int): Bagy ID of the base product
+            external_id (str): External ID of the base product
+            unique_suffix (str): Suffix used to generate missing codes
+
+        Returns:
+            list: (variation_number, variation_data, color_name) tuples
+        """
+        prepared_variations = []
+        for i, variation in enumerate(original_variations):
+            variation_number = i + 1
+            variation_data, color_name = self._build_variation_payload(
+                variation, variation_number, data, product_id, external_id, unique_suffix
+            )
+            prepared_variations.append((variation_number, variation_data, color_name))
+        return prepared_variations
+    
+    def _assign_color_ids(self, prepared_variations, color_ids):
+        """
+        Set the resolved color ID on each prepared variation.
         
-        product_id = product_response['id']
-        self.logger.info(f"✅ Produto base criado com sucesso: {data.get('name')} (ID: {product_id})")
+        Args:
+            prepared_variations (list): Output of _prepare_variations
+            color_ids (dict): Lowercase color name -> color ID
+            
+        Returns:
+            tuple: (pending_variations, variation_errors), where pending_variations are
+                (variation_number, variation_data) pairs ready to be POSTed
+        """
+        variation_errors = []
+        pending_variations = []
+        for variation_number, variation_data, color_name in prepared_variations:
+            color_id = color_ids.get(color_name.lower())
+            if not color_id:
+                self.logger.error(f"❌ Variação {variation_number} não pode ser criada sem ID de cor.")
+                variation_errors.append({
+                    'variation': variation_number,
+                    'external_id': variation_data.get('external_id'),
+                    'error': f"Cor '{color_name}' indisponível"
+                })
+                continue
+            variation_data['color_id'] = color_id
+            pending_variations.append((variation_number, variation_data))
+        return pending_variations, variation_errors
+    
+    def _finish_created_product(self, product_response, complete_product, created_variations, variation_errors):
+        """
+        Assemble the result of create_product and store it in the product index.
         
-        # Se não tem variações, retornar produto criado
-        if not has_variations or not original_variations:
-            return product_response
+        Args:
+            product_response (dict): Response of the base product POST
+            complete_product (dict or None): Refetched product, if any
+            created_variations (dict): Variation number -> variation POST response
+            variation_errors (list): Variations that could not be created
+            
+        Returns:
+            dict: Created product with its variations
+        """
+        if not complete_product:
+            # Montar o produto a partir das respostas dos POSTs, sem nova ida à API
+            complete_product = dict(product_response)
+            complete_product['variations'] = [created_variations[number] for number in sorted(created_variations)]
         
-        # 7. PROCESSAR VARIAÇÕES
-        successful_variations = 0
+        self.product_index.upsert(complete_product)
         
-        # Primeiro carregamos todas as cores existentes no sistema (otimização)
-        color_response = self.get_colors()
-        color_cache = {}
+        if variation_errors:
+            complete_product['variation_errors'] = sorted(variation_errors, key=lambda error: error['variation'])
         
-        if color_response and 'data' in color_response:
-            for color in color_response['data']:
-                color_cache[color['name'].lower()] = color['id']
-                
-            self.logger.info(f"🎨 Carregadas {len(color_cache)} cores do sistema")
-            # Atualizar cache da instância
-            self.color_cache = color_cache
+        return complete_product
+    
+    def _build_variation_payload(self, variation, variation_number, data, product_id, external_id, unique_suffix):
+        """
+        Build the /variations payload for one variation and pick the name of its color.
         
-        # Processar cada variação individualmente
-        for i, variation in enumerate(original_variations):
-            variation_number = i + 1
-            self.logger.info(f"🔄 Processando variação {variation_number}/{len(original_variations)}")
-            
-            # 7.1. Criar estrutura básica da variação
-            variation_data = {
-                "product_id": product_id,  # Associar ao produto principal
-                "active": True,            # Sempre ativar a variação
-            }
+        Args:
+            variation (dict): Variation data as received in product_data['variations']
+            variation_number (int): 1-based position of the variation
+            data (dict): Normalized base product data
+            product_id (int): Bagy ID of the base product
+            external_id (str): External ID of the base product
+            unique_suffix (str): Suffix used to generate missing codes
             
-            # 7.2. Copiar external_id da variação ou gerar
-            if 'external_id' in variation and variation['external_id']:
-                variation_data['external_id'] = str(variation['external_id'])
+        Returns:
+            tuple: (variation_data, color_name)
+        """
+        self.logger.info(f"🔄 Processando variação {variation_number}")
+        
+        # Criar estrutura básica da variação
+        variation_data = {
+            "product_id": product_id,  # Associar ao produto principal
+            "active": True,            # Sempre ativar a variação
+        }
+        
+        # Copiar external_id da variação ou gerar
+        if 'external_id' in variation and variation['external_id']:
+            variation_data['external_id'] = str(variation['external_id'])
+        else:
+            variation_data['external_id'] = f"{external_id}-var-{variation_number}" if external_id else f"var-{product_id}-{variation_number}"
+        
+        # Garantir SKU, REFERENCE e CODE para a variação
+        for code_field in ['sku', 'reference', 'code']:
+            if code_field in variation and variation[code_field]:
+                # Usar o valor original da variação, convertido para string
+                variation_data[code_field] = str(variation[code_field])
+            elif code_field in data:
+                # Usar o valor do produto principal com sufixo
+                variation_data[code_field] = f"{data[code_field]}-{variation_number}"
             else:
-                variation_data['external_id'] = f"{external_id}-var-{variation_number}" if external_id else f"var-{product_id}-{variation_number}"
-            
-            # 7.3. Garantir SKU, REFERENCE e CODE para a variação
-            for code_field in ['sku', 'reference', 'code']:
-                if code_field in variation and variation[code_field]:
-                    # Usar o valor original da variação, convertido para string
-                    variation_data[code_field] = str(variation[code_field])
-                elif code_field in data:
-                    # Usar o valor do produto principal com sufixo
-                    variation_data[code_field] = f"{data[code_field]}-{variation_number}"
-                else:
-                    # Criar um valor completamente novo
-                    variation_data[code_field] = f"var-{product_id}-{variation_number}-{unique_suffix}"
-            
-            # 7.4. Copiar preço e estoque
-            variation_data['price'] = variation.get('price', data.get('price', 0))
-            variation_data['price_compare'] = variation.get('price_compare', data.get('price_compare', 0))
-            variation_data['balance'] = variation.get('balance', 0)
-            
-            # 7.5. Obter cor para a variação (PARTE CRÍTICA)
-            color_name = None
-            
-            # ESTRATÉGIA 1: Tentar extrair do nome do produto se for um tipo conhecido
-            # Caso especial para Masturbador EGG e similares onde as variações são modelos
-            product_name = data.get('name', '').upper()
-            sku_code = variation_data.get('sku', '').upper()
-            
-            # Para produtos tipo EGG que usam nomes de variação como SPIDER, SILKY, etc.
-            if 'EGG' in product_name or 'MASTURBADOR' in product_name or sku_code.startswith('EGG'):
-                # Tentar extrair do nome da variação (caso esteja disponível)
-                if 'name' in variation:
-                    # Usar nome da variação como cor
-                    var_name = variation['name']
-                    if var_name and var_name.strip():
-                        color_name = var_name.strip()
-                        self.logger.info(f"🎨 Usando nome da variação '{color_name}' como cor")
-            
-            # ESTRATÉGIA 2: Tentar localizar atributo de cor explícito na variação
-            if not color_name and 'attributes' in variation:
-                for attr in variation['attributes']:
-                    if attr.get('name', '').lower() in ['cor', 'color', 'colour', 'variacao', 'variação', 'modelo', 'tipo']:
-                        color_name = attr.get('value')
-                        self.logger.info(f"🎨 Usando atributo '{attr.get('name')}' como cor: {color_name}")
-                        break
-            
-            # ESTRATÉGIA 3: Extrair modelo/tipo da variação pelo nome da SKU
-            # Ex: EGG0001 = SPIDER, EGG0002 = SILKY
-            if not color_name and variation.get('sku') and 'description' in variation:
-                # Tentar extrair da descrição (algumas APIs fornecem a variação na descrição)
-                desc = variation.get('description', '')
-                if desc and len(desc) > 3:
-                    # Buscar palavras-chave após o código
-                    words = desc.split()
-                    if len(words) > 1:
-                        # Usar a primeira palavra após o sku como "modelo"
-                        color_name = words[1].strip()
-                        self.logger.info(f"🎨 Extraindo cor da descrição: '{color_name}'")
-            
-            # ESTRATÉGIA 4: Se tiver um campo 'variant_name' ou similar
-            if not color_name:
-                for field in ['variant_name', 'variacao', 'variação', 'modelo', 'tipo', 'variant', 'option']:
-                    if field in variation and variation[field]:
-                        color_name = variation[field]
-                        self.logger.info(f"🎨 Usando campo '{field}' como cor: {color_name}")
-                        break
-            
-            # ESTRATÉGIA 5: Usar qualquer atributo disponível
-            if not color_name and 'attributes' in variation and variation['attributes']:
-                # Usar o primeiro atributo disponível
-                color_name = variation['attributes'][0].get('value')
-                self.logger.info(f"🎨 Usando primeiro atributo como cor: {color_name}")
-            
-            # ESTRATÉGIA 6: FALLBACK - Se mesmo assim não tiver cor, usar código SKU
-            if not color_name:
-                sku = variation_data.get('sku', '')
-                if sku:
-                    color_name = f"Modelo-{sku}"
-                    self.logger.info(f"🎨 Gerando nome de cor baseado no SKU: {color_name}")
-                else:
-                    # Último recurso - usar número da variação
-                    color_name = f"Modelo-{variation_number}"
-                    self.logger.info(f"🎨 Gerando nome de cor baseado no número da variação: {color_name}")
-            
-            # Garantir que o nome da cor é válido
-            if not color_name or len(color_name.strip()) == 0:
-                color_name = f"Modelo-{product_id}-{variation_number}"
-                self.logger.info(f"🎨 Usando nome padrão para cor: {color_name}")
-            
-            # 7.6. Obter ID da cor (criar se não existir)
-            color_id = None
-            color_name_lower = color_name.lower()
-            
-            # Verificar no cache primeiro
-            if color_name_lower in color_cache:
-                color_id = color_cache[color_name_lower]
-                self.logger.info(f"🎨 Cor encontrada no cache: '{color_name}' (ID: {color_id})")
+                # Criar um valor completamente novo
+                variation_data[code_field] = f"var-{product_id}-{variation_number}-{unique_suffix}"
+        
+        # Copiar preço e estoque
+        variation_data['price'] = variation.get('price', data.get('price', 0))
+        variation_data['price_compare'] = variation.get('price_compare', data.get('price_compare', 0))
+        variation_data['balance'] = variation.get('balance', 0)
+        
+        # Obter cor para a variação (PARTE CRÍTICA)
+        color_name = None
+        
+        # ESTRATÉGIA 1: Tentar extrair do nome do produto se for um tipo conhecido
+        # Caso especial para Masturbador EGG e similares onde as variações são modelos
+        sku_code = variation_data.get('sku', '').upper()
+        
+        # Para produtos tipo EGG que usam nomes de variação como SPIDER, SILKY, etc.
+        if NAME_KEYWORDS.find(data.get('name'), 'variation_as_color') or sku_code.startswith('EGG'):
+            # Tentar extrair do nome da variação (caso esteja disponível)
+            if 'name' in variation:
+                # Usar nome da variação como cor
+                var_name = variation['name']
+                if var_name and var_name.strip():
+                    color_name = var_name.strip()
+                    self.logger.info(f"🎨 Usando nome da variação '{color_name}' como cor")
+        
+        # ESTRATÉGIA 2: Tentar localizar atributo de cor explícito na variação
+        if not color_name and 'attributes' in variation:
+            for attr in variation['attributes']:
+                if normalize(attr.get('name')) in COLOR_ATTRIBUTE_NAMES:
+                    color_name = attr.get('value')
+                    self.logger.info(f"🎨 Usando atributo '{attr.get('name')}' como cor: {color_name}")
+                    break
+        
+        # ESTRATÉGIA 3: Extrair modelo/tipo da variação pelo nome da SKU
+        # Ex: EGG0001 = SPIDER, EGG0002 = SILKY
+        if not color_name and variation.get('sku') and 'description' in variation:
+            # Tentar extrair da descrição (algumas APIs fornecem a variação na descrição)
+            desc = variation.get('description', '')
+            if desc and len(desc) > 3:
+                # Buscar palavras-chave após o código
+                words = desc.split()
+                if len(words) > 1:
+                    # Usar a primeira palavra após o sku como "modelo"
+                    color_name = words[1].strip()
+                    self.logger.info(f"🎨 Extraindo cor da descrição: '{color_name}'")
+        
+        # ESTRATÉGIA 4: Se tiver um campo 'variant_name' ou similar
+        if not color_name:
+            for field in ['variant_name', 'variacao', 'variação', 'modelo', 'tipo', 'variant', 'option']:
+                if field in variation and variation[field]:
+                    color_name = variation[field]
+                    self.logger.info(f"🎨 Usando campo '{field}' como cor: {color_name}")
+                    break
+        
+        # ESTRATÉGIA 5: Usar qualquer atributo disponível
+        if not color_name and 'attributes' in variation and variation['attributes']:
+            # Usar o primeiro atributo disponível
+            color_name = variation['attributes'][0].get('value')
+            self.logger.info(f"🎨 Usando primeiro atributo como cor: {color_name}")
+        
+        # ESTRATÉGIA 6: FALLBACK - Se mesmo assim não tiver cor, usar código SKU
+        if not color_name:
+            sku = variation_data.get('sku', '')
+            if sku:
+                color_name = f"Modelo-{sku}"
+                self.logger.info(f"🎨 Gerando nome de cor baseado no SKU: {color_name}")
             else:
-                # Criar nova cor
-                try:
+                # Último recurso - usar número da variação
+                color_name = f"Modelo-{variation_number}"
+                self.logger.info(f"🎨 Gerando nome de cor baseado no número da variação: {color_name}")
+        
+        # Garantir que o nome da cor é válido
+        if not color_name or len(color_name.strip()) == 0:
+            color_name = f"Modelo-{product_id}-{variation_number}"
+            self.logger.info(f"🎨 Usando nome padrão para cor: {color_name}")
+        
+        return variation_data, color_name
+    
+    def _resolve_colors(self, color_names):
+        """
+        Resolve the Bagy color ID of every distinct color name, creating missing colors.
+        
+        Names are answered from the persistent color cache (re-crawled only when
+        expired); missing colors are created one at a time so the same color is
+        never created twice.
+        
+        Args:
+            color_names (list): Color names (duplicates allowed)
+            
+        Returns:
+            dict: Lowercase color name -> color ID (missing entries mean creation failed)
+        """
+        distinct_names = {}
+        for color_name in color_names:
+            distinct_names.setdefault(color_name.lower(), color_name)
+        
+        # Recarregar as cores da Bagy apenas se alguma não estiver no cache e ele tiver expirado
+        if any(name not in self.color_cache for name in distinct_names):
+            self.warm_color_cache()
+        
+        for color_name_lower, color_name in distinct_names.items():
+            if color_name_lower in self.color_cache:
+                self.logger.info(f"🎨 Cor encontrada no cache: '{color_name}' (ID: {self.color_cache[color_name_lower]})")
+                continue
+            
+            # Criar nova cor (serializado por nome: outro worker pode tê-la criado enquanto esperávamos)
+            try:
+                with self.single_flight.lock(('color', color_name_lower)):
+                    if color_name_lower in self.color_cache:
+                        continue
+                    
                     color_payload = {
                         "name": color_name,
                         "hexadecimal": "#000000",  # Preto por padrão
@@ -619,54 +1263,46 @@ class BagyClient(APIClient):
                     )
                     
                     if color_create_response and 'id' in color_create_response:
-                        color_id = color_create_response['id']
-                        color_cache[color_name_lower] = color_id  # Atualiza cache local
-                        self.color_cache[color_name_lower] = color_id  # Atualiza cache de instância
-                        self.logger.info(f"🎨 Nova cor criada: '{color_name}' (ID: {color_id})")
+                        self.color_cache[color_name_lower] = color_create_response['id']
+                        self.logger.info(f"🎨 Nova cor criada: '{color_name}' (ID: {color_create_response['id']})")
                     else:
                         self.logger.error(f"❌ Falha ao criar cor: {color_name}. Resposta: {color_create_response}")
-                except Exception as e:
-                    self.logger.error(f"❌ Erro ao criar cor '{color_name}': {str(e)}")
-            
-            # 7.7. Adicionar color_id à variação
-            if not color_id:
-                self.logger.error(f"❌ Variação {variation_number} não pode ser criada sem ID de cor.")
-                continue
-                
-            variation_data['color_id'] = color_id
-            
-            # 7.8. Criar variação
-            try:
-                self.logger.info(f"📤 Criando variação {variation_number} com payload: {json.dumps(variation_data)}")
-                
-                variation_response = self._make_request(
-                    method="POST",
-                    endpoint="/variations",
-                    data=variation_data,
-                    headers=self._get_headers()
-                )
-                
-                if variation_response and 'id' in variation_response:
-                    variation_id = variation_response['id']
-                    self.logger.info(f"✅ Variação {variation_number} criada com sucesso! (ID: {variation_id})")
-                    successful_variations += 1
-                else:
-                    self.logger.error(f"❌ Falha ao criar variação {variation_number}. Resposta: {variation_response}")
             except Exception as e:
-                import traceback
-                self.logger.error(f"❌ Erro ao criar variação {variation_number}: {str(e)}")
-                self.logger.error(f"❌ Detalhes: {traceback.format_exc()}")
-        
-        # 8. RESUMO DE CRIAÇÃO DAS VARIAÇÕES
-        self.logger.info(f"✨ Criadas {successful_variations} de {len(original_variations)} variações.")
+                self.logger.error(f"❌ Erro ao criar cor '{color_name}': {str(e)}")
         
-        # 9. OBTER PRODUTO COMPLETO COM TODAS AS VARIAÇÕES
-        complete_product = self.get_product_by_id(product_id)
-        if complete_product:
-            return complete_product
-        
-        return product_response
+        return {name: self.color_cache[name] for name in distinct_names if name in self.color_cache}
+    
+    def _create_variation(self, variation_number, variation_data):
+        """
+        POST a single variation to Bagy.
         
+        Args:
+            variation_number (int): 1-based position of the variation (for logging)
+            variation_data (dict): /variations payload
+            
+        Returns:
+            tuple: (variation_response, None) on success, (None, error_message) on failure
+        """
+        try:
+            self.logger.info(f"📤 Criando variação {variation_number} com payload: {json.dumps(variation_data)}")
+            
+            variation_response = self._make_request(
+                method="POST",
+                endpoint="/variations",
+                data=variation_data,
+                headers=self._get_headers()
+            )
+            
+            if variation_response and 'id' in variation_response:
+                self.logger.info(f"✅ Variação {variation_number} criada com sucesso! (ID: {variation_response['id']})")
+                return variation_response, None
+            
+            self.logger.error(f"❌ Falha ao criar variação {variation_number}. Resposta: {variation_response}")
+            return None, f"Resposta inesperada: {variation_response}"
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao criar variação {variation_number}: {str(e)}")
+            return None, str(e)
+    
     def update_product(self, product_id, product_data):
         """
         Update a product in Bagy.
@@ -680,6 +1316,25 @@ class BagyClient(APIClient):
         """
         self.logger.info(f"Updating product in Bagy with ID: {product_id}")
         
+        self._prepare_update_payload(product_data)
+        
+        response = self._make_request(
+            method="PUT",
+            endpoint=f"/products/{product_id}",
+            data=product_data,
+            headers=self._get_headers()
+        )
+        
+        self._index_updated_product(product_id, product_data, response)
+        return response
+    
+    def _prepare_update_payload(self, product_data):
+        """
+        Normalize a product payload before a PUT (minimum dimensions, string codes).
+        
+        Args:
+            product_data (dict): Updated product data (modified in place)
+        """
         # Verificar dimensões para atualização
         # Se faltar alguma dimensão, adicionamos valores padrão mínimos aceitos pela API
         if 'depth' not in product_data or 'width' not in product_data or 'height' not in product_data or 'weight' not in product_data:
@@ -701,13 +1356,20 @@ class BagyClient(APIClient):
                 # Garantir que seja uma string, mesmo que venha como número
                 product_data[codigo_field] = str(product_data[codigo_field])
                 self.logger.info(f"🔧 Garantindo que {codigo_field} (update) seja string: '{product_data[codigo_field]}'")
+    
+    def _index_updated_product(self, product_id, product_data, response):
+        """
+        Keep the local product index consistent with what was sent in an update.
         
-        return self._make_request(
-            method="PUT",
-            endpoint=f"/products/{product_id}",
-            data=product_data,
-            headers=self._get_headers()
-        )
+        Args:
+            product_id (str): Product ID
+            product_data (dict): Data sent in the PUT
+            response (dict): API response
+        """
+        if isinstance(response, dict) and response.get('id') is not None:
+            self.product_index.upsert(response)
+        elif self.product_index.get_by_id(product_id):
+            self.product_index.upsert({**product_data, 'id': product_id})
     
     def get_customer_by_id(self, customer_id):
         """
@@ -747,10 +1409,12 @@ class BagyClient(APIClient):
 class GestaoClickClient(APIClient):
     """Client for interacting with GestãoClick API."""
     
-    def __init__(self, api_key, secret_key):
-        super().__init__(config.GESTAOCLICK_BASE_URL)
+    def __init__(self, api_key, secret_key, customer_index=None):
+        super().__init__(config.GESTAOCLICK_BASE_URL, rate_limit=config.GESTAOCLICK_RATE_LIMIT_PER_SECOND)
         self.api_key = api_key
         self.secret_key = secret_key
+        # Índice local de clientes por CPF/CNPJ e email (evita duas buscas por cliente)
+        self.customer_index = customer_index if customer_index is not None else CustomerIndex()
     
     def _get_headers(self):
         """Get default headers for GestãoClick API."""
@@ -760,25 +1424,70 @@ class GestaoClickClient(APIClient):
             "secret-access-token": self.secret_key
         }
     
-    def get_products(self, page=1, limit=100):
+    def get_products(self, page=1, limit=100, modified_since=None):
         """
         Get products from GestãoClick.
         
         Args:
             page (int): Page number for pagination
             limit (int): Number of products per page
+            modified_since (str, optional): Only products changed after this 'YYYY-MM-DD HH:MM:SS' timestamp
             
         Returns:
             dict: Products data
         """
         self.logger.info(f"Fetching products from GestãoClick (page {page}, limit {limit})")
         # De acordo com a documentação, a API usa 'pagina' e 'limite' como parâmetros de paginação
+        params = {"pagina": page, "limite": limit}
+        if modified_since:
+            params[config.GESTAOCLICK_MODIFIED_SINCE_PARAM] = modified_since
+        
         return self._make_request(
             method="GET",
             endpoint="produtos",
-            params={"pagina": page, "limite": limit},
+            params=params,
+            headers=self._get_headers()
+        )
+    
+    def get_product_by_id(self, product_id):
+        """
+        Get a single product from GestãoClick.
+        
+        Args:
+            product_id (str): Product ID
+            
+        Returns:
+            dict or None: Product data
+        """
+        self.logger.info(f"Fetching GestãoClick product {product_id}")
+        response = self._make_request(
+            method="GET",
+            endpoint=f"produtos/{product_id}",
             headers=self._get_headers()
         )
+        if isinstance(response, dict) and isinstance(response.get('data'), dict):
+            return response['data']
+        return response or None
+    
+    def get_product_variations(self, product_id):
+        """
+        Get the variations of a GestãoClick product.
+        
+        Args:
+            product_id (str): Product ID
+            
+        Returns:
+            list: Variations of the product
+        """
+        self.logger.debug(f"Fetching variations of GestãoClick product {product_id}")
+        response = self._make_request(
+            method="GET",
+            endpoint=f"produtos/{product_id}/variacoes",
+            headers=self._get_headers()
+        )
+        if isinstance(response, dict):
+            response = response.get('data')
+        return response or []
     
     def get_product_by_sku(self, sku):
         """
@@ -838,6 +1547,19 @@ class GestaoClickClient(APIClient):
             headers=self._get_headers()
         )
     
+    def _normalize_person_type(self, customer_data):
+        """
+        Ensure tipo_pessoa is 'PF' or 'PJ', inferring it from the document length.
+        
+        Args:
+            customer_data (dict): Customer data (modified in place)
+        """
+        # Verificar e garantir que tipo_pessoa seja 'PF' ou 'PJ'
+        if 'tipo_pessoa' in customer_data:
+            if customer_data['tipo_pessoa'] not in ['PF', 'PJ']:
+                documento = customer_data.get('cpf_cnpj', '')
+                customer_data['tipo_pessoa'] = 'PF' if len(documento) <= 11 else 'PJ'
+    
     def get_customers(self, page=1, limit=100):
         """
         Get customers from GestãoClick.
@@ -857,6 +1579,81 @@ class GestaoClickClient(APIClient):
             headers=self._get_headers()
         )
     
+    def build_customer_index(self, force=False):
+        """
+        Crawl GestãoClick's /clientes once and build the local customer index.
+        
+        The crawl is skipped when the persisted index is still fresh
+        (see config.CUSTOMER_INDEX_MAX_AGE_MINUTES), unless force is set.
+        
+        Args:
+            force (bool): Rebuild even if the current index is fresh
+            
+        Returns:
+            bool: True if the index is usable, False if the crawl failed
+        """
+        if not force and self.customer_index.is_built():
+            return True
+        
+        def crawl():
+            # Quem esperou por outra varredura encontra o índice já pronto
+            if not force and self.customer_index.is_built():
+                return True
+            self.logger.info("📇 Construindo índice local de clientes do GestãoClick")
+            try:
+                self.customer_index.rebuild(Pagination().iter_items(self.get_customers, data_key='data'))
+                return True
+            except Exception as e:
+                self.logger.warning(f"Erro ao construir índice de clientes: {str(e)}")
+                return False
+        
+        # sync_customers e a resolução de clientes dos pedidos podem pedir o índice ao mesmo tempo
+        return self.single_flight.do(('customer_index',), crawl)
+    
+    def find_customer(self, document=None, email=None):
+        """
+        Find an existing GestãoClick customer by CPF/CNPJ, then by email.
+        
+        Lookups are answered by the local customer index; without a usable index
+        GestãoClick is searched directly so no duplicate is created.
+        
+        Args:
+            document (str, optional): CPF/CNPJ
+            email (str, optional): Email address
+            
+        Returns:
+            dict or None: Customer data (with 'id') if found, None otherwise
+        """
+        if self.build_customer_index():
+            return self.customer_index.find(document=document, email=email)
+        
+        for search, value in ((self.get_customer_by_document, document), (self.get_customer_by_email, email)):
+            if not value:
+                continue
+            result = search(value)
+            if result and result.get('data'):
+                customer = result['data'][0]
+                self.customer_index.upsert(customer)
+                return customer
+        return None
+    
+    def _index_customer(self, customer_data, response, customer_id=None):
+        """
+        Record a created/updated customer in the local index.
+        
+        Args:
+            customer_data (dict): Payload sent to GestãoClick
+            response (dict): GestãoClick response
+            customer_id (str, optional): ID of an updated customer
+        """
+        if not isinstance(response, dict):
+            return
+        returned = response.get('data') if isinstance(response.get('data'), dict) else response
+        customer = {**customer_data, **returned}
+        if customer_id is not None:
+            customer['id'] = customer_id
+        self.customer_index.upsert(customer)
+    
     def get_customer_by_document(self, document):
         """
         Get a customer by document (CPF/CNPJ) from GestãoClick.
@@ -869,12 +1666,13 @@ class GestaoClickClient(APIClient):
         """
         self.logger.info(f"Searching for customer with document: {document}")
         try:
-            return self._make_request(
+            # Buscas simultâneas pelo mesmo cliente compartilham uma única requisição
+            return self.single_flight.do(('customer_by_document', str(document)), lambda: self._make_request(
                 method="GET",
                 endpoint="clientes",
                 params={"cpf_cnpj": document},
                 headers=self._get_headers()
-            )
+            ))
         except RequestException:
             return None
     
@@ -890,12 +1688,13 @@ class GestaoClickClient(APIClient):
         """
         self.logger.info(f"Searching for customer with email: {email}")
         try:
-            return self._make_request(
+            # Buscas simultâneas pelo mesmo cliente compartilham uma única requisição
+            return self.single_flight.do(('customer_by_email', str(email)), lambda: self._make_request(
                 method="GET",
                 endpoint="clientes",
                 params={"email": email},
                 headers=self._get_headers()
-            )
+            ))
         except RequestException:
             return None
     
@@ -911,18 +1710,37 @@ class GestaoClickClient(APIClient):
         """
         self.logger.info(f"Creating customer: {customer_data.get('nome', 'Unknown')}")
         
-        # Verificar e garantir que tipo_pessoa seja 'PF' ou 'PJ'
-        if 'tipo_pessoa' in customer_data:
-            if customer_data['tipo_pessoa'] not in ['PF', 'PJ']:
-                documento = customer_data.get('cpf_cnpj', '')
-                customer_data['tipo_pessoa'] = 'PF' if len(documento) <= 11 else 'PJ'
+        self._normalize_person_type(customer_data)
         
-        return self._make_request(
-            method="POST",
-            endpoint="clientes",
-            data=customer_data,
-            headers=self._get_headers()
-        )
+        customer_key = customer_data.get('cpf_cnpj') or customer_data.get('email')
+        if not customer_key:
+            return self._make_request(
+                method="POST",
+                endpoint="clientes",
+                data=customer_data,
+                headers=self._get_headers()
+            )
+        
+        # Criações do mesmo cliente (documento ou email) são serializadas; quem chega
+        # depois encontra no índice local o cliente já criado em vez de criar uma duplicata
+        with self.single_flight.lock(('customer', str(customer_key))):
+            if customer_data.get('cpf_cnpj'):
+                existing = self.customer_index.find(document=customer_data['cpf_cnpj'])
+            else:
+                existing = self.customer_index.find(email=customer_data.get('email'))
+            if existing and existing.get('id'):
+                self.logger.info(f"Customer {customer_key} already exists (ID: {existing['id']}), reusing it")
+                return existing
+            
+            response = self._make_request(
+                method="POST",
+                endpoint="clientes",
+                data=customer_data,
+                headers=self._get_headers()
+            )
+            if response:
+                self._index_customer(customer_data, response)
+            return response
     
     def update_customer(self, customer_id, customer_data):
         """
@@ -936,18 +1754,16 @@ class GestaoClickClient(APIClient):
             dict: Updated customer data
         """
         self.logger.info(f"Updating customer with ID: {customer_id}")
-        # Verificar e garantir que tipo_pessoa seja 'PF' ou 'PJ'
-        if 'tipo_pessoa' in customer_data:
-            if customer_data['tipo_pessoa'] not in ['PF', 'PJ']:
-                documento = customer_data.get('cpf_cnpj', '')
-                customer_data['tipo_pessoa'] = 'PF' if len(documento) <= 11 else 'PJ'
+        self._normalize_person_type(customer_data)
         
-        return self._make_request(
+        response = self._make_request(
             method="PUT",
             endpoint=f"clientes/{customer_id}",
             data=customer_data,
             headers=self._get_headers()
         )
+        self._index_customer(customer_data, response, customer_id)
+        return response
     
     def get_orders(self, page=1, limit=100):
         """
@@ -12,11 +12,11 @@ from datetime import datetime
 # Importar a classe BidirectionalSynchronizer para acessar os dados de sincronização
 # Vamos usar a implementação atualizada da sincronização
 # from sync import BidirectionalSynchronizer
-from storage import IncompleteProductsStorage
+from storage import open_incomplete_products_storage
 
 # Não vamos usar um sincronizador global, pois agora usamos a implementação atualizada
 # O app.py será apenas para gerenciar endpoints REST
-incomplete_products = IncompleteProductsStorage('data/incomplete_products.json')
+incomplete_products = open_incomplete_products_storage('data/incomplete_products.json')
 
 # Create the Flask app
 app = Flask(__name__)
@@ -0,0 +1,1177 @@
+"""
+asyncio-native API clients for Bagy and GestãoClick.
+
+AsyncBagyClient and AsyncGestaoClickClient mirror the public methods of
+BagyClient and GestaoClickClient as coroutines, so hundreds of requests can be
+in flight from a single thread instead of one blocked worker per request.
+
+Both share the behaviour of the blocking clients: the same retry/backoff rules
+(Retry-After, full jitter, no retries on 4xx validation errors), the per-host
+token bucket, the connection limits from config and the payload helpers, lookup
+caches and product index of BagyClient.
+
+Requires the optional 'aiohttp' dependency (pip install aiohttp).
+"""
+import asyncio
+import json
+import logging
+from copy import deepcopy
+
+import config
+from api_clients import APIClient, BagyClient, GestaoClickClient, compute_backoff, is_retryable_status
+from storage import ProductCatalogIndex, NameLookupCache
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - dependência opcional
+    aiohttp = None
+
+
+async def async_iter_items(fetcher, data_key='data', limit=100, prefetch=config.PAGINATION_PREFETCH_PAGES):
+    """
+    Yield every item of a paginated endpoint, fetching `prefetch` pages ahead concurrently.
+
+    Args:
+        fetcher (callable): Coroutine function fetcher(page=..., limit=...) returning a page
+        data_key (str): Key of the items list in each page
+        limit (int): Items per page
+        prefetch (int): Pages requested ahead of the one being consumed
+
+    Yields:
+        dict: Items in page order; stops at the first empty or short page
+    """
+    page = 1
+    batch_size = max(1, prefetch + 1)
+    while True:
+        responses = await asyncio.gather(*(fetcher(page=number, limit=limit) for number in range(page, page + batch_size)))
+        for response in responses:
+            items = response.get(data_key, []) if isinstance(response, dict) else []
+            for item in items:
+                yield item
+            if len(items) < limit:
+                return
+        page += batch_size
+
+
+async def async_get_all_pages(fetcher, data_key='data', limit=100):
+    """
+    Get all items of a paginated endpoint.
+
+    Args:
+        fetcher (callable): Coroutine function fetcher(page=..., limit=...) returning a page
+        data_key (str): Key of the items list in each page
+        limit (int): Items per page
+
+    Returns:
+        list: All items
+    """
+    return [item async for item in async_iter_items(fetcher, data_key=data_key, limit=limit)]
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight: coalesces concurrent identical calls and
+    serializes creates per key, within one event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._locks = {}
+
+    async def do(self, key, func):
+        """
+        Await func() once for all concurrent callers of the same key.
+
+        Args:
+            key (hashable): Identity of the call
+            func (callable): Coroutine function performing the call
+
+        Returns:
+            Any: Result of the shared call (its exception is raised to every caller)
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Cancelar um chamador não cancela a chamada compartilhada com os demais
+        return await asyncio.shield(task)
+
+    def lock(self, key):
+        """
+        Get the asyncio lock that serializes work on one key.
+
+        Args:
+            key (hashable): Identity of the resource (e.g. ('color', 'azul'))
+
+        Returns:
+            asyncio.Lock: Lock for the key
+        """
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+
+class AsyncAPIClient:
+    """Base asyncio API client with the retry, rate limit and connection rules of APIClient."""
+
+    def __init__(self, base_url, retry_count=config.MAX_RETRIES, retry_delay=config.RETRY_DELAY_SECONDS,
+                 pool_size=config.HTTP_POOL_SIZE, connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+                 read_timeout=config.HTTP_READ_TIMEOUT, keep_alive=config.HTTP_KEEP_ALIVE,
+                 rate_limit=None, max_backoff=config.HTTP_BACKOFF_MAX_SECONDS,
+                 max_concurrency_per_host=config.HTTP_MAX_CONCURRENCY_PER_HOST):
+        if aiohttp is None:
+            raise ImportError("Os clientes assíncronos requerem o pacote 'aiohttp' (pip install aiohttp)")
+
+        self.base_url = base_url
+        self.retry_count = retry_count
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.keep_alive = keep_alive
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # Mesmo token bucket dos clientes síncronos do host
+        self.rate_limiter = APIClient._get_rate_limiter(base_url, rate_limit) if rate_limit else None
+        self.single_flight = AsyncSingleFlight()
+        self.session = None
+
+    def _get_session(self):
+        """
+        Get the aiohttp session, creating it on first use inside the running loop.
+
+        Returns:
+            aiohttp.ClientSession: Session with a connector bounded by the configured limits
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.max_concurrency_per_host,
+                force_close=not self.keep_alive
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        """Close the underlying HTTP session and its connections."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _acquire_rate_limit(self):
+        """Wait without blocking the loop until the host's token bucket allows a request."""
+        if not self.rate_limiter:
+            return
+        while True:
+            wait = self.rate_limiter.reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _make_request(self, method, endpoint, params=None, data=None, headers=None):
+        """
+        Make an HTTP request with retry logic.
+
+        Args:
+            method (str): HTTP method (GET, POST, PUT, etc.)
+            endpoint (str): API endpoint to call
+            params (dict, optional): Query parameters
+            data (dict, optional): Request body data
+            headers (dict, optional): HTTP headers
+
+        Returns:
+            dict: API response data
+
+        Raises:
+            aiohttp.ClientError: If the request fails after all retries
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        method = method.upper()
+        if params:
+            params = {key: str(value) for key, value in params.items() if value is not None}
+        session = self._get_session()
+
+        for attempt in range(self.retry_count + 1):
+            status = None
+            response_headers = None
+            try:
+                self.logger.debug(f"Making {method} request to {url} (Attempt {attempt + 1}/{self.retry_count + 1})")
+
+                # Log de dados para depuração
+                if data and method in ['POST', 'PUT']:
+                    self.logger.debug(f"Request body: {json.dumps(data, indent=2)}")
+
+                await self._acquire_rate_limit()
+
+                async with session.request(method, url, params=params, json=data, headers=headers) as response:
+                    status = response.status
+                    response_headers = response.headers
+                    if self.rate_limiter:
+                        self.rate_limiter.update_from_headers(response.headers)
+
+                    body = await response.text()
+
+                    # Log de resposta para depuração em caso de erro
+                    if status >= 400:
+                        self.logger.error(f"Response error {status}: {body}")
+                    response.raise_for_status()
+
+                if self.rate_limiter:
+                    self.rate_limiter.record_success()
+                return json.loads(body) if body else None
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.warning(f"Request failed: {str(e) or type(e).__name__}")
+
+                # Erros 4xx (validação, autenticação, não encontrado) não mudam com novas tentativas
+                if status is not None and status >= 400 and not is_retryable_status(status):
+                    raise
+
+                if attempt < self.retry_count:
+                    sleep_time = compute_backoff(attempt, self.retry_delay, self.max_backoff, response_headers)
+                    if status == 429 and self.rate_limiter:
+                        # Pausar todas as requisições deste host, não só esta
+                        self.rate_limiter.block_for(sleep_time)
+                    self.logger.info(f"Retrying in {sleep_time:.1f} seconds...")
+                    await asyncio.sleep(sleep_time)
+                else:
+                    self.logger.error(f"Request failed after {self.retry_count + 1} attempts")
+                    raise
+
+
+class AsyncBagyClient(AsyncAPIClient):
+    """asyncio client for the Bagy API, mirroring BagyClient."""
+
+    # Montagem de payloads e manutenção do índice são idênticas às do cliente síncrono
+    _get_headers = BagyClient._get_headers
+    _prepare_product_payload = BagyClient._prepare_product_payload
+    _prepare_variations = BagyClient._prepare_variations
+    _build_variation_payload = BagyClient._build_variation_payload
+    _assign_color_ids = BagyClient._assign_color_ids
+    _finish_created_product = BagyClient._finish_created_product
+    _prepare_update_payload = BagyClient._prepare_update_payload
+    _index_updated_product = BagyClient._index_updated_product
+
+    def __init__(self, api_key, product_index=None, color_cache=None, category_cache=None):
+        super().__init__(config.BAGY_BASE_URL, rate_limit=config.BAGY_RATE_LIMIT_PER_SECOND)
+        self.api_key = api_key
+        self.color_cache = color_cache if color_cache is not None else NameLookupCache(config.COLOR_CACHE_FILE)
+        self.category_cache = category_cache if category_cache is not None else NameLookupCache(config.CATEGORY_CACHE_FILE)
+        self.product_index = product_index if product_index is not None else ProductCatalogIndex()
+        self.variation_workers = config.BAGY_VARIATION_WORKERS
+
+    async def get_colors(self, page=1, limit=100):
+        """
+        Lista as cores disponíveis na Bagy.
+
+        Args:
+            page (int): Página da listagem
+            limit (int): Número de cores por página
+
+        Returns:
+            dict: Lista de cores disponíveis
+        """
+        self.logger.info(f"Obtendo lista de cores cadastradas na Bagy (página {page})")
+        return await self._make_request(
+            method="GET",
+            endpoint="/colors",
+            params={"page": page, "limit": limit},
+            headers=self._get_headers()
+        )
+
+    async def _warm_cache(self, cache, fetcher, label, force):
+        """Crawl a lookup endpoint into a NameLookupCache once for all concurrent callers."""
+        if not force and cache.is_fresh():
+            return True
+
+        async def crawl():
+            cache.warm(await async_get_all_pages(fetcher, data_key='data'))
+
+        try:
+            await self.single_flight.do(('warm', label), crawl)
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao carregar {label} da Bagy: {str(e)}")
+            return False
+
+    async def warm_color_cache(self, force=False):
+        """
+        Load every Bagy color into the color cache with one paginated crawl, unless it is still fresh.
+
+        Args:
+            force (bool): Crawl even if the cache is within its TTL
+
+        Returns:
+            bool: True if the cache is fresh after the call
+        """
+        return await self._warm_cache(self.color_cache, self.get_colors, 'cores', force)
+
+    async def warm_category_cache(self, force=False):
+        """
+        Load every Bagy category into the category cache with one paginated crawl, unless it is still fresh.
+
+        Args:
+            force (bool): Crawl even if the cache is within its TTL
+
+        Returns:
+            bool: True if the cache is fresh after the call
+        """
+        return await self._warm_cache(self.category_cache, self.get_categories, 'categorias', force)
+
+    async def warm_lookup_caches(self, force=False):
+        """
+        Warm the color and category caches at the start of a sync run.
+
+        Args:
+            force (bool): Crawl even if the caches are within their TTL
+        """
+        await asyncio.gather(self.warm_color_cache(force), self.warm_category_cache(force))
+
+    async def create_color(self, color_data):
+        """
+        Cria uma nova cor na Bagy.
+
+        Args:
+            color_data (dict): Dados da cor a ser criada
+
+        Returns:
+            dict: Dados da cor criada
+        """
+        color_name = color_data.get('name', '')
+        self.logger.info(f"Criando cor na Bagy: {color_name or 'Desconhecido'}")
+
+        async with self.single_flight.lock(('color', color_name.lower())):
+            await self.warm_color_cache()
+            if color_name and color_name in self.color_cache:
+                self.logger.info(f"Cor com nome {color_name} já existe (ID: {self.color_cache[color_name]})")
+                return {'id': self.color_cache[color_name], 'name': color_name}
+
+            response = await self._make_request(
+                method="POST",
+                endpoint="/colors",
+                data=color_data,
+                headers=self._get_headers()
+            )
+
+            if response:
+                self.logger.info(f"Cor criada com sucesso: {response.get('name', 'Desconhecido')} (ID: {response.get('id')})")
+                if response.get('id') is not None:
+                    self.color_cache[color_name or response.get('name')] = response['id']
+            else:
+                self.logger.error(f"Falha ao criar cor: {color_name or 'Desconhecido'}")
+
+            return response
+
+    async def ensure_color_exists(self, color_name, hex_color="#000000"):
+        """
+        Garante que uma cor exista no sistema, criando-a se necessário.
+
+        Args:
+            color_name (str): Nome da cor
+            hex_color (str): Código hexadecimal da cor
+
+        Returns:
+            int: ID da cor na Bagy
+        """
+        await self.warm_color_cache()
+        if color_name in self.color_cache:
+            return self.color_cache[color_name]
+
+        response = await self.create_color({
+            "external_id": None,
+            "name": color_name,
+            "hexadecimal": hex_color,
+            "image": None,
+            "position": 99,
+            "active": True
+        })
+        if response and 'id' in response:
+            self.color_cache[color_name] = response['id']
+            return response['id']
+
+        self.logger.error(f"Não foi possível garantir que a cor {color_name} exista")
+        return None
+
+    async def get_products(self, page=1, limit=100):
+        """
+        Get products from Bagy.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of products per page
+
+        Returns:
+            dict: Products data
+        """
+        self.logger.info(f"Fetching products from Bagy (page {page}, limit {limit})")
+        return await self._make_request(
+            method="GET",
+            endpoint="/products",
+            params={"page": page, "limit": limit},
+            headers=self._get_headers()
+        )
+
+    async def get_customers(self, page=1, limit=100):
+        """
+        Get customers from Bagy.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of customers per page
+
+        Returns:
+            dict: Customers data
+        """
+        self.logger.info(f"Fetching customers from Bagy (page {page}, limit {limit})")
+        return await self._make_request(
+            method="GET",
+            endpoint="/customers",
+            params={"page": page, "limit": limit},
+            headers=self._get_headers()
+        )
+
+    async def get_orders(self, page=1, limit=100, updated_since=None, status=None):
+        """
+        Get orders from Bagy.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of orders per page
+            updated_since (str, optional): Only orders changed after this 'YYYY-MM-DD HH:MM:SS' timestamp
+            status (str, optional): Only orders with this status
+
+        Returns:
+            dict: Orders data
+        """
+        self.logger.info(f"Fetching orders from Bagy (page {page}, limit {limit})")
+        params = {"page": page, "limit": limit}
+        if updated_since:
+            params[config.BAGY_ORDERS_UPDATED_SINCE_PARAM] = updated_since
+        if status:
+            params[config.BAGY_ORDERS_STATUS_PARAM] = status
+
+        return await self._make_request(
+            method="GET",
+            endpoint="/orders",
+            params=params,
+            headers=self._get_headers()
+        )
+
+    async def get_categories(self, page=1, limit=100):
+        """
+        Get categories from Bagy.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of categories per page
+
+        Returns:
+            dict: Categories data
+        """
+        self.logger.info(f"Fetching categories from Bagy (page {page}, limit {limit})")
+        return await self._make_request(
+            method="GET",
+            endpoint="/categories",
+            params={"page": page, "limit": limit},
+            headers=self._get_headers()
+        )
+
+    async def create_category(self, category_data):
+        """
+        Create a new category in Bagy.
+
+        Args:
+            category_data (dict): Category data
+
+        Returns:
+            dict: Created category data
+        """
+        category_name = category_data.get('name', '')
+        self.logger.info(f"Creating new category in Bagy: {category_name or 'Unknown'}")
+
+        async with self.single_flight.lock(('category', category_name.lower())):
+            if category_name and category_name in self.category_cache:
+                return {'id': self.category_cache[category_name], 'name': category_name}
+
+            response = await self._make_request(
+                method="POST",
+                endpoint="/categories",
+                data=category_data,
+                headers=self._get_headers()
+            )
+
+            if response and response.get('id') is not None:
+                self.category_cache[category_name or response.get('name')] = response['id']
+
+            return response
+
+    async def find_category_id(self, name):
+        """
+        Get a category ID by name from the category cache.
+
+        Args:
+            name (str): Category name
+
+        Returns:
+            int or None: Category ID if the category exists, None otherwise
+        """
+        await self.warm_category_cache()
+        return self.category_cache.get(name)
+
+    async def get_category_by_name(self, name):
+        """
+        Get a category by name from Bagy.
+
+        Args:
+            name (str): Category name
+
+        Returns:
+            dict or None: Category data if found, None otherwise
+        """
+        self.logger.debug(f"Searching for category with name: {name}")
+        try:
+            response = await self.single_flight.do(('category_by_name', name.lower()), lambda: self._make_request(
+                method="GET",
+                endpoint="/categories",
+                params={"name": name},
+                headers=self._get_headers()
+            ))
+
+            if response and 'data' in response and response['data']:
+                for category in response['data']:
+                    if category.get('name', '').lower() == name.lower():
+                        self.category_cache[name] = category.get('id')
+                        return category
+
+            return None
+        except Exception as e:
+            self.logger.error(f"Error fetching category by name: {str(e)}")
+            return None
+
+    async def get_product_by_id(self, product_id):
+        """
+        Get a specific product by ID.
+
+        Args:
+            product_id (str): Product ID
+
+        Returns:
+            dict: Product data
+        """
+        self.logger.info(f"Fetching product details for ID: {product_id}")
+        return await self._make_request(
+            method="GET",
+            endpoint=f"/products/{product_id}",
+            headers=self._get_headers()
+        )
+
+    async def build_product_index(self, force=False):
+        """
+        Build the local product index from one paginated crawl of /products.
+
+        Concurrent callers share a single crawl.
+
+        Args:
+            force (bool): Rebuild even if the current index is fresh
+
+        Returns:
+            bool: True if the index is usable, False if the crawl failed
+        """
+        if not force and self.product_index.is_built():
+            return True
+
+        async def crawl():
+            self.logger.info("📇 Construindo índice local de produtos da Bagy")
+            self.product_index.rebuild(await async_get_all_pages(self.get_products, data_key='data'))
+
+        try:
+            await self.single_flight.do(('product_index',), crawl)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Erro ao construir índice de produtos: {str(e)}")
+            return False
+
+    async def get_product_by_external_id(self, external_id):
+        """
+        Get a product by external ID from Bagy, answered by the local product index.
+
+        Args:
+            external_id (str): External product ID
+
+        Returns:
+            dict or None: Product data if found, None otherwise
+        """
+        self.logger.info(f"Buscando produto com external_id: {external_id}")
+
+        if not await self.build_product_index():
+            # Sem índice confiável, consultar diretamente a API para não criar duplicados
+            return await self._find_product_by_external_id_remote(external_id)
+
+        product = self.product_index.get_by_external_id(external_id)
+        if product:
+            self.logger.info(f"Produto encontrado com external_id={external_id} (ID: {product.get('id')})")
+        return product
+
+    async def get_product_by_sku(self, sku):
+        """
+        Get a product by SKU from the local product index.
+
+        Args:
+            sku (str): Product SKU
+
+        Returns:
+            dict or None: Product data if found, None otherwise
+        """
+        if not await self.build_product_index():
+            return None
+        return self.product_index.get_by_sku(sku)
+
+    async def _find_product_by_external_id_remote(self, external_id):
+        """
+        Query Bagy directly for a product by external ID (used when the index is unavailable).
+
+        Args:
+            external_id (str): External product ID
+
+        Returns:
+            dict or None: Product data if found, None otherwise
+        """
+        try:
+            response = await self._make_request(
+                method="GET",
+                endpoint="/products",
+                params={"external_id": external_id},
+                headers=self._get_headers()
+            )
+
+            if response and isinstance(response, dict) and response.get('data'):
+                for product in response['data']:
+                    if str(product.get('external_id')) == str(external_id):
+                        return product
+        except Exception as e:
+            self.logger.warning(f"Erro na busca por external_id: {str(e)}")
+
+        return None
+
+    async def create_product(self, product_data, refetch=config.BAGY_REFETCH_AFTER_CREATE):
+        """
+        Create a new product in Bagy.
+
+        Variations are created concurrently (up to self.variation_workers at a time);
+        failed variations are reported under 'variation_errors' in the result.
+
+        Args:
+            product_data (dict): Product data
+            refetch (bool): Fetch the complete product after creating the variations
+                instead of building it from the POST responses
+
+        Returns:
+            dict: Created product data
+        """
+        self.logger.info(f"🚀 Iniciando criação do produto: {product_data.get('name', 'Desconhecido')}")
+
+        data = deepcopy(product_data)
+
+        external_id = data.get('external_id')
+        if external_id:
+            existing_product = await self.get_product_by_external_id(external_id)
+            if existing_product:
+                self.logger.info(f"✅ Produto já existe com external_id={external_id} (ID: {existing_product.get('id')})")
+                return existing_product
+
+        data, original_variations, unique_suffix = self._prepare_product_payload(data)
+
+        product_response = await self._make_request(
+            method="POST",
+            endpoint="/products",
+            data=data,
+            headers=self._get_headers()
+        )
+
+        if not product_response or 'id' not in product_response:
+            self.logger.error(f"❌ Falha ao criar produto base: {data.get('name')}. Resposta: {product_response}")
+            return None
+
+        product_id = product_response['id']
+        self.logger.info(f"✅ Produto base criado com sucesso: {data.get('name')} (ID: {product_id})")
+        self.product_index.upsert(product_response)
+
+        if data['type'] != 'variant' or not original_variations:
+            return product_response
+
+        prepared_variations = self._prepare_variations(original_variations, data, product_id, external_id, unique_suffix)
+        color_ids = await self._resolve_colors([color_name for _, _, color_name in prepared_variations])
+        pending_variations, variation_errors = self._assign_color_ids(prepared_variations, color_ids)
+
+        # Criar as variações em paralelo, limitadas por variation_workers
+        semaphore = asyncio.Semaphore(max(1, self.variation_workers))
+
+        async def create(variation_number, variation_data):
+            async with semaphore:
+                return await self._create_variation(variation_number, variation_data)
+
+        results = await asyncio.gather(*(create(number, variation) for number, variation in pending_variations))
+
+        created_variations = {}
+        for (variation_number, variation_data), (variation_response, error) in zip(pending_variations, results):
+            if variation_response:
+                created_variations[variation_number] = variation_response
+            else:
+                variation_errors.append({
+                    'variation': variation_number,
+                    'external_id': variation_data.get('external_id'),
+                    'error': error
+                })
+
+        self.logger.info(f"✨ Criadas {len(created_variations)} de {len(original_variations)} variações.")
+
+        complete_product = await self.get_product_by_id(product_id) if refetch else None
+        return self._finish_created_product(product_response, complete_product, created_variations, variation_errors)
+
+    async def _resolve_colors(self, color_names):
+        """
+        Resolve the Bagy color ID of every distinct color name, creating missing colors.
+
+        Args:
+            color_names (list): Color names (duplicates allowed)
+
+        Returns:
+            dict: Lowercase color name -> color ID (missing entries mean creation failed)
+        """
+        distinct_names = {}
+        for color_name in color_names:
+            distinct_names.setdefault(color_name.lower(), color_name)
+
+        if any(name not in self.color_cache for name in distinct_names):
+            await self.warm_color_cache()
+
+        for color_name_lower, color_name in distinct_names.items():
+            if color_name_lower in self.color_cache:
+                continue
+
+            try:
+                async with self.single_flight.lock(('color', color_name_lower)):
+                    if color_name_lower in self.color_cache:
+                        continue
+
+                    color_create_response = await self._make_request(
+                        method="POST",
+                        endpoint="/colors",
+                        data={"name": color_name, "hexadecimal": "#000000", "active": True},
+                        headers=self._get_headers()
+                    )
+
+                    if color_create_response and 'id' in color_create_response:
+                        self.color_cache[color_name_lower] = color_create_response['id']
+                        self.logger.info(f"🎨 Nova cor criada: '{color_name}' (ID: {color_create_response['id']})")
+                    else:
+                        self.logger.error(f"❌ Falha ao criar cor: {color_name}. Resposta: {color_create_response}")
+            except Exception as e:
+                self.logger.error(f"❌ Erro ao criar cor '{color_name}': {str(e)}")
+
+        return {name: self.color_cache[name] for name in distinct_names if name in self.color_cache}
+
+    async def _create_variation(self, variation_number, variation_data):
+        """
+        POST a single variation to Bagy.
+
+        Args:
+            variation_number (int): 1-based position of the variation (for logging)
+            variation_data (dict): /variations payload
+
+        Returns:
+            tuple: (variation_response, None) on success, (None, error_message) on failure
+        """
+        try:
+            variation_response = await self._make_request(
+                method="POST",
+                endpoint="/variations",
+                data=variation_data,
+                headers=self._get_headers()
+            )
+
+            if variation_response and 'id' in variation_response:
+                self.logger.info(f"✅ Variação {variation_number} criada com sucesso! (ID: {variation_response['id']})")
+                return variation_response, None
+
+            self.logger.error(f"❌ Falha ao criar variação {variation_number}. Resposta: {variation_response}")
+            return None, f"Resposta inesperada: {variation_response}"
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao criar variação {variation_number}: {str(e)}")
+            return None, str(e)
+
+    async def update_product(self, product_id, product_data):
+        """
+        Update a product in Bagy.
+
+        Args:
+            product_id (str): Product ID
+            product_data (dict): Updated product data
+
+        Returns:
+            dict: Updated product data
+        """
+        self.logger.info(f"Updating product in Bagy with ID: {product_id}")
+        self._prepare_update_payload(product_data)
+
+        response = await self._make_request(
+            method="PUT",
+            endpoint=f"/products/{product_id}",
+            data=product_data,
+            headers=self._get_headers()
+        )
+
+        self._index_updated_product(product_id, product_data, response)
+        return response
+
+    async def get_customer_by_id(self, customer_id):
+        """
+        Get a specific customer by ID.
+
+        Args:
+            customer_id (str): Customer ID
+
+        Returns:
+            dict: Customer data
+        """
+        self.logger.info(f"Fetching customer details for ID: {customer_id}")
+        return await self._make_request(
+            method="GET",
+            endpoint=f"/customers/{customer_id}",
+            headers=self._get_headers()
+        )
+
+    async def get_order_by_id(self, order_id):
+        """
+        Get a specific order by ID.
+
+        Args:
+            order_id (str): Order ID
+
+        Returns:
+            dict: Order data
+        """
+        self.logger.info(f"Fetching order details for ID: {order_id}")
+        return await self._make_request(
+            method="GET",
+            endpoint=f"/orders/{order_id}",
+            headers=self._get_headers()
+        )
+
+
+class AsyncGestaoClickClient(AsyncAPIClient):
+    """asyncio client for the GestãoClick API, mirroring GestaoClickClient."""
+
+    _get_headers = GestaoClickClient._get_headers
+    _normalize_person_type = GestaoClickClient._normalize_person_type
+
+    def __init__(self, api_key, secret_key):
+        super().__init__(config.GESTAOCLICK_BASE_URL, rate_limit=config.GESTAOCLICK_RATE_LIMIT_PER_SECOND)
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.created_customers = {}
+
+    async def get_products(self, page=1, limit=100, modified_since=None):
+        """
+        Get products from GestãoClick.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of products per page
+            modified_since (str, optional): Only products changed after this 'YYYY-MM-DD HH:MM:SS' timestamp
+
+        Returns:
+            dict: Products data
+        """
+        self.logger.info(f"Fetching products from GestãoClick (page {page}, limit {limit})")
+        params = {"pagina": page, "limite": limit}
+        if modified_since:
+            params[config.GESTAOCLICK_MODIFIED_SINCE_PARAM] = modified_since
+
+        return await self._make_request(
+            method="GET",
+            endpoint="produtos",
+            params=params,
+            headers=self._get_headers()
+        )
+
+    async def get_product_variations(self, product_id):
+        """
+        Get the variations of a GestãoClick product.
+
+        Args:
+            product_id (str): Product ID
+
+        Returns:
+            list: Variations of the product
+        """
+        self.logger.debug(f"Fetching variations of GestãoClick product {product_id}")
+        response = await self._make_request(
+            method="GET",
+            endpoint=f"produtos/{product_id}/variacoes",
+            headers=self._get_headers()
+        )
+        if isinstance(response, dict):
+            response = response.get('data')
+        return response or []
+
+    async def get_product_by_sku(self, sku):
+        """
+        Get a product by SKU from GestãoClick.
+
+        Args:
+            sku (str): Product SKU
+
+        Returns:
+            dict: Product data or None if not found
+        """
+        self.logger.info(f"Searching for product with SKU: {sku}")
+        try:
+            return await self._make_request(
+                method="GET",
+                endpoint="produtos",
+                params={"codigo_interno": sku},
+                headers=self._get_headers()
+            )
+        except aiohttp.ClientError:
+            return None
+
+    async def create_product(self, product_data):
+        """
+        Create a new product in GestãoClick.
+
+        Args:
+            product_data (dict): Product data
+
+        Returns:
+            dict: Created product data
+        """
+        self.logger.info(f"Creating product: {product_data.get('nome', 'Unknown')}")
+        return await self._make_request(
+            method="POST",
+            endpoint="produtos",
+            data=product_data,
+            headers=self._get_headers()
+        )
+
+    async def update_product(self, product_id, product_data):
+        """
+        Update a product in GestãoClick.
+
+        Args:
+            product_id (str): Product ID
+            product_data (dict): Updated product data
+
+        Returns:
+            dict: Updated product data
+        """
+        self.logger.info(f"Updating product with ID: {product_id}")
+        return await self._make_request(
+            method="PUT",
+            endpoint=f"produtos/{product_id}",
+            data=product_data,
+            headers=self._get_headers()
+        )
+
+    async def get_customers(self, page=1, limit=100):
+        """
+        Get customers from GestãoClick.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of customers per page
+
+        Returns:
+            dict: Customers data
+        """
+        self.logger.info(f"Fetching customers from GestãoClick (page {page}, limit {limit})")
+        return await self._make_request(
+            method="GET",
+            endpoint="clientes",
+            params={"pagina": page, "limite": limit},
+            headers=self._get_headers()
+        )
+
+    async def get_customer_by_document(self, document):
+        """
+        Get a customer by document (CPF/CNPJ) from GestãoClick.
+
+        Args:
+            document (str): Customer document number
+
+        Returns:
+            dict: Customer data or None if not found
+        """
+        self.logger.info(f"Searching for customer with document: {document}")
+        try:
+            return await self.single_flight.do(('customer_by_document', str(document)), lambda: self._make_request(
+                method="GET",
+                endpoint="clientes",
+                params={"cpf_cnpj": document},
+                headers=self._get_headers()
+            ))
+        except aiohttp.ClientError:
+            return None
+
+    async def get_customer_by_email(self, email):
+        """
+        Get a customer by email from GestãoClick.
+
+        Args:
+            email (str): Customer email
+
+        Returns:
+            dict: Customer data or None if not found
+        """
+        self.logger.info(f"Searching for customer with email: {email}")
+        try:
+            return await self.single_flight.do(('customer_by_email', str(email)), lambda: self._make_request(
+                method="GET",
+                endpoint="clientes",
+                params={"email": email},
+                headers=self._get_headers()
+            ))
+        except aiohttp.ClientError:
+            return None
+
+    async def create_customer(self, customer_data):
+        """
+        Create a new customer in GestãoClick.
+
+        Args:
+            customer_data (dict): Customer data
+
+        Returns:
+            dict: Created customer data
+        """
+        self.logger.info(f"Creating customer: {customer_data.get('nome', 'Unknown')}")
+        self._normalize_person_type(customer_data)
+
+        customer_key = customer_data.get('cpf_cnpj') or customer_data.get('email')
+        if not customer_key:
+            return await self._make_request(
+                method="POST",
+                endpoint="clientes",
+                data=customer_data,
+                headers=self._get_headers()
+            )
+
+        # Criações do mesmo cliente são serializadas; quem chega depois reutiliza o cliente criado
+        async with self.single_flight.lock(('customer', str(customer_key))):
+            if customer_key in self.created_customers:
+                self.logger.info(f"Customer {customer_key} already created in this run, reusing it")
+                return self.created_customers[customer_key]
+
+            response = await self._make_request(
+                method="POST",
+                endpoint="clientes",
+                data=customer_data,
+                headers=self._get_headers()
+            )
+            if response:
+                self.created_customers[customer_key] = response
+            return response
+
+    async def update_customer(self, customer_id, customer_data):
+        """
+        Update a customer in GestãoClick.
+
+        Args:
+            customer_id (str): Customer ID
+            customer_data (dict): Updated customer data
+
+        Returns:
+            dict: Updated customer data
+        """
+        self.logger.info(f"Updating customer with ID: {customer_id}")
+        self._normalize_person_type(customer_data)
+
+        return await self._make_request(
+            method="PUT",
+            endpoint=f"clientes/{customer_id}",
+            data=customer_data,
+            headers=self._get_headers()
+        )
+
+    async def get_orders(self, page=1, limit=100):
+        """
+        Get orders from GestãoClick.
+
+        Args:
+            page (int): Page number for pagination
+            limit (int): Number of orders per page
+
+        Returns:
+            dict: Orders data
+        """
+        self.logger.info(f"Fetching orders from GestãoClick (page {page}, limit {limit})")
+        return await self._make_request(
+            method="GET",
+            endpoint="vendas",
+            params={"pagina": page, "limite": limit},
+            headers=self._get_headers()
+        )
+
+    async def get_order_by_external_id(self, external_id):
+        """
+        Get an order by external ID from GestãoClick.
+
+        Args:
+            external_id (str): External order ID
+
+        Returns:
+            dict: Order data or None if not found
+        """
+        self.logger.info(f"Searching for order with external ID: {external_id}")
+        try:
+            return await self._make_request(
+                method="GET",
+                endpoint="vendas",
+                params={"codigo": external_id},
+                headers=self._get_headers()
+            )
+        except aiohttp.ClientError:
+            return None
+
+    async def create_order(self, order_data):
+        """
+        Create a new order in GestãoClick.
+
+        Args:
+            order_data (dict): Order data
+
+        Returns:
+            dict: Created order data
+        """
+        self.logger.info(f"Creating order with external ID: {order_data.get('codigo', 'Unknown')}")
+        return await self._make_request(
+            method="POST",
+            endpoint="vendas",
+            data=order_data,
+            headers=self._get_headers()
+        )
+
+    async def update_order(self, order_id, order_data):
+        """
+        Update an order in GestãoClick.
+
+        Args:
+            order_id (str): Order ID
+            order_data (dict): Updated order data
+
+        Returns:
+            dict: Updated order data
+        """
+        self.logger.info(f"Updating order with ID: {order_id}")
+        return await self._make_request(
+            method="PUT",
+            endpoint=f"vendas/{order_id}",
+            data=order_data,
+            headers=self._get_headers()
+        )
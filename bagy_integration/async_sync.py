@@ -0,0 +1,200 @@
+"""
+asyncio product sync: GestãoClick → Bagy with the async client pair.
+
+Products are streamed from GestãoClick and processed concurrently, bounded by
+an asyncio.Semaphore (config.ASYNC_SYNC_CONCURRENCY). The number of requests in
+flight is further bounded by the clients' connector limits and the per-host
+token bucket, so raising the concurrency never exceeds the APIs' rate limits.
+"""
+import asyncio
+import logging
+import time
+
+import config
+from async_api_clients import AsyncBagyClient, AsyncGestaoClickClient, async_iter_items
+from incremental_sync import IncrementalProductFeed
+from utils import hash_bagy_payload
+from variacao_bidirectional_synchronizer import build_update_data
+
+
+class AsyncProductSynchronizer:
+    """
+    Asynchronous counterpart of VariacaoBidirectionalSynchronizer.sync_products_from_gestaoclick:
+    every GestãoClick variation becomes an independent Bagy product.
+    """
+
+    def __init__(self, bagy_client, gc_client, product_converter, entity_mapping, sync_history=None,
+                 product_feed=None, concurrency=config.ASYNC_SYNC_CONCURRENCY):
+        """
+        Args:
+            bagy_client (AsyncBagyClient): Bagy client
+            gc_client (AsyncGestaoClickClient): GestãoClick client
+            product_converter (ProductConverter): GestãoClick → Bagy converter
+            entity_mapping (EntityMapping): Mapping storage
+            sync_history (SyncHistory, optional): Hash of the last payload pushed per product
+            product_feed (IncrementalProductFeed, optional): High-water mark of the product sync
+            concurrency (int): GestãoClick products processed at the same time
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.bagy_client = bagy_client
+        self.gc_client = gc_client
+        self.product_converter = product_converter
+        self.entity_mapping = entity_mapping
+        self.sync_history = sync_history
+        self.product_feed = product_feed or IncrementalProductFeed(gc_client)
+        self.concurrency = max(1, concurrency)
+
+    async def _write_bagy_product(self, bagy_product):
+        """
+        Create or update one converted product in Bagy.
+
+        Args:
+            bagy_product (dict): Product converted to the Bagy format
+
+        Returns:
+            bool or None: True if the product was written, None if it was unchanged
+        """
+        external_id = bagy_product.get('external_id')
+        product_name = bagy_product.get('name')
+        payload_hash = hash_bagy_payload(bagy_product)
+        if self.sync_history and not self.sync_history.should_sync('bagy_products', external_id, payload_hash):
+            return None
+
+        existing_product = await self.bagy_client.get_product_by_external_id(external_id)
+
+        if not existing_product:
+            self.logger.info(f"📦 Criando produto na Bagy: {product_name} (external_id: {external_id})")
+            new_product = await self.bagy_client.create_product(bagy_product)
+            if new_product and 'id' in new_product:
+                self.entity_mapping.add_mapping('products', new_product['id'], external_id)
+                self._record_payload(external_id, payload_hash)
+                self.logger.info(f"✅ Produto criado com sucesso: {product_name} (ID: {new_product['id']})")
+                return True
+
+            self.logger.error(f"❌ Falha ao criar produto: {product_name}")
+            return False
+
+        bagy_id = existing_product.get('id')
+        self.logger.info(f"🔄 Atualizando produto: {product_name} (ID: {bagy_id})")
+        updated_product = await self.bagy_client.update_product(bagy_id, build_update_data(bagy_product, existing_product))
+        if updated_product:
+            self._record_payload(external_id, payload_hash)
+            self.logger.info(f"✅ Produto atualizado com sucesso: {product_name} (ID: {bagy_id})")
+            return True
+
+        self.logger.error(f"❌ Falha ao atualizar produto: {product_name} (ID: {bagy_id})")
+        return False
+
+    def _record_payload(self, external_id, payload_hash):
+        """Store the hash of a payload successfully pushed to Bagy."""
+        if self.sync_history:
+            self.sync_history.update_sync('bagy_products', external_id, payload_hash)
+
+    async def _sync_gestaoclick_product(self, gc_product, stats):
+        """
+        Convert one GestãoClick product and write its Bagy products concurrently.
+
+        Args:
+            gc_product (dict): GestãoClick product
+            stats (dict): Run counters, updated in place
+        """
+        bagy_products = self.product_converter.gestaoclick_to_bagy(gc_product) or []
+        if not bagy_products:
+            stats['incomplete'] += 1
+            return
+
+        results = await asyncio.gather(
+            *(self._write_bagy_product(bagy_product) for bagy_product in bagy_products),
+            return_exceptions=True
+        )
+        for bagy_product, result in zip(bagy_products, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"❌ Erro ao processar produto {bagy_product.get('name', 'Desconhecido')}: {str(result)}")
+            if result is True:
+                stats['success'] += 1
+            elif result is None:
+                stats['skipped'] += 1
+            else:
+                stats['errors'] += 1
+
+    async def sync_products_from_gestaoclick(self):
+        """
+        Sync GestãoClick products to Bagy, processing up to `concurrency` products at a time.
+
+        Returns:
+            tuple: (sucesso, erros)
+        """
+        self.logger.info(f"🔄 Iniciando sincronização assíncrona de produtos do GestãoClick para Bagy (concorrência: {self.concurrency})")
+        start_time = time.time()
+
+        await self.bagy_client.warm_lookup_caches()
+        await self.bagy_client.build_product_index()
+
+        stats = {'fetched': 0, 'success': 0, 'skipped': 0, 'errors': 0, 'incomplete': 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        fetch_failed = False
+
+        async def run(gc_product):
+            try:
+                await self._sync_gestaoclick_product(gc_product, stats)
+            except Exception as e:
+                stats['errors'] += 1
+                self.logger.error(f"❌ Erro ao processar produto {gc_product.get('nome', 'Desconhecido')}: {str(e)}")
+            finally:
+                semaphore.release()
+
+        since = self.product_feed.begin()
+
+        async def fetcher(page, limit):
+            return await self.gc_client.get_products(page=page, limit=limit, modified_since=since)
+
+        try:
+            async for gc_product in async_iter_items(fetcher, data_key='data'):
+                if not self.product_feed.accept(gc_product):
+                    continue
+                stats['fetched'] += 1
+                # Aguarda uma vaga antes de criar a tarefa: a leitura do catálogo não passa à frente da escrita
+                await semaphore.acquire()
+                task = asyncio.ensure_future(run(gc_product))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except Exception as e:
+            fetch_failed = True
+            self.logger.error(f"❌ Erro ao buscar produtos do GestãoClick: {str(e)}")
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        self.product_feed.commit(success=not fetch_failed and stats['errors'] == 0)
+
+        errors = stats['errors'] + (1 if fetch_failed else 0)
+        self.logger.info(f"📦 Processados {stats['fetched']} produtos do GestãoClick em {time.time() - start_time:.2f}s")
+        self.logger.info(f"✨ Sincronização de produtos concluída: {stats['success']} escritos, {stats['skipped']} inalterados, {errors} erros, {stats['incomplete']} incompletos")
+        return stats['success'], errors
+
+
+async def _run_product_sync(product_converter, entity_mapping, sync_history, concurrency):
+    async with AsyncBagyClient(config.BAGY_API_KEY) as bagy_client, \
+            AsyncGestaoClickClient(config.GESTAOCLICK_API_KEY, config.GESTAOCLICK_EMAIL) as gc_client:
+        synchronizer = AsyncProductSynchronizer(
+            bagy_client, gc_client, product_converter, entity_mapping,
+            sync_history=sync_history, concurrency=concurrency
+        )
+        return await synchronizer.sync_products_from_gestaoclick()
+
+
+def run_async_product_sync(product_converter, entity_mapping, sync_history=None, concurrency=config.ASYNC_SYNC_CONCURRENCY):
+    """
+    Run the asynchronous product sync from blocking code (CLI, scheduler).
+
+    Args:
+        product_converter (ProductConverter): GestãoClick → Bagy converter
+        entity_mapping (EntityMapping): Mapping storage
+        sync_history (SyncHistory, optional): Hash of the last payload pushed per product
+        concurrency (int): GestãoClick products processed at the same time
+
+    Returns:
+        tuple: (sucesso, erros)
+    """
+    return asyncio.run(_run_product_sync(product_converter, entity_mapping, sync_history, concurrency))
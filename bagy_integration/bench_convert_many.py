@@ -0,0 +1,66 @@
+"""
+Benchmark da conversão GestãoClick → Bagy: gestaoclick_to_bagy em laço x ProductConverter.convert_many.
+Usa o snapshot data/produtos.json, repetido até o número de produtos pedido.
+
+Uso: python bench_convert_many.py [--products 2000] [--workers 4]
+"""
+import argparse
+import itertools
+import logging
+import os
+import time
+
+import config
+from models import ProductConverter
+from snapshot import iter_snapshot
+
+# A conversão registra cada produto; o benchmark mede só a conversão
+logging.disable(logging.CRITICAL)
+
+
+def load_products(path, total):
+    """Repete os produtos do snapshot até `total`, com IDs distintos."""
+    base = list(iter_snapshot(path))
+    products = []
+    for index, product in enumerate(itertools.islice(itertools.cycle(base), total)):
+        products.append({**product, 'id': f"{product.get('id')}-{index}"})
+    return products
+
+
+def run(label, call, total):
+    """Executa `call` e imprime o tempo por produto."""
+    start = time.perf_counter()
+    results = call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {total} produtos em {elapsed:.3f}s  ({elapsed / total * 1000:.3f} ms/produto)")
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da conversão de produtos em lote')
+    parser.add_argument('--products', type=int, default=2000, help='Número de produtos convertidos')
+    parser.add_argument('--workers', type=int, default=config.CONVERT_POOL_WORKERS, help='Processos do pool')
+    parser.add_argument('--snapshot', default=os.path.join(os.path.dirname(__file__), 'data', 'produtos.json'))
+    args = parser.parse_args()
+
+    products = load_products(args.snapshot, args.products)
+    converter = ProductConverter()
+
+    sequential, expected = run(
+        "gestaoclick_to_bagy (laço)",
+        lambda: [converter.gestaoclick_to_bagy(product) for product in products],
+        len(products)
+    )
+    pooled, results = run(
+        f"convert_many ({args.workers} processos)",
+        lambda: converter.convert_many(products, workers=args.workers, min_batch=0),
+        len(products)
+    )
+
+    errors = sum(1 for _, error in results if error)
+    assert [result for result, _ in results] == expected, "convert_many divergiu da conversão sequencial"
+    print(f"Ganho: {sequential / pooled:.2f}x  ({errors} erros)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark da latência por requisição: requests.request avulso x sessão com pool do APIClient.
+Usa um servidor HTTP local como substituto das APIs da Bagy/GestãoClick.
+
+Uso: python bench_http_pool.py [--requests 500]
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from api_clients import APIClient
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("HttpPoolBenchmark")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Responde como uma listagem de produtos vazia, mantendo a conexão aberta (HTTP/1.1)."""
+    protocol_version = "HTTP/1.1"
+    # Evita o atraso de Nagle + ACK atrasado entre cabeçalhos e corpo em conexões reaproveitadas
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"data": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(label, call, total):
+    """Executa `call` `total` vezes e imprime a latência média."""
+    start = time.perf_counter()
+    for _ in range(total):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {total} requisições em {elapsed:.3f}s  ({elapsed / total * 1000:.3f} ms/req)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de conexões HTTP com pool')
+    parser.add_argument('--requests', type=int, default=500, help='Número de requisições por modo')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        unpooled = run(
+            "requests.request (sem pool)",
+            lambda: requests.request("GET", f"{base_url}/products").json(),
+            args.requests
+        )
+
+        with APIClient(base_url) as client:
+            pooled = run(
+                "APIClient._make_request (pool)",
+                lambda: client._make_request("GET", "/products"),
+                args.requests
+            )
+
+        print(f"Ganho: {unpooled / pooled:.2f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
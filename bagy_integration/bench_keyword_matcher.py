@@ -0,0 +1,90 @@
+"""
+Microbenchmark da detecção de cores/palavras-chave: testes de substring por palavra x KeywordMatcher.
+Classifica o nome de todas as variações (e dos produtos) do snapshot data/produtos.json.
+
+Uso: python bench_keyword_matcher.py [--rounds 200]
+"""
+import argparse
+import os
+import time
+
+from keyword_matcher import COLOR_KEYWORDS, NAME_KEYWORDS, SPECIAL_PRODUCT_KEYWORDS, normalize
+from snapshot import iter_snapshot
+
+
+def load_names(path):
+    """Nomes das variações e dos produtos do snapshot."""
+    names = []
+    for product in iter_snapshot(path):
+        names.append(product.get('nome') or '')
+        for var_item in product.get('variacoes') or []:
+            var = var_item.get('variacao', var_item)
+            names.append(var.get('nome') or '')
+    return names
+
+
+def classify_substrings(name):
+    """Laço anterior: um teste de substring por palavra-chave, sem remover acentos."""
+    lowered = name.lower()
+    found = {}
+    for color in COLOR_KEYWORDS:
+        if color in lowered:
+            found['color'] = color
+            break
+    for keyword in SPECIAL_PRODUCT_KEYWORDS:
+        if keyword in lowered:
+            found['special'] = keyword
+            break
+    return found
+
+
+# Mesmo laço sobre texto e palavras sem acento (comparação equivalente ao KeywordMatcher)
+_FOLDED_COLORS = tuple(normalize(keyword) for keyword in COLOR_KEYWORDS)
+_FOLDED_SPECIAL = tuple(normalize(keyword) for keyword in SPECIAL_PRODUCT_KEYWORDS)
+
+
+def classify_folded_substrings(name):
+    """Laço de substrings com remoção de acentos."""
+    folded = normalize(name)
+    found = {}
+    for color in _FOLDED_COLORS:
+        if color in folded:
+            found['color'] = color
+            break
+    for keyword in _FOLDED_SPECIAL:
+        if keyword in folded:
+            found['special'] = keyword
+            break
+    return found
+
+
+def run(label, classify, names, rounds):
+    """Classifica todos os nomes `rounds` vezes e imprime o tempo por nome."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            classify(name)
+    elapsed = time.perf_counter() - start
+    total = len(names) * rounds
+    print(f"{label:<28} {total} nomes em {elapsed:.3f}s  ({elapsed / total * 1e6:.2f} µs/nome)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark do KeywordMatcher')
+    parser.add_argument('--rounds', type=int, default=200, help='Repetições sobre todos os nomes')
+    parser.add_argument('--snapshot', default=os.path.join(os.path.dirname(__file__), 'data', 'produtos.json'))
+    args = parser.parse_args()
+
+    names = load_names(args.snapshot)
+    hits = sum(1 for name in names if NAME_KEYWORDS.classify(name))
+    print(f"{len(names)} nomes, {hits} com alguma palavra-chave")
+
+    substrings = run("substring por palavra", classify_substrings, names, args.rounds)
+    folded = run("substring sem acentos", classify_folded_substrings, names, args.rounds)
+    matcher = run("KeywordMatcher.classify", NAME_KEYWORDS.classify, names, args.rounds)
+    print(f"Ganho: {substrings / matcher:.2f}x (sem acentos: {folded / matcher:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
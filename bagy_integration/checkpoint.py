@@ -0,0 +1,380 @@
+"""
+Checkpoints for resumable sync runs.
+
+A run reads a paginated source and processes items out of order in pipeline
+workers. RunCheckpoint tracks which pages have been processed completely and,
+every SYNC_CHECKPOINT_INTERVAL_SECONDS, persists the run id, the last completed
+page/id, the items still in flight and the items that failed. When the process
+dies or is restarted, the next run resumes after the last completed page instead
+of from page 1; the writes that were in flight are replayed, and the caller makes
+them idempotent by looking the item up by external_id before creating it. Failed
+items are fetched again and re-queued, since their pages count as completed.
+
+A fan-out stage (one GestãoClick product converted into one Bagy product per
+variation) splits an item into parts; the item is done once all its parts are.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import config
+from storage import SyncCheckpoints
+
+
+class RunCheckpoint:
+    """
+    Tracks the progress of one run and persists it as a checkpoint.
+
+    Usage:
+        checkpoint = RunCheckpoint('products_to_bagy', flush=(entity_mapping, sync_history))
+        resume = checkpoint.begin(window=feed.window_state)
+        items = feed.iter_products(resume=resume and resume['window'], start_page=checkpoint.start_page)
+        pipeline.add_stage("write", checkpoint.tracked(write, 'write', writes=True))
+        source = itertools.chain(checkpoint.track(items, lambda: feed.page), checkpoint.requeued(fetch_one))
+        stats = pipeline.run(source)
+        checkpoint.finish(interrupted=stats['fetch']['errors'] > 0)
+    """
+
+    def __init__(self, entity, checkpoints=None, flush=(), interval=config.SYNC_CHECKPOINT_INTERVAL_SECONDS,
+                 enabled=config.SYNC_CHECKPOINT_ENABLED, retry_stages=('diff', 'write')):
+        """
+        Args:
+            entity (str): Entity name of the run (e.g. 'products_to_bagy')
+            checkpoints (SyncCheckpoints, optional): Checkpoint storage
+            flush (iterable): Stores with a flush() method written before each checkpoint,
+                so the checkpoint never claims work whose results were not persisted
+            interval (float): Minimum seconds between two checkpoint writes
+            enabled (bool): Persist and resume checkpoints (tracking still runs when disabled)
+            retry_stages (tuple): Stages whose failed items are re-queued by the next run
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.entity = entity
+        self.checkpoints = checkpoints or SyncCheckpoints()
+        self.flush_stores = tuple(flush)
+        self.interval = interval
+        self.enabled = enabled
+        self.retry_stages = frozenset(retry_stages)
+
+        self.run_id = None
+        self.start_page = 1
+        self.completed_page = 0
+        self.last_id = None
+        self.processed = 0
+        self.errors = {}
+        self.replay_ids = frozenset()
+        self.failed = {}
+        self._retry_ids = set()
+        self._started_at = None
+        self._window = None
+        self._reading_page = 1
+        self._reading_done = False
+        self._pages = {}
+        self._last_ids = {}
+        self._in_flight = {}
+        # Partes geradas por uma etapa fan-out -> item de origem
+        self._parts = {}
+        self._last_save = time.monotonic()
+        self._lock = threading.RLock()
+
+    def begin(self, window):
+        """
+        Start a run, resuming the entity's checkpoint when one is recent enough.
+
+        Args:
+            window (callable): Returns the source's resumable state (e.g. feed.window_state),
+                saved with every checkpoint
+
+        Returns:
+            dict or None: The checkpoint being resumed, None for a new run
+        """
+        self._window = window
+        resumed = self.checkpoints.get(self.entity) if self.enabled else None
+
+        if resumed and not self._is_fresh(resumed):
+            self.logger.warning(f"⚠️ Checkpoint de '{self.entity}' expirado, iniciando nova execução")
+            resumed = None
+
+        if resumed:
+            self.run_id = resumed['run_id']
+            self._started_at = resumed.get('started_at')
+            self.completed_page = int(resumed.get('completed_page') or 0)
+            self.last_id = resumed.get('last_id')
+            self.processed = int(resumed.get('processed') or 0)
+            self.errors = dict(resumed.get('errors') or {})
+            self.replay_ids = frozenset(str(item_id) for item_id in resumed.get('in_flight_writes') or [])
+            # Falhas continuam pendentes até que uma nova tentativa tenha sucesso
+            self.failed = dict(resumed.get('failed') or {})
+            self._retry_ids = set(self.failed)
+            self.logger.info(
+                f"⏯️ Retomando execução {self.run_id} de '{self.entity}' após a página {self.completed_page} "
+                f"(último ID: {self.last_id}, {len(self.replay_ids)} escritas em andamento a repetir, "
+                f"{len(self._retry_ids)} itens com falha a reprocessar)"
+            )
+        else:
+            self.run_id = uuid.uuid4().hex
+            self._started_at = datetime.now().isoformat()
+
+        self.start_page = self.completed_page + 1
+        self._reading_page = self.start_page
+        if self.enabled:
+            self.save()
+        return resumed
+
+    def _is_fresh(self, checkpoint):
+        """Whether a checkpoint was saved less than SYNC_CHECKPOINT_MAX_AGE_HOURS ago."""
+        try:
+            saved_at = datetime.fromisoformat(checkpoint['saved_at'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return datetime.now() - saved_at < timedelta(hours=config.SYNC_CHECKPOINT_MAX_AGE_HOURS)
+
+    def track(self, items, position):
+        """
+        Register every item read from the source with the page it came from.
+
+        Args:
+            items (iterable): Source items (dicts with an 'id')
+            position (callable): Returns the page of the item just read
+
+        Yields:
+            dict: The source items, unchanged
+        """
+        for item in items:
+            page = position()
+            with self._lock:
+                if page != self._reading_page:
+                    self._reading_page = page
+                    self._advance()
+                self._pages[page] = self._pages.get(page, 0) + 1
+                self._last_ids[page] = item.get('id')
+                self._in_flight[id(item)] = {'page': page, 'id': item.get('id'), 'writing': False}
+                # Relido nas páginas retomadas: não precisa ser buscado de novo
+                self._retry_ids.discard(str(item.get('id')))
+            yield item
+
+        with self._lock:
+            self._reading_done = True
+            self._advance()
+
+    def requeued(self, fetch):
+        """
+        Fetch again the items that failed before the interruption, on pages already completed.
+
+        Meant to be chained after track(): items re-read by the resumed pages are not
+        fetched twice. Re-queued items do not hold any page back.
+
+        Args:
+            fetch (callable): fetch(item_id) -> item dict or None
+
+        Yields:
+            dict: Items to process again
+        """
+        with self._lock:
+            retry_ids = sorted(self._retry_ids)
+            self._retry_ids = set()
+
+        if retry_ids:
+            self.logger.info(f"🔁 Reprocessando {len(retry_ids)} itens com falha na execução interrompida")
+
+        for item_id in retry_ids:
+            try:
+                item = fetch(item_id)
+            except Exception as e:
+                # Mantido em self.failed: será tentado de novo na próxima retomada
+                self.logger.warning(f"Erro ao buscar item {item_id} para reprocessamento: {str(e)}")
+                continue
+            if not item:
+                # O item não existe mais na origem
+                with self._lock:
+                    self.failed.pop(item_id, None)
+                continue
+            with self._lock:
+                self._in_flight[id(item)] = {'page': 0, 'id': item.get('id'), 'writing': False}
+            yield item
+
+    def tracked(self, func, stage, source_of=None, writes=False, fan_out=False):
+        """
+        Wrap a pipeline stage function so finished items are counted as done.
+
+        An item is done when a stage drops it (returns None), fails, or passes the
+        last stage (writes=True). A write stage returning None counts as a failed write.
+
+        Args:
+            func (callable): Stage function
+            stage (str): Stage name, used to count failures
+            source_of (callable, optional): Returns the source item (or part) carried by the stage input
+            writes (bool): Whether this is the write stage, the last one of the run
+            fan_out (bool): Whether func returns a list of parts of its input item
+
+        Returns:
+            callable: Wrapped stage function
+        """
+        def run(item):
+            source = source_of(item) if source_of else item
+            if writes:
+                self._mark_writing(source)
+            try:
+                result = func(item)
+            except Exception:
+                self._done(source, failed_stage=stage)
+                raise
+            if fan_out and result is not None:
+                result = list(result)
+                self._split(source, result)
+            elif writes and result is None:
+                self._done(source, failed_stage=stage)
+            elif result is None or writes:
+                self._done(source)
+            return result
+        return run
+
+    def is_replayed(self, item):
+        """
+        Whether the write of an item (or of the item a part belongs to) was in flight
+        when the previous run was interrupted.
+
+        Args:
+            item (dict): Source item or part
+
+        Returns:
+            bool: True if the write may have completed without being recorded
+        """
+        with self._lock:
+            source = self._parts.get(id(item), item)
+        return str(source.get('id')) in self.replay_ids
+
+    def has_failures(self, stages=None):
+        """
+        Whether items of the run (including the interrupted part) are still failed.
+
+        Args:
+            stages (iterable, optional): Only consider these stages (default: retry_stages)
+
+        Returns:
+            bool: True if any failed item was not processed successfully since
+        """
+        stages = frozenset(stages) if stages else self.retry_stages
+        with self._lock:
+            return any(stage in stages for stage in self.failed.values())
+
+    def _mark_writing(self, part):
+        """Flag an item whose write is in progress (replayed on resume)."""
+        with self._lock:
+            entry = self._in_flight.get(id(self._parts.get(id(part), part)))
+            if entry:
+                entry['writing'] = True
+
+    def _split(self, source, parts):
+        """Register the parts a fan-out stage produced from an item (none: the item is done)."""
+        with self._lock:
+            entry = self._in_flight.get(id(source))
+            if entry:
+                entry['parts'] = len(parts)
+            for part in parts:
+                self._parts[id(part)] = source
+        if not parts:
+            self._done(source)
+
+    def _done(self, part, failed_stage=None):
+        """Count an item (or one of its parts) as finished and save a checkpoint when the interval has elapsed."""
+        with self._lock:
+            source = self._parts.pop(id(part), part)
+            if failed_stage:
+                self.errors[failed_stage] = self.errors.get(failed_stage, 0) + 1
+            entry = self._in_flight.get(id(source))
+            if entry:
+                entry['failed_stage'] = entry.get('failed_stage') or failed_stage
+                entry['parts'] = entry.get('parts', 1) - 1
+                if entry['parts'] > 0:
+                    # Ainda há partes do item em andamento
+                    return
+                del self._in_flight[id(source)]
+                failed_stage = entry['failed_stage']
+                if entry['page']:
+                    self._pages[entry['page']] -= 1
+            item_id = str(source.get('id'))
+            if failed_stage in self.retry_stages:
+                self.failed[item_id] = failed_stage
+            else:
+                self.failed.pop(item_id, None)
+            self.processed += 1
+            self._advance()
+            due = self.enabled and time.monotonic() - self._last_save >= self.interval
+
+        if due:
+            self.save()
+
+    def _advance(self):
+        """Move completed_page over every fully read page without items left in flight."""
+        while True:
+            page = self.completed_page + 1
+            if not self._reading_done and page >= self._reading_page:
+                return
+            if self._reading_done and page > max(self._pages, default=0):
+                return
+            if self._pages.get(page):
+                return
+            self._pages.pop(page, None)
+            self.completed_page = page
+            self.last_id = self._last_ids.pop(page, self.last_id)
+
+    def save(self):
+        """Persist the checkpoint (after flushing the stores holding the run's results)."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for store in self.flush_stores:
+                try:
+                    store.flush()
+                except Exception as e:
+                    self.logger.warning(f"Erro ao gravar dados antes do checkpoint: {str(e)}")
+
+            in_flight = list(self._in_flight.values())
+            state = {
+                'run_id': self.run_id,
+                'entity': self.entity,
+                'started_at': self._started_at,
+                'saved_at': datetime.now().isoformat(),
+                'window': self._window() if self._window else None,
+                'completed_page': self.completed_page,
+                'last_id': self.last_id,
+                'processed': self.processed,
+                'errors': dict(self.errors),
+                # Itens com falha em páginas já concluídas: re-enfileirados pela próxima retomada
+                'failed': dict(self.failed),
+                'in_flight': [entry['id'] for entry in in_flight],
+                # Escritas ainda não confirmadas nesta execução e as herdadas da execução anterior
+                'in_flight_writes': sorted(
+                    {str(entry['id']) for entry in in_flight if entry['writing']} | set(self.replay_ids)
+                )
+            }
+            self.checkpoints.save(self.entity, state)
+            self._last_save = time.monotonic()
+
+        self.logger.debug(
+            f"💾 Checkpoint {self.run_id} de '{self.entity}': página {state['completed_page']} concluída, "
+            f"{len(state['in_flight'])} itens em andamento"
+        )
+
+    def finish(self, interrupted=False):
+        """
+        End the run: keep the checkpoint if reading the source was interrupted, remove it otherwise.
+
+        Failed items are left to the next run, which requests the same window
+        again since the high-water mark does not advance (see has_failures).
+
+        Args:
+            interrupted (bool): Whether the source stopped before its end (e.g. a fetch error)
+        """
+        if not self.enabled:
+            return
+        if interrupted:
+            self.save()
+            self.logger.warning(
+                f"⚠️ Execução {self.run_id} de '{self.entity}' interrompida na página {self.completed_page}, "
+                f"a próxima execução continua a partir daqui"
+            )
+        else:
+            self.checkpoints.clear(self.entity)
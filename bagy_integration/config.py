@@ -22,13 +22,81 @@ GESTAOCLICK_BASE_URL = os.getenv("GESTAOCLICK_BASE_URL", "https://api.beteltecno
 # Sync settings
 SYNC_INTERVAL_MINUTES = int(os.getenv("SYNC_INTERVAL_MINUTES", "60"))  # Default to hourly sync
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
-RETRY_DELAY_SECONDS = int(os.getenv("RETRY_DELAY_SECONDS", "30"))
+RETRY_DELAY_SECONDS = float(os.getenv("RETRY_DELAY_SECONDS", "2"))  # Base do backoff exponencial com jitter
+PAGINATION_PREFETCH_PAGES = int(os.getenv("PAGINATION_PREFETCH_PAGES", "2"))  # Páginas buscadas à frente durante a paginação
+
+# Product sync pipeline settings (fetch → convert → diff → write)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))  # Itens em espera entre etapas (backpressure)
+PIPELINE_CONVERT_WORKERS = int(os.getenv("PIPELINE_CONVERT_WORKERS", "1"))
+PIPELINE_DIFF_WORKERS = int(os.getenv("PIPELINE_DIFF_WORKERS", "4"))
+PIPELINE_WRITE_WORKERS = int(os.getenv("PIPELINE_WRITE_WORKERS", "4"))
+CONVERT_POOL_WORKERS = int(os.getenv("CONVERT_POOL_WORKERS", str(os.cpu_count() or 1)))  # Processos da conversão em lote (convert_many)
+CONVERT_POOL_MIN_BATCH = int(os.getenv("CONVERT_POOL_MIN_BATCH", "5000"))  # Lotes menores são convertidos no próprio processo
+SYNC_ALL_PARALLEL = os.getenv("SYNC_ALL_PARALLEL", "true").lower() in ("1", "true", "yes")  # Produtos em paralelo com clientes/pedidos
+SYNC_DEPENDENCY_TIMEOUT_SECONDS = float(os.getenv("SYNC_DEPENDENCY_TIMEOUT_SECONDS", "900"))  # Espera máxima de um pedido pelo seu cliente
+ASYNC_SYNC_CONCURRENCY = int(os.getenv("ASYNC_SYNC_CONCURRENCY", "16"))  # Produtos processados simultaneamente na sincronização assíncrona
+
+# Incremental product sync settings (high-water mark on GestãoClick 'modificado_em')
+INCREMENTAL_SYNC_ENABLED = os.getenv("INCREMENTAL_SYNC_ENABLED", "true").lower() in ("1", "true", "yes")
+FULL_SYNC_INTERVAL_HOURS = float(os.getenv("FULL_SYNC_INTERVAL_HOURS", "24"))  # Reconciliação completa periódica
+INCREMENTAL_SYNC_OVERLAP_SECONDS = int(os.getenv("INCREMENTAL_SYNC_OVERLAP_SECONDS", "300"))  # Margem para relógios/edições no mesmo segundo
+GESTAOCLICK_MODIFIED_SINCE_PARAM = os.getenv("GESTAOCLICK_MODIFIED_SINCE_PARAM", "alterado_apos")
+
+# Windowed Bagy order sync (cursor on 'updated_at' + sweep of open orders)
+BAGY_ORDERS_UPDATED_SINCE_PARAM = os.getenv("BAGY_ORDERS_UPDATED_SINCE_PARAM", "updated_at_min")
+BAGY_ORDERS_STATUS_PARAM = os.getenv("BAGY_ORDERS_STATUS_PARAM", "status")
+BAGY_OPEN_ORDER_STATUSES = [status.strip() for status in os.getenv("BAGY_OPEN_ORDER_STATUSES", "pending,approved,attended").split(",") if status.strip()]
+OPEN_ORDERS_SWEEP_INTERVAL_MINUTES = int(os.getenv("OPEN_ORDERS_SWEEP_INTERVAL_MINUTES", "60"))  # Releitura dos pedidos em aberto (mudanças de status)
+ORDER_CUSTOMER_WORKERS = int(os.getenv("ORDER_CUSTOMER_WORKERS", "4"))  # Clientes dos pedidos resolvidos em paralelo (1 = sequencial)
+
+# Resumable product sync runs (checkpoint of the GestãoClick → Bagy pipeline)
+SYNC_CHECKPOINT_ENABLED = os.getenv("SYNC_CHECKPOINT_ENABLED", "true").lower() in ("1", "true", "yes")
+SYNC_CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("SYNC_CHECKPOINT_INTERVAL_SECONDS", "30"))  # Intervalo entre gravações do checkpoint
+SYNC_CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("SYNC_CHECKPOINT_MAX_AGE_HOURS", "24"))  # Checkpoints mais antigos são descartados
+
+# HTTP connection settings
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # Conexões mantidas por host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_KEEP_ALIVE = os.getenv("HTTP_KEEP_ALIVE", "true").lower() in ("1", "true", "yes")
+HTTP_MAX_CONCURRENCY_PER_HOST = int(os.getenv("HTTP_MAX_CONCURRENCY_PER_HOST", "4"))  # Requisições simultâneas por host
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "60"))  # Teto da espera entre tentativas
+
+# Rate limit settings (token bucket shared by every client of the same host)
+BAGY_RATE_LIMIT_PER_SECOND = float(os.getenv("BAGY_RATE_LIMIT_PER_SECOND", "5"))
+GESTAOCLICK_RATE_LIMIT_PER_SECOND = float(os.getenv("GESTAOCLICK_RATE_LIMIT_PER_SECOND", "3"))
+HTTP_RATE_LIMIT_BURST = int(os.getenv("HTTP_RATE_LIMIT_BURST", "5"))  # Requisições permitidas em rajada
+
+# Bagy product creation settings
+BAGY_VARIATION_WORKERS = int(os.getenv("BAGY_VARIATION_WORKERS", "4"))  # Variações criadas em paralelo (1 = sequencial)
+BAGY_REFETCH_AFTER_CREATE = os.getenv("BAGY_REFETCH_AFTER_CREATE", "false").lower() in ("1", "true", "yes")
+
+# Product snapshot exporter settings (GestãoClick → data/produtos.json)
+SNAPSHOT_VARIATION_WORKERS = int(os.getenv("SNAPSHOT_VARIATION_WORKERS", "4"))  # Produtos com variações buscadas em paralelo
 
 # Data storage settings
 STORAGE_DIR = os.getenv("STORAGE_DIR", "./data")
 SYNC_HISTORY_FILE = os.path.join(STORAGE_DIR, "sync_history.json")
 ENTITY_MAPPING_FILE = os.path.join(STORAGE_DIR, "entity_mapping.json")
 INCOMPLETE_PRODUCTS_FILE = os.path.join(STORAGE_DIR, "incomplete_products.json")
+PRODUCT_INDEX_FILE = os.path.join(STORAGE_DIR, "product_index.json")
+CUSTOMER_INDEX_FILE = os.path.join(STORAGE_DIR, "customer_index.json")
+SYNC_CURSORS_FILE = os.path.join(STORAGE_DIR, "sync_cursors.json")
+SYNC_CHECKPOINTS_FILE = os.path.join(STORAGE_DIR, "sync_checkpoints.json")
+COLOR_CACHE_FILE = os.path.join(STORAGE_DIR, "color_cache.json")
+CATEGORY_CACHE_FILE = os.path.join(STORAGE_DIR, "category_cache.json")
+PRODUCT_SNAPSHOT_FILE = os.path.join(STORAGE_DIR, "produtos.json")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()  # 'json' ou 'sqlite'
+SQLITE_DB_FILE = os.getenv("SQLITE_DB_FILE", os.path.join(STORAGE_DIR, "sync.db"))
+
+# Storage journal settings (append-only log compacted into the JSON snapshot)
+STORAGE_JOURNAL_BATCH_SIZE = int(os.getenv("STORAGE_JOURNAL_BATCH_SIZE", "50"))  # Registros por gravação em lote
+STORAGE_JOURNAL_FLUSH_SECONDS = float(os.getenv("STORAGE_JOURNAL_FLUSH_SECONDS", "5"))  # Tempo máximo entre gravações
+
+# Catalog index settings (external_id/SKU -> Bagy product)
+PRODUCT_INDEX_MAX_AGE_MINUTES = int(os.getenv("PRODUCT_INDEX_MAX_AGE_MINUTES", "60"))  # Rebuild from Bagy after this age
+CUSTOMER_INDEX_MAX_AGE_MINUTES = int(os.getenv("CUSTOMER_INDEX_MAX_AGE_MINUTES", "360"))  # Recarregar clientes do GestãoClick após este tempo
+LOOKUP_CACHE_TTL_MINUTES = int(os.getenv("LOOKUP_CACHE_TTL_MINUTES", "360"))  # Cores e categorias: recarregar da Bagy após este tempo
 
 # Logging settings
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
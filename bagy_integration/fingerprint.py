@@ -0,0 +1,156 @@
+"""
+Canonical entity fingerprints used to detect changes between sync runs.
+
+A fingerprint hashes only the fields a sync actually reads for an entity type,
+with volatile fields (timestamps, view counters) removed at every nesting level,
+so that a new 'updated_at' or a page view never triggers a resync. The
+projection is encoded as canonical JSON (sorted keys, no whitespace) and hashed
+with a 128-bit BLAKE2b digest, which is fast and needs no extra dependency.
+"""
+import base64
+import hashlib
+import json
+
+# Tamanho do digest em bytes (128 bits)
+DIGEST_SIZE = 16
+
+# Campos que mudam sem alterar o que é sincronizado
+VOLATILE_FIELDS = frozenset({
+    'updated_at', 'modified_at', 'last_modified', 'modificado_em', 'alterado_em',
+    'data_alteracao', 'cadastrado_em', 'synced_at', 'indexed_at',
+    'views', 'view_count', 'visits', 'visualizacoes'
+})
+
+# Campos relevantes para a sincronização, por tipo de entidade; tipos ausentes usam a entidade inteira.
+# Um campo pode ter a tupla dos subcampos relevantes dos seus itens (ex.: itens de pedido),
+# o que evita percorrer e codificar campos que a sincronização nunca lê.
+ENTITY_FIELDS = {
+    'gestaoclick_products': {
+        'id': None, 'nome': None, 'codigo_interno': None, 'codigo_barra': None, 'descricao': None,
+        'ativo': None, 'valor_venda': None, 'preco_venda': None, 'valores': None, 'estoque': None,
+        'peso': None, 'altura': None, 'largura': None, 'comprimento': None, 'profundidade': None,
+        'grupo_id': None, 'nome_grupo': None, 'ncm': None, 'fiscal': None, 'imagem_url': None,
+        'fotos': None, 'possui_variacao': None, 'variacoes': None, 'atributos': None,
+    },
+    'bagy_products': {
+        'id': None, 'external_id': None, 'name': None, 'sku': None, 'reference': None, 'code': None,
+        'gtin': None, 'description': None, 'active': None, 'price': None, 'price_compare': None,
+        'balance': None, 'height': None, 'width': None, 'depth': None, 'weight': None, 'ncm': None,
+        'category_default': ('id', 'name'),
+        'variations': ('active', 'balance', 'code', 'color_id', 'external_id', 'gtin', 'id',
+                       'price', 'price_compare', 'reference', 'sku'),
+    },
+    'bagy_customers': {
+        'id': None, 'name': None, 'first_name': None, 'last_name': None, 'email': None, 'phone': None,
+        'cgc': None, 'entity': None, 'company': None, 'ie': None, 'birthday': None,
+        'address': ('city', 'detail', 'district', 'number', 'state', 'street', 'zipcode'),
+    },
+    'bagy_orders': {
+        'id': None, 'code': None, 'status': None, 'total': None, 'created_at': None,
+        'customer': ('cgc', 'email', 'id', 'name', 'phone'),
+        'items': ('id', 'name', 'price', 'quantity', 'reference', 'sku', 'total'),
+        'payment': None,
+        'address': ('city', 'detail', 'district', 'number', 'state', 'street', 'zipcode'),
+        'fulfillment': ('nfe_number', 'shipping_code', 'shipping_track_url'),
+    },
+}
+
+
+def _strip_volatile(value):
+    """Return value without volatile keys in any nested dict."""
+    if isinstance(value, dict):
+        return {key: _strip_volatile(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    return value
+
+
+def _project_nested(value, subfields):
+    """Keep only `subfields` of a dict, or of every dict in a list."""
+    if isinstance(value, dict):
+        return {field: value[field] for field in subfields if field in value}
+    if isinstance(value, list):
+        return [_project_nested(item, subfields) for item in value]
+    return value
+
+
+def project(entity, entity_type=None, fields=None):
+    """
+    Project an entity onto its sync-relevant fields.
+
+    Args:
+        entity (dict): API payload
+        entity_type (str, optional): Key of ENTITY_FIELDS
+        fields (iterable or dict, optional): Explicit field list or spec (overrides entity_type)
+
+    Returns:
+        dict: Projection without volatile fields
+    """
+    spec = fields or ENTITY_FIELDS.get(entity_type)
+    if spec is None:
+        return _strip_volatile(entity)
+    if not isinstance(spec, dict):
+        spec = dict.fromkeys(spec)
+
+    projection = {}
+    for field, subfields in spec.items():
+        if field in entity:
+            value = entity[field]
+            projection[field] = _project_nested(value, subfields) if subfields else _strip_volatile(value)
+    return projection
+
+
+def canonical_bytes(value):
+    """
+    Encode a value as canonical JSON (sorted keys, compact separators, UTF-8).
+
+    Args:
+        value: JSON-compatible value; unknown types are encoded with str()
+
+    Returns:
+        bytes: Canonical encoding
+    """
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+
+def fingerprint(entity, entity_type=None, fields=None):
+    """
+    Compute the binary fingerprint of an entity.
+
+    Args:
+        entity (dict): API payload
+        entity_type (str, optional): Key of ENTITY_FIELDS
+        fields (iterable, optional): Explicit field list (overrides entity_type)
+
+    Returns:
+        bytes: 16-byte digest
+    """
+    return hashlib.blake2b(canonical_bytes(project(entity, entity_type, fields)), digest_size=DIGEST_SIZE).digest()
+
+
+def encode_digest(digest):
+    """
+    Encode a binary digest as compact text for JSON/SQLite storage.
+
+    Args:
+        digest (bytes): Binary digest
+
+    Returns:
+        str: URL-safe base64 without padding (22 characters for 16 bytes)
+    """
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def entity_version(entity, entity_type=None, fields=None):
+    """
+    Compute the stored version string of an entity.
+
+    Args:
+        entity (dict): API payload
+        entity_type (str, optional): Key of ENTITY_FIELDS
+        fields (iterable, optional): Explicit field list (overrides entity_type)
+
+    Returns:
+        str: Compact fingerprint, equal for payloads that differ only in volatile or ignored fields
+    """
+    return encode_digest(fingerprint(entity, entity_type, fields))
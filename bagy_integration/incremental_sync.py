@@ -0,0 +1,384 @@
+"""
+Incremental feeds for GestãoClick → Bagy product syncs and Bagy → GestãoClick order syncs.
+
+Instead of crawling the whole catalog on every scheduled run, only products
+changed after the persisted high-water mark ('modificado_em') are requested.
+A full reconciliation crawl still runs every FULL_SYNC_INTERVAL_HOURS as a
+safety net for changes the filter cannot see (e.g. deletions or clock skew).
+
+Orders only grow, so the order feed reads the window after its own mark
+('updated_at' + id) and, at a lower frequency, re-reads only the orders that
+are still open to catch status changes. Closed orders are never re-read.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+import config
+from storage import SyncCursors
+from utils import Pagination
+
+# Formato de 'modificado_em' na API do GestãoClick
+GESTAOCLICK_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Produtos por página na listagem do GestãoClick
+PRODUCT_PAGE_SIZE = 100
+
+
+class IncrementalProductFeed:
+    """
+    Yields the GestãoClick products a sync run has to look at and advances the
+    high-water mark once the run has finished without errors.
+
+    Usage:
+        feed = IncrementalProductFeed(gc_client)
+        stats = pipeline.run(feed.iter_products())
+        feed.commit(success=errors == 0)
+    """
+
+    def __init__(self, gc_client, cursors=None, cursor_name='gestaoclick_products'):
+        """
+        Args:
+            gc_client (GestaoClickClient): GestãoClick API client
+            cursors (SyncCursors, optional): Cursor storage
+            cursor_name (str): Name of the cursor holding this feed's high-water mark
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.gc_client = gc_client
+        self.cursors = cursors or SyncCursors()
+        self.cursor_name = cursor_name
+        self.full_sync = True
+        self.since = None
+        self.page = None
+        self._started_at = None
+        self._max_modified = None
+
+    def is_full_sync_due(self):
+        """
+        Check whether the next run has to crawl the whole catalog.
+
+        Returns:
+            bool: True if incremental sync is disabled, no mark exists yet or the
+                last full crawl is older than FULL_SYNC_INTERVAL_HOURS
+        """
+        if not config.INCREMENTAL_SYNC_ENABLED:
+            return True
+
+        cursor = self.cursors.get(self.cursor_name)
+        if not cursor.get('modified_since') or not cursor.get('last_full_sync'):
+            return True
+
+        try:
+            last_full_sync = datetime.fromisoformat(cursor['last_full_sync'])
+        except ValueError:
+            return True
+        return datetime.now() - last_full_sync >= timedelta(hours=config.FULL_SYNC_INTERVAL_HOURS)
+
+    def begin(self, force_full=False):
+        """
+        Start a run: decide between incremental and full sync and compute the query window.
+
+        Args:
+            force_full (bool): Crawl the whole catalog regardless of the mark
+
+        Returns:
+            str or None: 'modificado_em' lower bound to request, None for a full crawl
+        """
+        self._started_at = datetime.now()
+        self._max_modified = None
+        self.full_sync = force_full or self.is_full_sync_due()
+        self.since = None
+
+        if not self.full_sync:
+            mark = datetime.strptime(self.cursors.get(self.cursor_name)['modified_since'], GESTAOCLICK_DATETIME_FORMAT)
+            # Margem de segurança: edições no mesmo segundo ou relógios dessincronizados
+            self.since = (mark - timedelta(seconds=config.INCREMENTAL_SYNC_OVERLAP_SECONDS)).strftime(GESTAOCLICK_DATETIME_FORMAT)
+            self.logger.info(f"⏩ Sincronização incremental: produtos alterados desde {self.since}")
+        else:
+            self.logger.info("🔁 Sincronização completa do catálogo (reconciliação)")
+        return self.since
+
+    def window_state(self):
+        """
+        Describe the current run's query window, so an interrupted run can be resumed.
+
+        Returns:
+            dict: since, full_sync, started_at and max_modified
+        """
+        return {
+            'since': self.since,
+            'full_sync': self.full_sync,
+            'started_at': self._started_at.isoformat() if self._started_at else None,
+            'max_modified': self._max_modified
+        }
+
+    def restore(self, state):
+        """
+        Resume the query window of an interrupted run instead of starting a new one.
+
+        Args:
+            state (dict): Window saved by window_state()
+
+        Returns:
+            str or None: 'modificado_em' lower bound to request, None for a full crawl
+        """
+        self.since = state.get('since')
+        self.full_sync = bool(state.get('full_sync'))
+        self._started_at = datetime.fromisoformat(state['started_at']) if state.get('started_at') else datetime.now()
+        self._max_modified = state.get('max_modified')
+        self.logger.info(f"⏯️ Retomando janela da execução interrompida (desde: {self.since or 'catálogo completo'})")
+        return self.since
+
+    def accept(self, product):
+        """
+        Record a fetched product's 'modificado_em' and tell whether it belongs to this run.
+
+        Args:
+            product (dict): GestãoClick product
+
+        Returns:
+            bool: False if the product is older than the query window
+        """
+        modified = product.get('modificado_em')
+        if modified and (self._max_modified is None or modified > self._max_modified):
+            self._max_modified = modified
+
+        # Filtro local: garante o comportamento mesmo se a API ignorar o parâmetro
+        return not (self.since and modified and modified < self.since)
+
+    def iter_products(self, force_full=False, resume=None, start_page=1):
+        """
+        Yield the products changed since the high-water mark, or the whole catalog
+        when a full reconciliation is due.
+
+        While a product is being consumed, self.page holds the page it was read from.
+
+        Args:
+            force_full (bool): Crawl the whole catalog regardless of the mark
+            resume (dict, optional): Window of an interrupted run (see window_state)
+            start_page (int): First page to read (resuming an interrupted run)
+
+        Yields:
+            dict: GestãoClick products
+        """
+        since = self.restore(resume) if resume else self.begin(force_full)
+
+        def fetcher(page, limit):
+            return self.gc_client.get_products(page=page, limit=limit, modified_since=since)
+
+        def on_page(page):
+            self.page = page
+
+        products = Pagination().iter_items(
+            fetcher=fetcher, data_key='data', limit=PRODUCT_PAGE_SIZE, start_page=start_page, on_page=on_page
+        )
+        for product in products:
+            if self.accept(product):
+                yield product
+
+    def commit(self, success=True):
+        """
+        Persist the new high-water mark after a run.
+
+        The mark only advances when the run succeeded; otherwise the next run
+        requests the same window again.
+
+        Args:
+            success (bool): Whether every product of the run was synchronized
+        """
+        if not success:
+            self.logger.warning("⚠️ Execução com erros, marca de sincronização mantida para nova tentativa")
+            return
+
+        values = {}
+        previous = self.cursors.get(self.cursor_name).get('modified_since')
+        if self._max_modified and (not previous or self._max_modified > previous):
+            values['modified_since'] = self._max_modified
+        if self.full_sync and self._started_at:
+            values['last_full_sync'] = self._started_at.isoformat()
+
+        if values:
+            self.cursors.update(self.cursor_name, **values)
+            self.logger.info(f"📌 Marca de sincronização atualizada: {values}")
+
+
+def _parse_order_timestamp(value):
+    """
+    Parse a Bagy timestamp ('2024-05-01T12:00:00.000000Z', '2024-05-01 12:00:00', ...).
+
+    Returns:
+        datetime or None: Naive UTC datetime, None if missing or unparseable
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _order_timestamp(order):
+    """Timestamp of an order's last change (creation if never updated), used to advance the cursor."""
+    return _parse_order_timestamp(order.get('updated_at') or order.get('created_at'))
+
+
+class IncrementalOrderFeed:
+    """
+    Yields the Bagy orders an order sync run has to look at: the orders changed
+    after the persisted updated_at mark minus a safety overlap, plus a periodic
+    sweep of open orders (config.BAGY_OPEN_ORDER_STATUSES).
+
+    Orders inside the overlap are read again on purpose; the caller skips the
+    unchanged ones by their content hash (SyncHistory.should_sync).
+
+    Usage:
+        feed = IncrementalOrderFeed(bagy_client)
+        for order in feed.iter_orders():
+            ...
+        feed.commit(success=errors == 0)
+    """
+
+    def __init__(self, bagy_client, cursors=None, cursor_name='bagy_orders'):
+        """
+        Args:
+            bagy_client (BagyClient): Bagy API client
+            cursors (SyncCursors, optional): Cursor storage
+            cursor_name (str): Name of the cursor holding this feed's mark
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.bagy_client = bagy_client
+        self.cursors = cursors or SyncCursors()
+        self.cursor_name = cursor_name
+        self.since = None
+        self.sweep_open_orders = False
+        self._started_at = None
+        self._max_updated = None
+
+    def is_sweep_due(self):
+        """
+        Check whether the open orders have to be re-read in this run.
+
+        Returns:
+            bool: True if the last sweep is older than OPEN_ORDERS_SWEEP_INTERVAL_MINUTES
+        """
+        last_sweep = self.cursors.get(self.cursor_name).get('last_open_sweep')
+        if not last_sweep:
+            return True
+        try:
+            last_sweep = datetime.fromisoformat(last_sweep)
+        except ValueError:
+            return True
+        return datetime.now() - last_sweep >= timedelta(minutes=config.OPEN_ORDERS_SWEEP_INTERVAL_MINUTES)
+
+    def begin(self, force_full=False):
+        """
+        Start a run: compute the query window and decide whether open orders are swept.
+
+        Args:
+            force_full (bool): Read the whole order history regardless of the mark
+
+        Returns:
+            str or None: 'updated_at' lower bound to request, None for a full crawl
+        """
+        self._started_at = datetime.now()
+        self._max_updated = None
+        self.since = None
+
+        cursor = self.cursors.get(self.cursor_name)
+        mark = _parse_order_timestamp(cursor.get('order_updated_at'))
+        if force_full or not config.INCREMENTAL_SYNC_ENABLED or mark is None:
+            # Uma leitura completa já inclui os pedidos em aberto
+            self.sweep_open_orders = False
+            self.logger.info("🔁 Leitura completa dos pedidos da Bagy")
+            return None
+
+        # Margem de segurança: pedidos gravados com atraso ou relógios dessincronizados
+        self.since = (mark - timedelta(seconds=config.INCREMENTAL_SYNC_OVERLAP_SECONDS)).strftime(GESTAOCLICK_DATETIME_FORMAT)
+        self.sweep_open_orders = self.is_sweep_due()
+        self.logger.info(f"⏩ Pedidos alterados desde {self.since}" + (" + varredura dos pedidos em aberto" if self.sweep_open_orders else ""))
+        return self.since
+
+    def accept(self, order):
+        """
+        Record a fetched order's updated_at and tell whether it belongs to the window.
+
+        Orders inside the overlap (including those at exactly the mark) are kept to
+        catch late writes; the ones already synchronized are skipped by their hash.
+
+        Args:
+            order (dict): Bagy order
+
+        Returns:
+            bool: False if the order is older than the query window
+        """
+        updated = _order_timestamp(order)
+        if updated and (self._max_updated is None or updated > self._max_updated):
+            self._max_updated = updated
+
+        # Filtro local: garante o comportamento mesmo se a API ignorar o parâmetro
+        since = _parse_order_timestamp(self.since)
+        return not (since and updated and updated < since)
+
+    def iter_orders(self, force_full=False):
+        """
+        Yield the orders changed since the mark, then the open orders when a sweep is due.
+
+        Each order is yielded at most once per run.
+
+        Args:
+            force_full (bool): Read the whole order history regardless of the mark
+
+        Yields:
+            dict: Bagy orders
+        """
+        since = self.begin(force_full)
+        seen = set()
+
+        def window_fetcher(page, limit):
+            return self.bagy_client.get_orders(page=page, limit=limit, updated_since=since)
+
+        for order in Pagination().iter_items(fetcher=window_fetcher, data_key='data'):
+            if self.accept(order) and order.get('id') not in seen:
+                seen.add(order.get('id'))
+                yield order
+
+        if not self.sweep_open_orders:
+            return
+
+        for status in config.BAGY_OPEN_ORDER_STATUSES:
+            def status_fetcher(page, limit, status=status):
+                return self.bagy_client.get_orders(page=page, limit=limit, status=status)
+
+            for order in Pagination().iter_items(fetcher=status_fetcher, data_key='data'):
+                # Filtro local: pedidos fechados nunca são relidos, mesmo se a API ignorar o status
+                if order.get('status') not in config.BAGY_OPEN_ORDER_STATUSES or order.get('id') in seen:
+                    continue
+                seen.add(order.get('id'))
+                yield order
+
+    def commit(self, success=True):
+        """
+        Persist the new updated_at mark and the sweep time after a run.
+
+        The mark only advances when the run succeeded; otherwise the next run
+        requests the same window again.
+
+        Args:
+            success (bool): Whether every order of the run was synchronized
+        """
+        if not success:
+            self.logger.warning("⚠️ Execução com erros, marca de pedidos mantida para nova tentativa")
+            return
+
+        values = {}
+        if self._max_updated:
+            previous = _parse_order_timestamp(self.cursors.get(self.cursor_name).get('order_updated_at'))
+            if previous is None or self._max_updated >= previous:
+                values['order_updated_at'] = self._max_updated.isoformat()
+        if self._started_at and (self.sweep_open_orders or self.since is None):
+            values['last_open_sweep'] = self._started_at.isoformat()
+
+        if values:
+            self.cursors.update(self.cursor_name, **values)
+            self.logger.info(f"📌 Marca de pedidos atualizada: {values}")
@@ -10,7 +10,7 @@ from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 
 import config
-from storage import IncompleteProductsStorage, EntityMapping, SyncHistory
+from storage import open_incomplete_products_storage, open_entity_mapping, open_sync_history
 from new_product_converter import ProductConverter
 from solucao_final import VariationHandler
 from sync_integrator import SyncIntegrator
@@ -73,9 +73,9 @@ def run_sync():
     storage_dir = os.environ.get('STORAGE_DIR', './data')
     os.makedirs(storage_dir, exist_ok=True)
     
-    incomplete_products = IncompleteProductsStorage(f"{storage_dir}/incomplete_products.json")
-    entity_mapping = EntityMapping(f"{storage_dir}/entity_mapping.json")
-    sync_history = SyncHistory(f"{storage_dir}/sync_history.json")
+    incomplete_products = open_incomplete_products_storage(f"{storage_dir}/incomplete_products.json")
+    entity_mapping = open_entity_mapping(f"{storage_dir}/entity_mapping.json")
+    sync_history = open_sync_history(f"{storage_dir}/sync_history.json")
     
     # Criar o conversor de produtos
     product_converter = ProductConverter(incomplete_products_storage=incomplete_products)
@@ -86,7 +86,8 @@ def run_sync():
         bagy_client=bagy_client,
         product_converter=product_converter,
         entity_mapping=entity_mapping,
-        incomplete_products_storage=incomplete_products
+        incomplete_products_storage=incomplete_products,
+        sync_history=sync_history
     )
     
     # Registrar início da sincronização
@@ -102,7 +103,7 @@ def run_sync():
     
     # Registrar estatísticas da sincronização
     logger.info(f"Sincronização completa em {duration:.2f} segundos")
-    logger.info(f"Produtos (GestãoClick → Bagy): {stats['success']} com sucesso, {stats['errors']} erros, {stats['incomplete']} incompletos")
+    logger.info(f"Produtos (GestãoClick → Bagy): {stats['success']} escritos, {stats['skipped']} inalterados, {stats['errors']} erros, {stats['incomplete']} incompletos")
     
     # Registrar histórico da sincronização
     sync_history.add_sync_record(
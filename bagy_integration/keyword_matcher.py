@@ -0,0 +1,103 @@
+"""
+Shared keyword lists for product and variation names.
+
+The color/model heuristics of ProductConverter and BagyClient test names against
+fixed keyword lists. The lists are accent-folded once, at import, and a name is
+folded once per lookup, so 'água' and 'agua' match the same keyword. Matching is
+a plain substring test per keyword: at this list size CPython's `in` beats a
+regex alternation.
+"""
+import unicodedata
+
+# Palavras que indicam variações de cor (a Bagy trata cores como atributo único por produto)
+COLOR_KEYWORDS = (
+    'azul', 'rosa', 'água', 'vermelho', 'preto', 'branco', 'verde', 'amarelo',
+    'laranja', 'roxo', 'violeta', 'marrom', 'cinza', 'dourado', 'prata', 'bege',
+    'lilás', 'turquesa', 'vinho', 'fúcsia', 'salmão', 'magenta', 'creme', 'nude'
+)
+
+# Produtos cujas variações são modelos, sabores ou texturas (ex.: Egg Masturbador SPIDER/SILKY)
+SPECIAL_PRODUCT_KEYWORDS = ('egg', 'masturbador', 'vibrador', 'lubrificante', 'óleo', 'gel')
+
+# Produtos em que o nome da variação é usado como cor na Bagy
+VARIATION_AS_COLOR_KEYWORDS = ('egg', 'masturbador')
+
+# Nomes de atributo tratados como cor da variação
+COLOR_ATTRIBUTE_NAMES = frozenset({'cor', 'color', 'colour', 'variacao', 'modelo', 'tipo'})
+
+
+def normalize(text):
+    """
+    Fold a text for keyword matching: lowercase, without accents.
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Normalized text ('' for None)
+    """
+    if not text:
+        return ''
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+class KeywordMatcher:
+    """Substring matcher for several keyword categories over accent-folded text."""
+
+    def __init__(self, categories):
+        """
+        Args:
+            categories (dict): Category name → iterable of keywords
+        """
+        self._keywords = {
+            category: tuple(normalize(keyword) for keyword in keywords)
+            for category, keywords in categories.items()
+        }
+
+    def classify(self, text):
+        """
+        Find the first keyword of each category contained in a text.
+
+        Args:
+            text (str): Product or variation name
+
+        Returns:
+            dict: Category → matched keyword (normalized), only for categories found
+        """
+        text = normalize(text)
+        found = {}
+        for category, keywords in self._keywords.items():
+            for keyword in keywords:
+                if keyword in text:
+                    found[category] = keyword
+                    break
+        return found
+
+    def find(self, text, category):
+        """
+        Find the first keyword of one category contained in a text.
+
+        Args:
+            text (str): Product or variation name
+            category (str): Category name
+
+        Returns:
+            str or None: Matched keyword (normalized)
+        """
+        text = normalize(text)
+        for keyword in self._keywords[category]:
+            if keyword in text:
+                return keyword
+        return None
+
+
+# Listas normalizadas uma vez e compartilhadas por ProductConverter e BagyClient
+NAME_KEYWORDS = KeywordMatcher({
+    'color': COLOR_KEYWORDS,
+    'special': SPECIAL_PRODUCT_KEYWORDS,
+    'variation_as_color': VARIATION_AS_COLOR_KEYWORDS,
+})
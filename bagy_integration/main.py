@@ -8,8 +8,9 @@ import argparse
 import logging
 import config
 from variacao_bidirectional_synchronizer import VariacaoBidirectionalSynchronizer
+from async_sync import run_async_product_sync
 from new_product_converter import ProductConverter
-from storage import IncompleteProductsStorage
+from storage import open_incomplete_products_storage
 from app import app  # Import the Flask app for Gunicorn
 
 def main():
@@ -23,6 +24,8 @@ def main():
     parser.add_argument('--interval', type=int, help='Sync interval in minutes')
     parser.add_argument('--entity', choices=['products_to_bagy', 'customers', 'orders', 'all'], 
                        default='all', help='Entity to synchronize')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                       help='Use the asyncio clients for the GestãoClick → Bagy product sync (requires aiohttp)')
     args = parser.parse_args()
     
     # Verify API keys and credentials
@@ -39,7 +42,7 @@ def main():
     os.makedirs(storage_dir, exist_ok=True)
     
     # Criar o armazenamento de produtos incompletos
-    incomplete_products = IncompleteProductsStorage(f"{storage_dir}/incomplete_products.json")
+    incomplete_products = open_incomplete_products_storage(f"{storage_dir}/incomplete_products.json")
     
     # Criar o conversor de produtos com suporte a variações
     product_converter = ProductConverter(incomplete_products_storage=incomplete_products)
@@ -57,7 +60,12 @@ def main():
         
         if args.entity == 'products_to_bagy':
             logger.info("Synchronizing products from GestãoClick to Bagy only")
-            product_success, product_errors = synchronizer.sync_products_from_gestaoclick()
+            if args.use_async:
+                product_success, product_errors = run_async_product_sync(
+                    product_converter, synchronizer.entity_mapping, synchronizer.sync_history
+                )
+            else:
+                product_success, product_errors = synchronizer.sync_products_from_gestaoclick()
             logger.info(f"Product synchronization to Bagy completed: {product_success} successful, {product_errors} errors")
         elif args.entity == 'customers':
             logger.info("Synchronizing customers from Bagy to GestãoClick only")
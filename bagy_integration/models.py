@@ -3,8 +3,34 @@ Data models for entity conversion between Bagy and GestãoClick.
 """
 import logging
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
+import config
+from keyword_matcher import NAME_KEYWORDS
+
+
+def _convert_chunk(converter, chunk):
+    """
+    Convert a chunk of GestãoClick products (runs inside a pool worker).
+    
+    Args:
+        converter (ProductConverter): Converter pickled into the worker
+        chunk (list): GestãoClick products
+        
+    Returns:
+        list: (result, error) for each product, in order
+    """
+    results = []
+    for product in chunk:
+        try:
+            results.append((converter.gestaoclick_to_bagy(product), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+
 class BaseConverter:
     """Base converter with common functionality."""
     
@@ -470,11 +496,7 @@ class ProductConverter(BaseConverter):
                 has_too_many_variations = True
                 self.logger.warning(f"⚠️ Produto {name} tem muitas variações ({len(gestao_product['variacoes'])}), usando estratégia alternativa")
                 
-            # REGRA 2: Verificar se as variações têm nomes que parecem ser cores
-            color_keywords = ['azul', 'rosa', 'água', 'vermelho', 'preto', 'branco', 'verde', 'amarelo', 
-                            'laranja', 'roxo', 'violeta', 'marrom', 'cinza', 'dourado', 'prata', 'bege',
-                            'lilás', 'turquesa', 'vinho', 'fúcsia', 'salmão', 'magenta', 'creme', 'nude']
-            
+            # REGRA 2: Verificar se as variações têm nomes que parecem ser cores (keyword_matcher.COLOR_KEYWORDS)
             # Se for um produto com mais de uma variação, verificar se tem cores
             if len(gestao_product['variacoes']) > 1:
                 for var_item in gestao_product['variacoes']:
@@ -482,19 +504,16 @@ class ProductConverter(BaseConverter):
                     if var and var.get('nome'):
                         var_nome = var.get('nome', '').lower()
                         # Verificar se o nome da variação contém alguma palavra que parece ser cor
-                        for color in color_keywords:
-                            if color in var_nome:
-                                has_color_variations = True
-                                self.logger.warning(f"⚠️ Produto {name} tem variações de cores! Detectado: '{var_nome}' contém '{color}'")
-                                break
-                        if has_color_variations:
+                        color = NAME_KEYWORDS.find(var_nome, 'color')
+                        if color:
+                            has_color_variations = True
+                            self.logger.warning(f"⚠️ Produto {name} tem variações de cores! Detectado: '{var_nome}' contém '{color}'")
                             break
                             
             # REGRA 3: Verificar palavras-chave específicas nos nomes das variações
             # Para produtos como o "Egg Masturbador" que tem variações como "SPIDER", "SILKY", etc.
             # ou nomes de sabores, texturas, etc. que não são cores mas que a Bagy trata como atributos
-            special_variation_keywords = ["egg", "masturbador", "vibrador", "lubrificante", "óleo", "gel"]
-            if any(keyword in name.lower() for keyword in special_variation_keywords):
+            if NAME_KEYWORDS.find(name, 'special'):
                 # Verificar se tem pelo menos 2 variações (caracterizando um produto complexo)
                 if len(gestao_product['variacoes']) > 1:
                     has_too_many_variations = True
@@ -660,6 +679,41 @@ class ProductConverter(BaseConverter):
         self.logger.debug(f"Converted product to Bagy: {bagy_product['name']}")
         return bagy_product
     
+    def convert_many(self, products, workers=config.CONVERT_POOL_WORKERS, min_batch=config.CONVERT_POOL_MIN_BATCH):
+        """
+        Convert a batch of GestãoClick products, sharding it across a process pool.
+        
+        The conversion is CPU-bound pure Python, so threads do not run it in parallel.
+        Batches smaller than `min_batch`, or `workers` <= 1, are converted in-process,
+        where starting the pool would cost more than it saves.
+        
+        Args:
+            products (list): GestãoClick products
+            workers (int): Worker processes
+            min_batch (int): Smallest batch sent to the pool
+            
+        Returns:
+            list: (result, error) for each product, in input order; result is what
+                gestaoclick_to_bagy returns and error is None or the exception message
+        """
+        products = list(products)
+        if workers <= 1 or len(products) < max(min_batch, 2):
+            return _convert_chunk(self, products)
+        
+        # Alguns blocos por processo equilibram a carga sem multiplicar a serialização
+        chunk_size = max(1, -(-len(products) // (workers * 4)))
+        chunks = [products[start:start + chunk_size] for start in range(0, len(products), chunk_size)]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                results = []
+                for chunk_results in executor.map(_convert_chunk, [self] * len(chunks), chunks):
+                    results.extend(chunk_results)
+                return results
+        except (BrokenProcessPool, OSError) as e:
+            self.logger.warning(f"⚠️ Pool de processos indisponível, convertendo no próprio processo: {str(e)}")
+            return _convert_chunk(self, products)
+    
     def bagy_to_gestaoclick(self, bagy_product):
         """
         Convert a Bagy product to GestãoClick format.
@@ -3,6 +3,7 @@ Nova implementação do sincronizador bidirecional com suporte a conversão
 de variações como produtos independentes.
 Otimizado para execução contínua 24/7 em serviço de hospedagem.
 """
+import itertools
 import logging
 import time
 import json
@@ -11,7 +12,12 @@ from threading import Thread, Event
 import traceback
 
 from new_product_converter import ProductConverter
-from storage import IncompleteProductsStorage, EntityMapping, SyncHistory
+from storage import open_incomplete_products_storage, open_entity_mapping, open_sync_history, SyncCheckpoints
+from utils import Pagination, get_current_datetime, hash_bagy_payload
+from sync_pipeline import SyncPipeline
+from incremental_sync import IncrementalProductFeed
+from checkpoint import RunCheckpoint
+import config
 from datetime import datetime
 
 class BidirectionalSynchronizer:
@@ -26,10 +32,16 @@ class BidirectionalSynchronizer:
         self.bagy_client = bagy_client
 
         # Armazenamento persistente
-        self.incomplete_products = IncompleteProductsStorage(f"{storage_dir}/incomplete_products.json")
-        self.entity_mapping = EntityMappingStorage(f"{storage_dir}/entity_mapping.json")
-        self.sync_history = SyncHistoryStorage(f"{storage_dir}/sync_history.json")
+        self.incomplete_products = open_incomplete_products_storage(f"{storage_dir}/incomplete_products.json")
+        self.entity_mapping = open_entity_mapping(f"{storage_dir}/entity_mapping.json")
+        self.sync_history = open_sync_history(f"{storage_dir}/sync_history.json")
 
+        # Produtos do GestãoClick alterados desde a última execução bem-sucedida
+        self.product_feed = IncrementalProductFeed(self.gc_client)
+        # Progresso da execução em andamento, retomado após uma interrupção
+        self.sync_checkpoints = SyncCheckpoints(f"{storage_dir}/sync_checkpoints.json")
+        self._checkpoint = None
+        
         # Converter de produtos
         self.product_converter = ProductConverter(incomplete_products_storage=self.incomplete_products)
         
@@ -136,6 +148,7 @@ class BidirectionalSynchronizer:
 ⏱️ Duração: {duration:.2f} segundos
 📦 Produtos (GestãoClick → Bagy):
    ✅ Sucesso: {stats['products']['success']}
+   ⏭️ Inalterados: {stats['products'].get('skipped', 0)}
    ❌ Erros: {stats['products']['errors']}
    ⚠️ Incompletos: {stats['products']['incomplete']}
 👥 Clientes (Bagy → GestãoClick):
@@ -162,191 +175,190 @@ class BidirectionalSynchronizer:
         
         return stats
 
+    def _convert_gestaoclick_product(self, gc_product):
+        """
+        Etapa de conversão: converte um produto da GestãoClick em um ou mais produtos Bagy.
+        
+        Args:
+            gc_product (dict): Produto da GestãoClick
+            
+        Returns:
+            list: Produtos Bagy (um para cada variação); vazia se o produto estiver incompleto
+        """
+        # NOVA ESTRATÉGIA: Converter cada produto da GestãoClick em um ou mais produtos Bagy
+        # (um para cada variação, ou um único se não houver variações)
+        bagy_products = self.product_converter.gestaoclick_to_bagy(gc_product)
+        
+        # Se a conversão falhou (produto incompleto)
+        if not bagy_products:
+            self.logger.warning(f"❌ Produto {gc_product.get('id')} não pode ser sincronizado. Campos críticos faltando.")
+            return []
+        
+        return bagy_products
+    
+    def _find_existing_product(self, bagy_product):
+        """
+        Etapa de diff: busca o produto (ou variação independente) já existente na Bagy.
+        
+        Args:
+            bagy_product (dict): Produto convertido para o formato da Bagy
+            
+        Returns:
+            tuple or None: (bagy_product, produto existente na Bagy ou None), ou None se
+                o payload for idêntico ao último enviado (nada a escrever)
+        """
+        external_id = bagy_product.get('external_id')
+        if not self.sync_history.should_sync('bagy_products', external_id, hash_bagy_payload(bagy_product)):
+            self.logger.debug(f"⏭️ Produto inalterado desde a última sincronização: {external_id}")
+            return None
+        
+        # Escrita em andamento quando a execução anterior foi interrompida: o produto pode já
+        # ter sido criado na Bagy sem que o índice local tenha sido gravado
+        remote = self._checkpoint is not None and self._checkpoint.is_replayed(bagy_product)
+        existing_product = self.bagy_client.get_product_by_external_id(external_id, remote=remote)
+        return bagy_product, existing_product
+    
+    def _write_bagy_product(self, diff_result):
+        """
+        Etapa de escrita: cria ou atualiza o produto na Bagy.
+        
+        Args:
+            diff_result (tuple): (bagy_product, produto existente na Bagy ou None)
+            
+        Returns:
+            dict or None: Produto criado/atualizado, ou None em caso de falha
+        """
+        bagy_product, existing_product = diff_result
+        external_id = bagy_product.get('external_id')
+        
+        # Variações (external_id contém '-') são tratadas como produtos independentes
+        is_variation = '-' in str(external_id)
+        
+        if not existing_product:
+            if is_variation:
+                self.logger.info(f"📦 Criando variação como produto independente: {bagy_product.get('name')} (external_id: {external_id})")
+            else:
+                self.logger.info(f"📦 Criando novo produto {external_id} no Bagy")
+            new_product = self.bagy_client.create_product(bagy_product)
+            
+            if new_product and 'id' in new_product:
+                # Registrar mapeamento
+                self.entity_mapping.add_mapping(
+                    'products',
+                    new_product['id'],
+                    external_id
+                )
+                self.sync_history.update_sync('bagy_products', external_id, hash_bagy_payload(bagy_product))
+                return new_product
+            
+            if is_variation:
+                self.logger.error(f"❌ Falha ao criar variação como produto independente: {external_id}")
+            else:
+                self.logger.error(f"❌ Falha ao criar produto {external_id} na Bagy")
+            return None
+        
+        # Produto existe, atualizar
+        bagy_id = existing_product.get('id')
+        if is_variation:
+            self.logger.info(f"🔄 Atualizando variação como produto independente: {external_id} (Bagy ID: {bagy_id})")
+        else:
+            self.logger.info(f"🔄 Atualizando produto {external_id} (Bagy ID: {bagy_id})")
+        
+        # Preparar dados para atualização
+        update_data = {
+            'name': bagy_product.get('name'),
+            'description': bagy_product.get('description'),
+            'price': bagy_product.get('price'),
+            'price_compare': bagy_product.get('price_compare'),
+            'balance': bagy_product.get('balance'),
+            'height': bagy_product.get('height'),
+            'width': bagy_product.get('width'),
+            'depth': bagy_product.get('depth'),
+            'weight': bagy_product.get('weight'),
+        }
+        
+        # Verificar se o SKU precisa ser atualizado
+        current_sku = existing_product.get('sku')
+        new_sku = bagy_product.get('sku')
+        
+        if current_sku != new_sku:
+            self.logger.info(f"🔄 SKU desatualizado detectado: atual={current_sku}, novo={new_sku}")
+            if new_sku:
+                self.logger.info(f"🔄 Atualizando SKU para {new_sku}")
+                update_data['sku'] = new_sku
+                update_data['reference'] = new_sku
+                update_data['code'] = new_sku
+        
+        # Atualizar na Bagy
+        self.bagy_client.update_product(bagy_id, update_data)
+        self.sync_history.update_sync('bagy_products', external_id, hash_bagy_payload(bagy_product))
+        return existing_product
+    
     def sync_products_to_bagy(self):
         """
         Sincroniza produtos da GestãoClick para a Bagy.
         NOVA ESTRATÉGIA: Variações de produtos na GestãoClick se tornam produtos independentes na Bagy.
         
+        Busca, conversão, diff e escrita rodam como etapas de um pipeline com filas
+        limitadas, de modo que as chamadas à GestãoClick e à Bagy se sobrepõem.
+        
+        O progresso é salvo em checkpoints (ver checkpoint.RunCheckpoint): uma execução
+        interrompida é retomada após a última página concluída.
+        
         Returns:
             dict: Estatísticas da sincronização
         """
-        stats = {'success': 0, 'errors': 0, 'incomplete': 0}
         self.logger.info("🔄 Iniciando sincronização de produtos do GestãoClick para Bagy")
-        
-        # Obter todos os produtos da GestãoClick
         self.logger.info("📋 Buscando catálogo de produtos do GestãoClick...")
-        all_gestaoclick_products = []
         
-        try:
-            # Usar paginação para obter todos os produtos
-            pagination = Pagination()
-            all_gestaoclick_products = pagination.get_all_pages(
-                fetcher=self.gc_client.get_products,
-                data_key='data'
-            )
-            
-            self.logger.info(f"📦 Encontrados {len(all_gestaoclick_products)} produtos no GestãoClick")
-        except Exception as e:
-            self.logger.error(f"❌ Erro ao obter produtos do GestãoClick: {str(e)}")
-            stats['errors'] += 1
-            return stats
+        # Carregar cores e categorias uma única vez, em vez de consultá-las a cada produto
+        self.bagy_client.warm_lookup_caches()
         
-        # Inicializar contador de produtos incompletos
-        incomplete_count = 0
+        checkpoint = RunCheckpoint(
+            'variations_to_bagy', checkpoints=self.sync_checkpoints,
+            flush=(self.entity_mapping, self.sync_history, self.bagy_client.product_index)
+        )
+        resumed = checkpoint.begin(window=self.product_feed.window_state)
+        self._checkpoint = checkpoint
+        # Apenas produtos alterados desde a última execução, ou o catálogo completo
+        # quando a reconciliação periódica estiver vencida
+        gc_products = self.product_feed.iter_products(
+            resume=resumed and resumed.get('window'), start_page=checkpoint.start_page
+        )
         
-        # Processar cada produto
-        for gc_product in all_gestaoclick_products:
-            try:
-                product_id = gc_product.get('id')
-                product_name = gc_product.get('nome', 'Desconhecido')
-                
-                # NOVA ESTRATÉGIA: Converter cada produto da GestãoClick em um ou mais produtos Bagy
-                # (um para cada variação, ou um único se não houver variações)
-                bagy_products = self.product_converter.gestaoclick_to_bagy(gc_product)
-                
-                # Se a conversão falhou (produto incompleto)
-                if not bagy_products:
-                    self.logger.warning(f"❌ Produto {product_id} não pode ser sincronizado. Campos críticos faltando.")
-                    stats['incomplete'] += 1
-                    incomplete_count += 1
-                    continue
-                
-                # Processar cada produto convertido (pode ser um único ou múltiplos para variações)
-                for bagy_product in bagy_products:
-                    try:
-                        external_id = bagy_product.get('external_id')
-                        
-                        # Verificar se é uma variação (external_id contém '-')
-                        is_variation = '-' in external_id
-                        
-                        # Se for uma variação, precisamos verificar se já existe como produto independente
-                        if is_variation:
-                            # Extrair o ID do produto principal e da variação
-                            parts = external_id.split('-')
-                            product_id = parts[0]
-                            variation_id = parts[1] if len(parts) > 1 else ''
-                            
-                            # Verificar se esta variação já existe como produto independente
-                            existing_product = self.bagy_client.get_product_by_external_id(external_id)
-                            
-                            if not existing_product:
-                                # Variação ainda não existe como produto independente, criar novo
-                                self.logger.info(f"📦 Criando variação como produto independente: {bagy_product.get('name')} (external_id: {external_id})")
-                                new_product = self.bagy_client.create_product(bagy_product)
-                                
-                                if new_product and 'id' in new_product:
-                                    # Registrar mapeamento
-                                    self.entity_mapping.add_mapping(
-                                        entity_type='product',
-                                        external_id=external_id,
-                                        internal_id=new_product['id'],
-                                        name=bagy_product.get('name', '')
-                                    )
-                                    stats['success'] += 1
-                                else:
-                                    self.logger.error(f"❌ Falha ao criar variação como produto independente: {external_id}")
-                                    stats['errors'] += 1
-                            else:
-                                # Variação já existe como produto independente, atualizar
-                                bagy_id = existing_product.get('id')
-                                self.logger.info(f"🔄 Atualizando variação como produto independente: {external_id} (Bagy ID: {bagy_id})")
-                                
-                                # Preparar dados para atualização
-                                update_data = {
-                                    'name': bagy_product.get('name'),
-                                    'description': bagy_product.get('description'),
-                                    'price': bagy_product.get('price'),
-                                    'price_compare': bagy_product.get('price_compare'),
-                                    'balance': bagy_product.get('balance'),
-                                    'height': bagy_product.get('height'),
-                                    'width': bagy_product.get('width'),
-                                    'depth': bagy_product.get('depth'),
-                                    'weight': bagy_product.get('weight'),
-                                }
-                                
-                                # Verificar se o SKU precisa ser atualizado
-                                current_sku = existing_product.get('sku')
-                                new_sku = bagy_product.get('sku')
-                                
-                                if current_sku != new_sku:
-                                    self.logger.info(f"🔄 SKU desatualizado detectado: atual={current_sku}, novo={new_sku}")
-                                    if new_sku:
-                                        self.logger.info(f"🔄 Atualizando SKU para {new_sku}")
-                                        update_data['sku'] = new_sku
-                                        update_data['reference'] = new_sku
-                                        update_data['code'] = new_sku
-                                
-                                # Atualizar na Bagy
-                                self.bagy_client.update_product(bagy_id, update_data)
-                                stats['success'] += 1
-                        else:
-                            # Produto normal (não é variação)
-                            existing_product = self.bagy_client.get_product_by_external_id(external_id)
-                            
-                            if existing_product:
-                                # Produto existe, atualizar
-                                bagy_id = existing_product.get('id')
-                                self.logger.info(f"🔄 Atualizando produto {external_id} (Bagy ID: {bagy_id})")
-                                
-                                # Preparar dados para atualização
-                                update_data = {
-                                    'name': bagy_product.get('name'),
-                                    'description': bagy_product.get('description'),
-                                    'price': bagy_product.get('price'),
-                                    'price_compare': bagy_product.get('price_compare'),
-                                    'balance': bagy_product.get('balance'),
-                                    'height': bagy_product.get('height'),
-                                    'width': bagy_product.get('width'),
-                                    'depth': bagy_product.get('depth'),
-                                    'weight': bagy_product.get('weight'),
-                                }
-                                
-                                # Verificar se o SKU precisa ser atualizado
-                                current_sku = existing_product.get('sku')
-                                new_sku = bagy_product.get('sku')
-                                
-                                if current_sku != new_sku:
-                                    self.logger.info(f"🔄 SKU desatualizado detectado: atual={current_sku}, novo={new_sku}")
-                                    if new_sku:
-                                        self.logger.info(f"🔄 Atualizando SKU para {new_sku}")
-                                        update_data['sku'] = new_sku
-                                        update_data['reference'] = new_sku
-                                        update_data['code'] = new_sku
-                                
-                                # Atualizar na Bagy
-                                self.bagy_client.update_product(bagy_id, update_data)
-                                stats['success'] += 1
-                                
-                            else:
-                                # Produto não existe, criar novo
-                                self.logger.info(f"📦 Criando novo produto {external_id} no Bagy")
-                                new_product = self.bagy_client.create_product(bagy_product)
-                                
-                                if new_product and 'id' in new_product:
-                                    # Registrar mapeamento
-                                    self.entity_mapping.add_mapping(
-                                        entity_type='product',
-                                        external_id=external_id,
-                                        internal_id=new_product['id'],
-                                        name=bagy_product.get('name', '')
-                                    )
-                                    stats['success'] += 1
-                                else:
-                                    self.logger.error(f"❌ Falha ao criar produto {external_id} na Bagy")
-                                    stats['errors'] += 1
-                            
-                    except Exception as e:
-                        self.logger.error(f"❌ Erro ao processar produto {external_id}: {str(e)}")
-                        stats['errors'] += 1
-                
-            except Exception as e:
-                self.logger.error(f"❌ Erro ao processar produto {gc_product.get('id', 'Desconhecido')}: {str(e)}")
-                stats['errors'] += 1
+        pipeline = SyncPipeline("produtos")
+        pipeline.add_stage("convert", checkpoint.tracked(self._convert_gestaoclick_product, 'convert', fan_out=True),
+                           workers=config.PIPELINE_CONVERT_WORKERS, fan_out=True)
+        pipeline.add_stage("diff", checkpoint.tracked(self._find_existing_product, 'diff'),
+                           workers=config.PIPELINE_DIFF_WORKERS)
+        pipeline.add_stage("write", checkpoint.tracked(self._write_bagy_product, 'write',
+                                                       lambda diff_result: diff_result[0], writes=True),
+                           workers=config.PIPELINE_WRITE_WORKERS)
         
-        # Atualizar contagem de produtos incompletos nas estatísticas
-        stats['incomplete'] = incomplete_count
+        # Produtos que falharam antes da interrupção, em páginas já concluídas, entram de novo no fim
+        pipeline_stats = pipeline.run(itertools.chain(
+            checkpoint.track(gc_products, lambda: self.product_feed.page),
+            checkpoint.requeued(self.gc_client.get_product_by_id)
+        ))
         
-        self.logger.info(f"✨ Sincronização de produtos para Bagy concluída: {stats['success']} com sucesso, {stats['errors']} erros")
+        # Produtos incompletos voltam a ser buscados quando forem editados no GestãoClick,
+        # então só falhas de busca/diff/escrita (inclusive as da parte interrompida de uma
+        # execução retomada) seguram a marca de sincronização
+        self.product_feed.commit(success=not pipeline_stats['fetch']['errors'] and not checkpoint.has_failures())
+        checkpoint.finish(interrupted=pipeline_stats['fetch']['errors'] > 0)
+        self._checkpoint = None
+        
+        stats = {
+            'success': pipeline_stats['write']['emitted'],
+            'errors': pipeline_stats['write']['dropped'] + sum(stage['errors'] for stage in pipeline_stats.values()),
+            'incomplete': pipeline_stats['convert']['dropped'],
+            # Descartados no diff: payload idêntico ao último enviado, sem busca nem escrita
+            'skipped': pipeline_stats['diff']['dropped'],
+            'pipeline': pipeline_stats
+        }
+        
+        self.logger.info(f"📦 Processados {pipeline_stats['fetch']['emitted']} produtos do GestãoClick")
+        self.logger.info(f"✨ Sincronização de produtos para Bagy concluída: {stats['success']} escritos, {stats['skipped']} inalterados, {stats['errors']} erros")
         return stats
 
     def sync_customers_to_gestaoclick(self):
@@ -371,6 +383,9 @@ class BidirectionalSynchronizer:
             )
             
             self.logger.info(f"👥 Encontrados {len(all_bagy_customers)} clientes no Bagy")
+            
+            # Carregar os clientes do GestãoClick uma vez; a deduplicação passa a ser uma consulta local
+            self.gc_client.build_customer_index()
         except Exception as e:
             self.logger.error(f"❌ Erro ao obter clientes do Bagy: {str(e)}")
             stats['errors'] += 1
@@ -388,11 +403,11 @@ class BidirectionalSynchronizer:
                     self.logger.warning(f"⚠️ Cliente {customer_name} (ID: {customer_id}) não tem documento, pulando...")
                     continue
                 
-                existing_customer = self.gc_client.get_customer_by_document(document)
+                existing_customer = self.gc_client.find_customer(document=document, email=bagy_customer.get('email'))
                 
-                if existing_customer and 'data' in existing_customer and existing_customer['data']:
+                if existing_customer:
                     # Cliente existe, atualizar
-                    gc_customer_id = existing_customer['data'][0].get('id')
+                    gc_customer_id = existing_customer.get('id')
                     self.logger.info(f"🔄 Atualizando cliente {customer_name} (ID GestãoClick: {gc_customer_id})")
                     
                     # Preparar dados para atualização
@@ -455,10 +470,9 @@ class BidirectionalSynchronizer:
                     if new_customer and 'id' in new_customer:
                         # Registrar mapeamento
                         self.entity_mapping.add_mapping(
-                            entity_type='customer',
-                            external_id=customer_id,
-                            internal_id=new_customer['id'],
-                            name=customer_name
+                            'customers',
+                            customer_id,
+                            new_customer['id']
                         )
                         stats['success'] += 1
                     else:
@@ -543,9 +557,9 @@ class BidirectionalSynchronizer:
                     stats['errors'] += 1
                     continue
                 
-                gc_customer = self.gc_client.get_customer_by_document(document)
+                gc_customer = self.gc_client.find_customer(document=document, email=customer_details.get('email'))
                 
-                if not gc_customer or 'data' not in gc_customer or not gc_customer['data']:
+                if not gc_customer:
                     self.logger.warning(f"⚠️ Cliente do pedido {order_number} não existe no GestãoClick, sincronizando cliente primeiro...")
                     
                     # Criar cliente no GestãoClick
@@ -580,7 +594,7 @@ class BidirectionalSynchronizer:
                         continue
                 
                 # Obter ID do cliente no GestãoClick
-                gc_customer_id = gc_customer['data'][0]['id'] if 'data' in gc_customer else gc_customer['id']
+                gc_customer_id = gc_customer['id']
                 
                 # Preparar itens do pedido
                 order_items = []
@@ -648,10 +662,9 @@ class BidirectionalSynchronizer:
                 if new_order and 'id' in new_order:
                     # Registrar mapeamento
                     self.entity_mapping.add_mapping(
-                        entity_type='order',
-                        external_id=str(order_id),
-                        internal_id=new_order['id'],
-                        name=f"Pedido #{order_number}"
+                        'orders',
+                        str(order_id),
+                        new_order['id']
                     )
                     stats['success'] += 1
                 else:
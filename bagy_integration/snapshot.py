@@ -0,0 +1,235 @@
+"""
+Streaming readers and writers for the GestãoClick product snapshot (data/produtos.json).
+
+The snapshot is written by erp_polling as a pretty-printed JSON array. Loading it
+with json.load keeps the whole text and every product dict resident; the readers
+here yield one product at a time with memory bounded by the read chunk plus the
+largest single product. The NDJSON format (one product per line) can also be
+seeked, split by line and processed in parallel.
+
+Uso:
+    python snapshot.py data/produtos.json data/produtos.ndjson
+"""
+import argparse
+import json
+import os
+import tempfile
+
+# Tamanho de cada leitura do arquivo
+CHUNK_SIZE = 64 * 1024
+
+# Extensões tratadas como NDJSON
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+_WHITESPACE = ' \t\r\n'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+def iter_json_array(fp, chunk_size=CHUNK_SIZE):
+    """
+    Yield the items of a top-level JSON array without loading the whole document.
+
+    Args:
+        fp (file): Text file positioned at the start of the array
+        chunk_size (int): Characters read per chunk
+
+    Yields:
+        Each decoded array item
+
+    Raises:
+        ValueError: If the document is not a JSON array or is truncated
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if buffer[pos:pos + 1] != '[':
+        raise ValueError("O snapshot não é um array JSON")
+    pos += 1
+
+    expect_item = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Snapshot JSON truncado")
+
+        char = buffer[pos]
+        if char == ']':
+            return
+        if not expect_item:
+            if char != ',':
+                raise ValueError(f"Esperado ',' ou ']' no snapshot, encontrado {char!r}")
+            pos += 1
+            expect_item = True
+            continue
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # Um número cortado no fim do bloco ("2." de "2.5") só termina num delimitador
+                if eof or (end < len(buffer) and buffer[end] in _DELIMITERS):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Snapshot JSON inválido ou truncado")
+            fill()
+
+        pos = end
+        expect_item = False
+        yield item
+
+
+def iter_ndjson(fp):
+    """
+    Yield the records of an NDJSON file, skipping blank lines.
+
+    Args:
+        fp (file): Text file with one JSON document per line
+
+    Yields:
+        Each decoded record
+    """
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_snapshot(path):
+    """
+    Yield the products of a snapshot file, in either JSON array or NDJSON format.
+
+    The format is taken from the extension (.ndjson/.jsonl) and otherwise detected
+    from the first non-blank character.
+
+    Args:
+        path (str): Snapshot path
+
+    Yields:
+        dict: One product at a time
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        if path.endswith(NDJSON_EXTENSIONS):
+            yield from iter_ndjson(fp)
+            return
+
+        first = fp.read(1)
+        while first and first in _WHITESPACE:
+            first = fp.read(1)
+        fp.seek(0)
+        if first == '[':
+            yield from iter_json_array(fp)
+        else:
+            yield from iter_ndjson(fp)
+
+
+def _atomic_write(path, write):
+    """Write a file through a temporary sibling and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            count = write(fp)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return count
+
+
+def write_ndjson(records, path):
+    """
+    Atomically write records as NDJSON, one compact JSON document per line.
+
+    Args:
+        records (iterable): Records to write (consumed lazily)
+        path (str): Output path
+
+    Returns:
+        int: Number of records written
+    """
+    def write(fp):
+        count = 0
+        for record in records:
+            fp.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            fp.write('\n')
+            count += 1
+        return count
+
+    return _atomic_write(path, write)
+
+
+def write_json_array(records, path, indent=2):
+    """
+    Atomically write records as a JSON array, one item at a time.
+
+    Args:
+        records (iterable): Records to write (consumed lazily)
+        path (str): Output path
+        indent (int): Indentation of each item, matching erp_polling's output
+
+    Returns:
+        int: Number of records written
+    """
+    def write(fp):
+        count = 0
+        fp.write('[')
+        for record in records:
+            fp.write(',\n' if count else '\n')
+            item = json.dumps(record, ensure_ascii=False, indent=indent)
+            fp.write(' ' * indent + item.replace('\n', '\n' + ' ' * indent))
+            count += 1
+        fp.write('\n]' if count else ']')
+        return count
+
+    return _atomic_write(path, write)
+
+
+def write_snapshot(records, path):
+    """
+    Atomically write a snapshot in the format implied by its extension.
+
+    Args:
+        records (iterable): Products to write
+        path (str): Output path (.ndjson/.jsonl for NDJSON, JSON array otherwise)
+
+    Returns:
+        int: Number of records written
+    """
+    if path.endswith(NDJSON_EXTENSIONS):
+        return write_ndjson(records, path)
+    return write_json_array(records, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converte o snapshot de produtos entre JSON e NDJSON')
+    parser.add_argument('source', help='Snapshot de origem (array JSON ou NDJSON)')
+    parser.add_argument('target', help='Snapshot de destino (.ndjson/.jsonl para NDJSON, JSON caso contrário)')
+    args = parser.parse_args()
+
+    count = write_snapshot(iter_snapshot(args.source), args.target)
+    print(f"✅ {count} produtos gravados em {args.target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Product snapshot exporter: GestãoClick → data/produtos.json.
+
+Python port of erp_polling/src/services/produtoService.js. The product list is
+paginated, variations are fetched concurrently (bounded by the GestãoClick
+client's rate limiter and per-host slots) and products whose fingerprint did
+not change since the last export reuse the variations of the previous snapshot
+instead of calling /produtos/{id}/variacoes again. The snapshot is streamed to
+a temporary file and renamed into place, in the schema consumed by
+sync_gestaoclick_to_bagy.converter_para_bagy.
+
+Uso:
+    python snapshot_exporter.py [--output data/produtos.ndjson] [--full]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from api_clients import GestaoClickClient
+from fingerprint import entity_version
+from snapshot import iter_snapshot, write_snapshot
+from storage import open_sync_history
+from utils import Pagination
+
+# Tipo de entidade no histórico de sincronização com o fingerprint exportado de cada produto
+SNAPSHOT_ENTITY_TYPE = 'gestaoclick_snapshot'
+
+# Campos do snapshot derivados das variações
+VARIATION_FIELDS = ('possui_variacao', 'variacoes', 'valores')
+
+
+def build_snapshot_entry(product, variations):
+    """
+    Build a snapshot entry in the schema written by erp_polling.
+
+    Args:
+        product (dict): GestãoClick product from /produtos
+        variations (list): Variations from /produtos/{id}/variacoes
+
+    Returns:
+        dict: Product with 'possui_variacao', 'variacoes' and 'valores'
+    """
+    # A API pode devolver cada variação dentro de {'variacao': {...}}
+    variations = [variation.get('variacao', variation) for variation in variations if isinstance(variation, dict)]
+    return {
+        **product,
+        'possui_variacao': '1' if variations else '0',
+        'variacoes': [
+            {
+                'nome': variation.get('nome'),
+                'preco_venda': variation.get('preco_venda'),
+                'estoque': variation.get('estoque'),
+                'sku': variation.get('codigo_barra'),
+            }
+            for variation in variations
+        ],
+        'valores': [
+            {'variacao': variation.get('nome'), 'preco_venda': variation.get('preco_venda')}
+            for variation in variations
+        ],
+    }
+
+
+def load_previous_variations(snapshot_file):
+    """
+    Read the variation fields of every product of the previous snapshot.
+
+    Args:
+        snapshot_file (str): Snapshot path
+
+    Returns:
+        dict: Product ID → variation fields (empty if there is no previous snapshot)
+    """
+    if not os.path.exists(snapshot_file):
+        return {}
+
+    previous = {}
+    try:
+        for entry in iter_snapshot(snapshot_file):
+            previous[str(entry.get('id'))] = {field: entry[field] for field in VARIATION_FIELDS if field in entry}
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning(f"⚠️ Snapshot anterior ilegível, todas as variações serão buscadas: {str(e)}")
+        return {}
+    return previous
+
+
+class SnapshotExporter:
+    """Export the GestãoClick product catalogue with variations to a snapshot file."""
+
+    def __init__(self, gc_client, sync_history, snapshot_file=config.PRODUCT_SNAPSHOT_FILE,
+                 workers=config.SNAPSHOT_VARIATION_WORKERS):
+        """
+        Args:
+            gc_client (GestaoClickClient): GestãoClick client
+            sync_history (SyncHistory): Fingerprint of each product in the current snapshot
+            snapshot_file (str): Output path (.ndjson/.jsonl for NDJSON, JSON array otherwise)
+            workers (int): Products whose variations are fetched at the same time
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.gc_client = gc_client
+        self.sync_history = sync_history
+        self.snapshot_file = snapshot_file
+        self.workers = max(1, workers)
+
+    def _export_product(self, product, previous, force_full):
+        """
+        Build the snapshot entry of one product, reusing its previous variations if it is unchanged.
+
+        Returns:
+            tuple: (entry, version to record or None, 'fetched' | 'reused' | 'errors')
+        """
+        product_id = str(product.get('id'))
+        version = entity_version(product, 'gestaoclick_products')
+        previous_entry = previous.get(product_id)
+
+        if previous_entry is not None and not force_full and \
+                not self.sync_history.should_sync(SNAPSHOT_ENTITY_TYPE, product_id, version):
+            return {**product, **previous_entry}, None, 'reused'
+
+        try:
+            variations = self.gc_client.get_product_variations(product_id)
+            return build_snapshot_entry(product, variations), version, 'fetched'
+        except Exception as e:
+            # A versão não é registrada: as variações serão buscadas de novo na próxima exportação
+            if previous_entry is not None:
+                self.logger.warning(f"⚠️ Falha ao buscar variações do produto {product_id}, mantendo as anteriores: {str(e)}")
+                return {**product, **previous_entry}, None, 'errors'
+            self.logger.warning(f"⚠️ Sem variações para produto ID {product_id}: {str(e)}")
+            return build_snapshot_entry(product, []), None, 'errors'
+
+    def iter_entries(self, previous, force_full, stats, versions):
+        """
+        Yield snapshot entries in catalogue order while variations are fetched concurrently.
+
+        Args:
+            previous (dict): Variation fields of the previous snapshot, by product ID
+            force_full (bool): Fetch the variations of every product
+            stats (dict): Run counters, updated in place
+            versions (list): Receives (product ID, fingerprint) of the refreshed products
+        """
+        pending = deque()
+        products = Pagination().iter_items(self.gc_client.get_products, data_key='data')
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="snapshot") as executor:
+            for product in products:
+                stats['products'] += 1
+                pending.append(executor.submit(self._export_product, product, previous, force_full))
+                # Janela limitada: a escrita acompanha a busca sem acumular o catálogo em memória
+                while len(pending) > self.workers * 2:
+                    yield self._collect(pending.popleft(), stats, versions)
+            while pending:
+                yield self._collect(pending.popleft(), stats, versions)
+
+    @staticmethod
+    def _collect(future, stats, versions):
+        """Return the entry of a finished product, updating counters and versions."""
+        entry, version, outcome = future.result()
+        stats[outcome] += 1
+        if version is not None:
+            versions.append((entry.get('id'), version))
+        return entry
+
+    def export(self, force_full=False):
+        """
+        Export the catalogue and atomically replace the snapshot.
+
+        Args:
+            force_full (bool): Fetch the variations of every product
+
+        Returns:
+            dict: Export statistics
+        """
+        self.logger.info(f"🔄 Exportando produtos do GestãoClick para {self.snapshot_file}")
+        start_time = time.time()
+
+        previous = {} if force_full else load_previous_variations(self.snapshot_file)
+        stats = {'products': 0, 'fetched': 0, 'reused': 0, 'errors': 0}
+        versions = []
+
+        write_snapshot(self.iter_entries(previous, force_full, stats, versions), self.snapshot_file)
+
+        # Fingerprints só são registrados depois que o snapshot foi gravado
+        for product_id, version in versions:
+            self.sync_history.update_sync(SNAPSHOT_ENTITY_TYPE, product_id, version)
+        self.sync_history.flush()
+
+        self.logger.info(
+            f"✨ Snapshot gravado em {time.time() - start_time:.2f}s: {stats['products']} produtos, "
+            f"{stats['fetched']} com variações buscadas, {stats['reused']} reaproveitados, {stats['errors']} erros"
+        )
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta o snapshot de produtos do GestãoClick')
+    parser.add_argument('--output', default=config.PRODUCT_SNAPSHOT_FILE,
+                        help='Arquivo de saída (.ndjson/.jsonl para NDJSON, JSON caso contrário)')
+    parser.add_argument('--full', action='store_true', help='Buscar as variações de todos os produtos')
+    args = parser.parse_args()
+
+    logger = config.setup_logging()
+    if not config.GESTAOCLICK_API_KEY or not config.GESTAOCLICK_EMAIL:
+        logger.error("GestãoClick credentials not provided. Set GESTAOCLICK_API_KEY and GESTAOCLICK_EMAIL environment variables.")
+        sys.exit(1)
+
+    sync_history = open_sync_history()
+    try:
+        with GestaoClickClient(config.GESTAOCLICK_API_KEY, config.GESTAOCLICK_EMAIL) as gc_client:
+            SnapshotExporter(gc_client, sync_history, snapshot_file=args.output).export(force_full=args.full)
+    finally:
+        sync_history.close()
+
+
+if __name__ == '__main__':
+    main()
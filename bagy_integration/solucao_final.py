@@ -5,15 +5,18 @@ Esta implementação garante que cada variação seja tratada como um produto in
 import logging
 import hashlib
 import time
+from utils import hash_bagy_payload
 
 class VariationHandler:
     """
     Gerenciador de variações que trata cada variação como um produto independente na Bagy.
     """
-    def __init__(self, bagy_client, product_converter):
+    def __init__(self, bagy_client, product_converter, sync_history=None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.bagy_client = bagy_client
         self.product_converter = product_converter
+        # Hash do último payload enviado por external_id; sem histórico, toda variação é escrita
+        self.sync_history = sync_history
     
     def process_gestaoclick_product(self, gc_product, entity_mapping):
         """
@@ -24,11 +27,12 @@ class VariationHandler:
             entity_mapping: Objeto de mapeamento de entidades para registro
             
         Returns:
-            dict: Estatísticas de processamento (sucesso, erros)
+            dict: Estatísticas de processamento (sucesso, erros, inalterados)
         """
         stats = {
             'success': 0,
-            'errors': 0
+            'errors': 0,
+            'skipped': 0
         }
         
         # Converter o produto em uma lista de produtos (um para cada variação)
@@ -44,6 +48,13 @@ class VariationHandler:
             try:
                 external_id = bagy_product.get('external_id')
                 product_name = bagy_product.get('name')
+                payload_hash = hash_bagy_payload(bagy_product)
+                
+                # Payload idêntico ao último enviado: nem busca nem escrita na Bagy
+                if self.sync_history and not self.sync_history.should_sync('bagy_products', external_id, payload_hash):
+                    self.logger.debug(f"⏭️ Produto inalterado desde a última sincronização: {product_name} (external_id: {external_id})")
+                    stats['skipped'] += 1
+                    continue
                 
                 # Verificar se o produto já existe na Bagy
                 existing_product = self.bagy_client.get_product_by_external_id(external_id)
@@ -56,12 +67,12 @@ class VariationHandler:
                     if new_product and 'id' in new_product:
                         # Registrar no mapeamento
                         entity_mapping.add_mapping(
-                            entity_type='product',
-                            external_id=external_id,
-                            bagy_id=new_product['id'],
-                            name=product_name
+                            'products',
+                            new_product['id'],
+                            external_id
                         )
                         stats['success'] += 1
+                        self._record_payload(external_id, payload_hash)
                         self.logger.info(f"✅ Produto criado com sucesso na Bagy: {product_name} (Bagy ID: {new_product['id']})")
                     else:
                         self.logger.error(f"❌ Falha ao criar produto na Bagy: {product_name}")
@@ -99,6 +110,7 @@ class VariationHandler:
                     
                     if updated_product:
                         stats['success'] += 1
+                        self._record_payload(external_id, payload_hash)
                         self.logger.info(f"✅ Produto atualizado com sucesso na Bagy: {product_name} (Bagy ID: {bagy_id})")
                     else:
                         stats['errors'] += 1
@@ -108,4 +120,15 @@ class VariationHandler:
                 self.logger.error(f"❌ Erro ao processar produto {bagy_product.get('name', 'Desconhecido')}: {str(e)}")
                 stats['errors'] += 1
         
-        return stats
\ No newline at end of file
+        return stats
+    
+    def _record_payload(self, external_id, payload_hash):
+        """
+        Armazena o hash do payload enviado com sucesso para a Bagy.
+        
+        Args:
+            external_id (str): External ID do produto na Bagy
+            payload_hash (str): Hash retornado por hash_bagy_payload
+        """
+        if self.sync_history:
+            self.sync_history.update_sync('bagy_products', external_id, payload_hash)
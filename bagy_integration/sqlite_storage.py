@@ -0,0 +1,452 @@
+"""
+SQLite implementations of the storage classes (EntityMapping, SyncHistory and
+IncompleteProductsStorage), selected with STORAGE_BACKEND=sqlite.
+
+The database runs in WAL mode so the web and sync processes can read and write
+it concurrently, and lookups/statistics are indexed queries.
+
+Run this module directly to import the existing JSON files into the database:
+    python sqlite_storage.py [--storage-dir ./data] [--db ./data/sync.db]
+"""
+import os
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+import config
+
+
+class SQLiteStore:
+    """Base class holding the shared SQLite connection and schema."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entity_mapping (
+            entity_type TEXT NOT NULL,
+            bagy_id TEXT NOT NULL,
+            gestaoclick_id TEXT NOT NULL,
+            PRIMARY KEY (entity_type, bagy_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entity_mapping_gestaoclick
+            ON entity_mapping (entity_type, gestaoclick_id);
+
+        CREATE TABLE IF NOT EXISTS sync_history (
+            entity_type TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            last_sync TEXT,
+            version TEXT,
+            PRIMARY KEY (entity_type, entity_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_sync_history_version
+            ON sync_history (entity_type, version);
+
+        CREATE TABLE IF NOT EXISTS incomplete_products (
+            product_id TEXT PRIMARY KEY,
+            name TEXT,
+            added_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS incomplete_product_fields (
+            product_id TEXT NOT NULL REFERENCES incomplete_products (product_id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            PRIMARY KEY (product_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_incomplete_product_fields_field
+            ON incomplete_product_fields (field);
+    """
+
+    def __init__(self, db_file=config.SQLITE_DB_FILE):
+        self.db_file = db_file
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+
+    def flush(self):
+        """Kept for API compatibility with the JSON storage; every change is committed immediately."""
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self.conn.close()
+
+
+class SQLiteEntityMapping(SQLiteStore):
+    """
+    SQLite version of storage.EntityMapping.
+    """
+
+    @property
+    def mapping(self):
+        """
+        Full mapping as a nested dict, for code that still reads EntityMapping.mapping.
+
+        Returns:
+            dict: {entity_type: {bagy_id: gestaoclick_id}}
+        """
+        mapping = {'products': {}, 'customers': {}, 'orders': {}}
+        with self._lock:
+            rows = self.conn.execute("SELECT entity_type, bagy_id, gestaoclick_id FROM entity_mapping").fetchall()
+        for entity_type, bagy_id, gestaoclick_id in rows:
+            mapping.setdefault(entity_type, {})[bagy_id] = gestaoclick_id
+        return mapping
+
+    def get_gestaoclick_id(self, entity_type, bagy_id):
+        """
+        Get GestãoClick ID for a given Bagy entity ID.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            bagy_id (str): Bagy entity ID
+
+        Returns:
+            str or None: GestãoClick entity ID if found, None otherwise
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT gestaoclick_id FROM entity_mapping WHERE entity_type = ? AND bagy_id = ?",
+                (entity_type, str(bagy_id))
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_bagy_id(self, entity_type, gestaoclick_id):
+        """
+        Get Bagy ID for a given GestãoClick entity ID.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            gestaoclick_id (str): GestãoClick entity ID
+
+        Returns:
+            str or None: Bagy entity ID if found, None otherwise
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT bagy_id FROM entity_mapping WHERE entity_type = ? AND gestaoclick_id = ? "
+                "ORDER BY rowid DESC LIMIT 1",
+                (entity_type, str(gestaoclick_id))
+            ).fetchone()
+        return row[0] if row else None
+
+    def add_mapping(self, entity_type, bagy_id, gestaoclick_id):
+        """
+        Add a new mapping between Bagy and GestãoClick IDs.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            bagy_id (str): Bagy entity ID
+            gestaoclick_id (str): GestãoClick entity ID
+        """
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entity_mapping (entity_type, bagy_id, gestaoclick_id) VALUES (?, ?, ?)",
+                (entity_type, str(bagy_id), str(gestaoclick_id))
+            )
+        self.logger.debug(f"Added mapping: {entity_type} - Bagy ID {bagy_id} -> GestãoClick ID {gestaoclick_id}")
+
+
+class SQLiteSyncHistory(SQLiteStore):
+    """
+    SQLite version of storage.SyncHistory.
+    """
+
+    @property
+    def history(self):
+        """
+        Full history as a nested dict, for code that still reads SyncHistory.history.
+
+        Returns:
+            dict: {entity_type: {entity_id: {'last_sync': ..., 'version': ...}}}
+        """
+        history = {'products': {}, 'customers': {}, 'orders': {}}
+        with self._lock:
+            rows = self.conn.execute("SELECT entity_type, entity_id, last_sync, version FROM sync_history").fetchall()
+        for entity_type, entity_id, last_sync, version in rows:
+            entry = {'last_sync': last_sync}
+            if version is not None:
+                entry['version'] = version
+            history.setdefault(entity_type, {})[entity_id] = entry
+        return history
+
+    def _get_row(self, entity_type, entity_id):
+        """Fetch (last_sync, version) for an entity, or None."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT last_sync, version FROM sync_history WHERE entity_type = ? AND entity_id = ?",
+                (entity_type, str(entity_id))
+            ).fetchone()
+
+    def get_last_sync(self, entity_type, entity_id):
+        """
+        Get last sync timestamp for an entity.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            entity_id (str): Entity ID
+
+        Returns:
+            str or None: Last sync timestamp if found, None otherwise
+        """
+        row = self._get_row(entity_type, entity_id)
+        return row[0] if row else None
+
+    def get_version(self, entity_type, entity_id):
+        """
+        Get last synced entity version.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            entity_id (str): Entity ID
+
+        Returns:
+            str or None: Entity version if found, None otherwise
+        """
+        row = self._get_row(entity_type, entity_id)
+        return row[1] if row else None
+
+    def update_sync(self, entity_type, entity_id, version=None):
+        """
+        Update sync history for an entity.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            entity_id (str): Entity ID
+            version (str, optional): Entity version
+        """
+        now = datetime.now().isoformat()
+        with self._lock, self.conn:
+            if version is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_history (entity_type, entity_id, last_sync, version) VALUES (?, ?, ?, ?)",
+                    (entity_type, str(entity_id), now, str(version))
+                )
+            else:
+                # Sem versão nova, preservar a versão armazenada
+                self.conn.execute(
+                    "INSERT INTO sync_history (entity_type, entity_id, last_sync) VALUES (?, ?, ?) "
+                    "ON CONFLICT (entity_type, entity_id) DO UPDATE SET last_sync = excluded.last_sync",
+                    (entity_type, str(entity_id), now)
+                )
+        self.logger.debug(f"Updated sync history: {entity_type} - ID {entity_id}")
+
+    def should_sync(self, entity_type, entity_id, current_version=None):
+        """
+        Determine if an entity should be synchronized.
+
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            entity_id (str): Entity ID
+            current_version (str, optional): Current entity version
+
+        Returns:
+            bool: True if the entity should be synchronized, False otherwise
+        """
+        row = self._get_row(entity_type, entity_id)
+
+        # If entity has never been synced, sync it
+        if not row or not row[0]:
+            return True
+
+        # If version is provided, compare with stored version
+        if current_version is not None:
+            return row[1] != current_version
+
+        return False
+
+
+class SQLiteIncompleteProductsStorage(SQLiteStore):
+    """
+    SQLite version of storage.IncompleteProductsStorage.
+    """
+
+    @property
+    def incomplete_products(self):
+        """
+        Full data structure as stored by the JSON implementation.
+
+        Returns:
+            dict: {'products': ..., 'last_update': ..., 'statistics': ...}
+        """
+        return {
+            'products': self.get_all_products(),
+            'last_update': datetime.now().isoformat(),
+            'statistics': self.get_statistics()
+        }
+
+    def add_product(self, product_id, product_name, missing_fields):
+        """
+        Add a product to the incomplete products storage.
+
+        Args:
+            product_id (str): GestãoClick product ID
+            product_name (str): Product name
+            missing_fields (list): List of missing fields
+        """
+        product_id = str(product_id)
+
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO incomplete_products (product_id, name, added_at) VALUES (?, ?, ?)",
+                (product_id, product_name, datetime.now().isoformat())
+            )
+            self.conn.execute("DELETE FROM incomplete_product_fields WHERE product_id = ?", (product_id,))
+            self.conn.executemany(
+                "INSERT INTO incomplete_product_fields (product_id, position, field) VALUES (?, ?, ?)",
+                [(product_id, position, field) for position, field in enumerate(missing_fields)]
+            )
+
+        self.logger.info(f"📋 Produto incompleto registrado: {product_name} - Campos faltantes: {', '.join(missing_fields)}")
+
+    def get_all_products(self):
+        """
+        Get all incomplete products.
+
+        Returns:
+            dict: Incomplete products data
+        """
+        with self._lock:
+            products = self.conn.execute("SELECT product_id, name, added_at FROM incomplete_products").fetchall()
+            fields = self.conn.execute(
+                "SELECT product_id, field FROM incomplete_product_fields ORDER BY product_id, position"
+            ).fetchall()
+
+        result = {
+            product_id: {'name': name, 'missing_fields': [], 'added_at': added_at}
+            for product_id, name, added_at in products
+        }
+        for product_id, field in fields:
+            if product_id in result:
+                result[product_id]['missing_fields'].append(field)
+        return result
+
+    def get_statistics(self):
+        """
+        Get statistics about incomplete products.
+
+        Returns:
+            dict: Statistics data
+        """
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM incomplete_products),
+                    (SELECT COUNT(DISTINCT product_id) FROM incomplete_product_fields
+                        WHERE field = 'descrição'),
+                    (SELECT COUNT(DISTINCT product_id) FROM incomplete_product_fields
+                        WHERE field IN ('altura', 'largura', 'comprimento')),
+                    (SELECT COUNT(DISTINCT product_id) FROM incomplete_product_fields
+                        WHERE field = 'peso'),
+                    (SELECT COUNT(DISTINCT product_id) FROM incomplete_product_fields
+                        WHERE field NOT IN ('descrição', 'altura', 'largura', 'comprimento', 'peso'))
+            """).fetchone()
+
+        return {
+            'total': row[0],
+            'missing_description': row[1],
+            'missing_dimensions': row[2],
+            'missing_weight': row[3],
+            'missing_other': row[4]
+        }
+
+    def clear_product(self, product_id):
+        """
+        Remove a product from the incomplete products storage.
+
+        Args:
+            product_id (str): GestãoClick product ID
+        """
+        product_id = str(product_id)
+
+        with self._lock, self.conn:
+            deleted = self.conn.execute("DELETE FROM incomplete_products WHERE product_id = ?", (product_id,)).rowcount
+
+        if deleted:
+            self.logger.info(f"Produto removido da lista de incompletos: ID {product_id}")
+
+
+def migrate_json_to_sqlite(storage_dir=config.STORAGE_DIR, db_file=config.SQLITE_DB_FILE):
+    """
+    Import the JSON storage files (and any pending journals) into the SQLite database.
+
+    Existing rows with the same keys are replaced, so the migration can be re-run.
+
+    Args:
+        storage_dir (str): Directory with entity_mapping.json, sync_history.json and incomplete_products.json
+        db_file (str): SQLite database file
+
+    Returns:
+        dict: Number of rows imported per table
+    """
+    # Importação local: storage escolhe o backend a partir deste módulo
+    from storage import EntityMapping, SyncHistory, IncompleteProductsStorage
+
+    logger = logging.getLogger("SQLiteMigration")
+    store = SQLiteStore(db_file)
+    counts = {}
+
+    entity_mapping = EntityMapping(os.path.join(storage_dir, "entity_mapping.json"))
+    rows = [
+        (entity_type, str(bagy_id), str(gestaoclick_id))
+        for entity_type, entries in entity_mapping.mapping.items()
+        for bagy_id, gestaoclick_id in entries.items()
+    ]
+    with store.conn:
+        store.conn.executemany(
+            "INSERT OR REPLACE INTO entity_mapping (entity_type, bagy_id, gestaoclick_id) VALUES (?, ?, ?)", rows
+        )
+    counts['entity_mapping'] = len(rows)
+
+    sync_history = SyncHistory(os.path.join(storage_dir, "sync_history.json"))
+    rows = [
+        (entity_type, str(entity_id), entry.get('last_sync'), entry.get('version'))
+        for entity_type, entries in sync_history.history.items()
+        if isinstance(entries, dict)
+        for entity_id, entry in entries.items()
+        if isinstance(entry, dict)
+    ]
+    with store.conn:
+        store.conn.executemany(
+            "INSERT OR REPLACE INTO sync_history (entity_type, entity_id, last_sync, version) VALUES (?, ?, ?, ?)", rows
+        )
+    counts['sync_history'] = len(rows)
+
+    incomplete_products = IncompleteProductsStorage(os.path.join(storage_dir, "incomplete_products.json"))
+    products = incomplete_products.get_all_products()
+    with store.conn:
+        store.conn.executemany(
+            "INSERT OR REPLACE INTO incomplete_products (product_id, name, added_at) VALUES (?, ?, ?)",
+            [(str(product_id), data.get('name'), data.get('added_at')) for product_id, data in products.items()]
+        )
+        store.conn.executemany(
+            "DELETE FROM incomplete_product_fields WHERE product_id = ?",
+            [(str(product_id),) for product_id in products]
+        )
+        store.conn.executemany(
+            "INSERT INTO incomplete_product_fields (product_id, position, field) VALUES (?, ?, ?)",
+            [
+                (str(product_id), position, field)
+                for product_id, data in products.items()
+                for position, field in enumerate(data.get('missing_fields', []))
+            ]
+        )
+    counts['incomplete_products'] = len(products)
+
+    store.close()
+    logger.info(f"✅ Migração para SQLite concluída ({db_file}): {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Importa os arquivos JSON de armazenamento para o SQLite')
+    parser.add_argument('--storage-dir', default=config.STORAGE_DIR, help='Diretório com os arquivos JSON')
+    parser.add_argument('--db', default=config.SQLITE_DB_FILE, help='Arquivo do banco SQLite')
+    args = parser.parse_args()
+
+    migrate_json_to_sqlite(args.storage_dir, args.db)
@@ -4,9 +4,168 @@ Also provides storage for incomplete products that couldn't be synchronized.
 """
 import os
 import json
+import time
+import atexit
 import logging
+import threading
 from datetime import datetime
 import config
+from utils import normalize_document, normalize_email
+
+class StorageJournal:
+    """
+    Append-only journal of mutations for a JSON storage file.
+    
+    Each mutation is one small JSON line in '<storage_file>.journal'. Lines are
+    buffered and written in groups (group commit) once STORAGE_JOURNAL_BATCH_SIZE
+    records are pending or STORAGE_JOURNAL_FLUSH_SECONDS have passed. On close
+    the full document is written once as a snapshot and the journal is truncated.
+    After a crash, replaying the journal over the last snapshot restores the state.
+    
+    The owning store holds `lock` around every mutation of its document, so a
+    snapshot (taken under the same lock) never serializes a dict being changed.
+    """
+    
+    def __init__(self, storage_file, write_snapshot, batch_size=config.STORAGE_JOURNAL_BATCH_SIZE,
+                 flush_interval=config.STORAGE_JOURNAL_FLUSH_SECONDS):
+        """
+        Args:
+            storage_file (str): Path of the JSON snapshot file
+            write_snapshot (callable): Writes the full in-memory document to storage_file
+            batch_size (int): Pending records that trigger a write
+            flush_interval (float): Seconds after which pending records are written
+        """
+        self.journal_file = f"{storage_file}.journal"
+        self.write_snapshot = write_snapshot
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.lock = threading.RLock()
+    
+    @staticmethod
+    def apply(document, record):
+        """
+        Apply one journal record to a document.
+        
+        Args:
+            document (dict): Document to mutate
+            record (dict): {'op': 'set' | 'del', 'path': [...], 'value': ...}
+        """
+        *parents, key = record['path']
+        target = document
+        for part in parents:
+            target = target.setdefault(part, {})
+        
+        if record['op'] == 'set':
+            target[key] = record['value']
+        elif record['op'] == 'del':
+            target.pop(key, None)
+    
+    def replay(self, document):
+        """
+        Replay the journal written since the last snapshot over a document.
+        
+        Args:
+            document (dict): Document loaded from the last snapshot
+            
+        Returns:
+            int: Number of records applied
+        """
+        if not os.path.exists(self.journal_file):
+            return 0
+        
+        applied = 0
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self.apply(document, json.loads(line))
+                    applied += 1
+                except (json.JSONDecodeError, KeyError, ValueError, AttributeError) as e:
+                    # Uma linha incompleta só pode ser a última gravação interrompida
+                    self.logger.warning(f"⚠️ Registro inválido ignorado em {self.journal_file}: {str(e)}")
+        
+        if applied:
+            self.logger.info(f"🔁 {applied} registros recuperados do journal {self.journal_file}")
+        return applied
+    
+    def append(self, op, path, value=None):
+        """
+        Record a mutation, writing the pending group when a threshold is reached.
+        
+        Args:
+            op (str): 'set' or 'del'
+            path (list): Keys from the document root to the mutated entry
+            value: New value for 'set'
+        """
+        record = {'op': op, 'path': path}
+        if op == 'set':
+            record['value'] = value
+        
+        with self.lock:
+            self._pending.append(json.dumps(record))
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+    
+    def flush(self):
+        """Write pending records to the journal file."""
+        with self.lock:
+            if self._pending:
+                try:
+                    os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+                    with open(self.journal_file, 'a') as f:
+                        f.write('\n'.join(self._pending) + '\n')
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._pending = []
+                except Exception as e:
+                    self.logger.error(f"❌ Erro ao gravar journal {self.journal_file}: {str(e)}")
+            self._last_flush = time.monotonic()
+    
+    def compact(self):
+        """
+        Write a full snapshot and truncate the journal.
+        
+        The journal is only removed once the snapshot has replaced the storage file;
+        if the snapshot fails the pending records are written to the journal instead,
+        so nothing recorded since the last snapshot is lost.
+        
+        Returns:
+            bool: True if the snapshot was written
+        """
+        with self.lock:
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                self.logger.error(f"❌ Snapshot de {self.journal_file} não gravado, journal mantido: {str(e)}")
+                self.flush()
+                return False
+            
+            self._pending = []
+            try:
+                if os.path.exists(self.journal_file):
+                    os.remove(self.journal_file)
+            except Exception as e:
+                self.logger.error(f"❌ Erro ao truncar journal {self.journal_file}: {str(e)}")
+            self._last_flush = time.monotonic()
+            return True
+    
+    def close(self):
+        """
+        Compact the journal into the snapshot if anything changed since the last one.
+        
+        Returns:
+            bool: False if the snapshot could not be written (the journal is kept)
+        """
+        with self.lock:
+            if self._pending or os.path.exists(self.journal_file):
+                return self.compact()
+            return True
+
 
 class EntityMapping:
     """
@@ -17,6 +176,11 @@ class EntityMapping:
         self.storage_file = storage_file
         self.logger = logging.getLogger(self.__class__.__name__)
         self.mapping = self._load_mapping()
+        self.journal = StorageJournal(self.storage_file, self._save_mapping)
+        if self.journal.replay(self.mapping):
+            self.journal.compact()
+        self.reverse_mapping = self._build_reverse_mapping()
+        atexit.register(self.close)
     
     def _load_mapping(self):
         """
@@ -57,6 +221,18 @@ class EntityMapping:
             self.logger.error(f"Error loading entity mapping: {str(e)}")
             return default_mapping
     
+    def _build_reverse_mapping(self):
+        """
+        Build the GestãoClick ID -> Bagy ID index from the loaded mappings.
+        
+        Returns:
+            dict: {entity_type: {gestaoclick_id: bagy_id}}
+        """
+        return {
+            entity_type: {gestaoclick_id: bagy_id for bagy_id, gestaoclick_id in entries.items()}
+            for entity_type, entries in self.mapping.items()
+        }
+    
     def _save_mapping(self):
         """Save entity mappings to storage file."""
         try:
@@ -78,6 +254,7 @@ class EntityMapping:
             self.logger.debug("Arquivo de mapeamento de entidades salvo com sucesso")
         except Exception as e:
             self.logger.error(f"❌ Erro ao salvar mapeamento de entidades: {str(e)}")
+            raise
     
     def get_gestaoclick_id(self, entity_type, bagy_id):
         """
@@ -93,6 +270,20 @@ class EntityMapping:
         bagy_id = str(bagy_id)
         return self.mapping.get(entity_type, {}).get(bagy_id)
     
+    def get_bagy_id(self, entity_type, gestaoclick_id):
+        """
+        Get Bagy ID for a given GestãoClick entity ID.
+        
+        Args:
+            entity_type (str): Type of entity ('products', 'customers', 'orders')
+            gestaoclick_id (str): GestãoClick entity ID
+            
+        Returns:
+            str or None: Bagy entity ID if found, None otherwise
+        """
+        gestaoclick_id = str(gestaoclick_id)
+        return self.reverse_mapping.get(entity_type, {}).get(gestaoclick_id)
+    
     def add_mapping(self, entity_type, bagy_id, gestaoclick_id):
         """
         Add a new mapping between Bagy and GestãoClick IDs.
@@ -105,12 +296,28 @@ class EntityMapping:
         bagy_id = str(bagy_id)
         gestaoclick_id = str(gestaoclick_id)
         
-        if entity_type not in self.mapping:
-            self.mapping[entity_type] = {}
-        
-        self.mapping[entity_type][bagy_id] = gestaoclick_id
-        self._save_mapping()
+        with self.journal.lock:
+            if entity_type not in self.mapping:
+                self.mapping[entity_type] = {}
+            reverse = self.reverse_mapping.setdefault(entity_type, {})
+            
+            # Remover a entrada reversa antiga se o ID da Bagy for remapeado
+            previous_id = self.mapping[entity_type].get(bagy_id)
+            if previous_id is not None and reverse.get(previous_id) == bagy_id:
+                del reverse[previous_id]
+            
+            self.mapping[entity_type][bagy_id] = gestaoclick_id
+            reverse[gestaoclick_id] = bagy_id
+            self.journal.append('set', [entity_type, bagy_id], gestaoclick_id)
         self.logger.debug(f"Added mapping: {entity_type} - Bagy ID {bagy_id} -> GestãoClick ID {gestaoclick_id}")
+    
+    def flush(self):
+        """Write pending mapping changes to the journal."""
+        self.journal.flush()
+    
+    def close(self):
+        """Compact pending mapping changes into the storage file."""
+        self.journal.close()
 
 
 class IncompleteProductsStorage:
@@ -123,6 +330,10 @@ class IncompleteProductsStorage:
         self.storage_file = storage_file
         self.logger = logging.getLogger(self.__class__.__name__)
         self.incomplete_products = self._load_products()
+        self.journal = StorageJournal(self.storage_file, self._save_products)
+        if self.journal.replay(self.incomplete_products):
+            self.journal.compact()
+        atexit.register(self.close)
     
     def _load_products(self):
         """
@@ -194,6 +405,7 @@ class IncompleteProductsStorage:
             self.logger.debug("Arquivo de produtos incompletos salvo com sucesso")
         except Exception as e:
             self.logger.error(f"❌ Erro ao salvar produtos incompletos: {str(e)}")
+            raise
     
     def _update_statistics(self):
         """Update statistics about incomplete products."""
@@ -231,13 +443,13 @@ class IncompleteProductsStorage:
         """
         product_id = str(product_id)
         
-        self.incomplete_products['products'][product_id] = {
-            'name': product_name,
-            'missing_fields': missing_fields,
-            'added_at': datetime.now().isoformat()
-        }
-        
-        self._save_products()
+        with self.journal.lock:
+            self.incomplete_products['products'][product_id] = {
+                'name': product_name,
+                'missing_fields': missing_fields,
+                'added_at': datetime.now().isoformat()
+            }
+            self.journal.append('set', ['products', product_id], self.incomplete_products['products'][product_id])
         self.logger.info(f"📋 Produto incompleto registrado: {product_name} - Campos faltantes: {', '.join(missing_fields)}")
     
     def get_all_products(self):
@@ -256,8 +468,9 @@ class IncompleteProductsStorage:
         Returns:
             dict: Statistics data
         """
-        self._update_statistics()
-        return self.incomplete_products['statistics']
+        with self.journal.lock:
+            self._update_statistics()
+            return self.incomplete_products['statistics']
     
     def clear_product(self, product_id):
         """
@@ -268,10 +481,20 @@ class IncompleteProductsStorage:
         """
         product_id = str(product_id)
         
-        if product_id in self.incomplete_products['products']:
+        with self.journal.lock:
+            if product_id not in self.incomplete_products['products']:
+                return
             del self.incomplete_products['products'][product_id]
-            self._save_products()
-            self.logger.info(f"Produto removido da lista de incompletos: ID {product_id}")
+            self.journal.append('del', ['products', product_id])
+        self.logger.info(f"Produto removido da lista de incompletos: ID {product_id}")
+    
+    def flush(self):
+        """Write pending incomplete product changes to the journal."""
+        self.journal.flush()
+    
+    def close(self):
+        """Compact pending incomplete product changes into the storage file."""
+        self.journal.close()
 
 
 class SyncHistory:
@@ -283,6 +506,10 @@ class SyncHistory:
         self.storage_file = storage_file
         self.logger = logging.getLogger(self.__class__.__name__)
         self.history = self._load_history()
+        self.journal = StorageJournal(self.storage_file, self._save_history)
+        if self.journal.replay(self.history):
+            self.journal.compact()
+        atexit.register(self.close)
     
     def _load_history(self):
         """
@@ -344,6 +571,7 @@ class SyncHistory:
             self.logger.debug("Arquivo de histórico de sincronização salvo com sucesso")
         except Exception as e:
             self.logger.error(f"❌ Erro ao salvar histórico de sincronização: {str(e)}")
+            raise
     
     def get_last_sync(self, entity_type, entity_id):
         """
@@ -384,18 +612,19 @@ class SyncHistory:
         """
         entity_id = str(entity_id)
         
-        if entity_type not in self.history:
-            self.history[entity_type] = {}
-        
-        if entity_id not in self.history[entity_type]:
-            self.history[entity_type][entity_id] = {}
-        
-        self.history[entity_type][entity_id]['last_sync'] = datetime.now().isoformat()
-        
-        if version is not None:
-            self.history[entity_type][entity_id]['version'] = str(version)
-        
-        self._save_history()
+        with self.journal.lock:
+            if entity_type not in self.history:
+                self.history[entity_type] = {}
+            
+            if entity_id not in self.history[entity_type]:
+                self.history[entity_type][entity_id] = {}
+            
+            self.history[entity_type][entity_id]['last_sync'] = datetime.now().isoformat()
+            
+            if version is not None:
+                self.history[entity_type][entity_id]['version'] = str(version)
+            
+            self.journal.append('set', [entity_type, entity_id], self.history[entity_type][entity_id])
         self.logger.debug(f"Updated sync history: {entity_type} - ID {entity_id}")
     
     def should_sync(self, entity_type, entity_id, current_version=None):
@@ -422,3 +651,846 @@ class SyncHistory:
             return stored_version != current_version
         
         return False
+    
+    def flush(self):
+        """Write pending sync history changes to the journal."""
+        self.journal.flush()
+    
+    def close(self):
+        """Compact pending sync history changes into the storage file."""
+        self.journal.close()
+
+
+class SyncCursors:
+    """
+    Persists per-entity sync cursors (high-water marks), e.g. the newest
+    'modificado_em' already synchronized and when the last full crawl ran.
+    """
+    
+    def __init__(self, storage_file=config.SYNC_CURSORS_FILE):
+        self.storage_file = storage_file
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self.cursors = self._load_cursors()
+    
+    def _load_cursors(self):
+        """
+        Load cursors from storage file.
+        
+        Returns:
+            dict: {cursor_name: {field: value}}
+        """
+        try:
+            if os.path.exists(self.storage_file):
+                with open(self.storage_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao ler cursores de sincronização: {str(e)}")
+        return {}
+    
+    def _save_cursors(self):
+        """Save cursors to storage file."""
+        try:
+            temp_file = f"{self.storage_file}.tmp"
+            os.makedirs(os.path.dirname(self.storage_file) or '.', exist_ok=True)
+            with open(temp_file, 'w') as f:
+                json.dump(self.cursors, f, indent=2)
+            os.replace(temp_file, self.storage_file)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao salvar cursores de sincronização: {str(e)}")
+    
+    def get(self, name):
+        """
+        Get a cursor.
+        
+        Args:
+            name (str): Cursor name (e.g. 'products')
+            
+        Returns:
+            dict: Cursor fields (empty if never saved)
+        """
+        with self._lock:
+            return dict(self.cursors.get(name, {}))
+    
+    def update(self, name, **values):
+        """
+        Update cursor fields and save them immediately.
+        
+        Args:
+            name (str): Cursor name (e.g. 'products')
+            **values: Fields to set
+        """
+        with self._lock:
+            cursor = self.cursors.setdefault(name, {})
+            cursor.update(values)
+            cursor['updated_at'] = datetime.now().isoformat()
+            self._save_cursors()
+        self.logger.debug(f"Cursor de sincronização atualizado: {name} -> {values}")
+
+
+class SyncCheckpoints:
+    """
+    Persists the checkpoint of an in-progress sync run per entity (see checkpoint.RunCheckpoint),
+    so a run interrupted by a crash or restart can be resumed instead of started over.
+    """
+    
+    def __init__(self, storage_file=config.SYNC_CHECKPOINTS_FILE):
+        self.storage_file = storage_file
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self.checkpoints = self._load_checkpoints()
+    
+    def _load_checkpoints(self):
+        """
+        Load checkpoints from storage file.
+        
+        Returns:
+            dict: {entity: checkpoint}
+        """
+        try:
+            if os.path.exists(self.storage_file):
+                with open(self.storage_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao ler checkpoints de sincronização: {str(e)}")
+        return {}
+    
+    def _save_checkpoints(self):
+        """Save checkpoints to storage file."""
+        try:
+            temp_file = f"{self.storage_file}.tmp"
+            os.makedirs(os.path.dirname(self.storage_file) or '.', exist_ok=True)
+            with open(temp_file, 'w') as f:
+                json.dump(self.checkpoints, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.storage_file)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao salvar checkpoints de sincronização: {str(e)}")
+    
+    def get(self, entity):
+        """
+        Get the checkpoint of an entity's interrupted run.
+        
+        Args:
+            entity (str): Entity name (e.g. 'products_to_bagy')
+            
+        Returns:
+            dict or None: Checkpoint, None if no run is in progress
+        """
+        with self._lock:
+            checkpoint = self.checkpoints.get(entity)
+            return dict(checkpoint) if checkpoint else None
+    
+    def save(self, entity, checkpoint):
+        """
+        Replace an entity's checkpoint and save it immediately.
+        
+        Args:
+            entity (str): Entity name
+            checkpoint (dict): Checkpoint state
+        """
+        with self._lock:
+            self.checkpoints[entity] = checkpoint
+            self._save_checkpoints()
+    
+    def clear(self, entity):
+        """
+        Remove an entity's checkpoint (run finished).
+        
+        Args:
+            entity (str): Entity name
+        """
+        with self._lock:
+            if self.checkpoints.pop(entity, None) is not None:
+                self._save_checkpoints()
+
+
+class ProductCatalogIndex:
+    """
+    Local index of Bagy products keyed by Bagy ID, external_id and SKU.
+    
+    The index is built from a single paginated crawl of Bagy's /products and kept
+    up to date with every create/update response, so lookups never hit the API.
+    """
+    
+    # Campos mantidos no índice (o suficiente para os sincronizadores decidirem entre criar/atualizar)
+    INDEXED_FIELDS = ['id', 'external_id', 'sku', 'reference', 'code', 'name', 'price', 'balance', 'active', 'type']
+    
+    def __init__(self, storage_file=config.PRODUCT_INDEX_FILE):
+        self.storage_file = storage_file
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.index = self._load_index()
+        self.journal = StorageJournal(self.storage_file, self._save_index)
+        if self.journal.replay(self.index):
+            self.journal.compact()
+        atexit.register(self.close)
+        self._by_external_id = {}
+        self._by_sku = {}
+        # Alterações recebidas durante uma varredura em andamento (ID -> resumo, None se removido)
+        self._crawl_changes = None
+        self._rebuild_lookups()
+    
+    def _load_index(self):
+        """
+        Load the product index from storage file.
+        
+        Returns:
+            dict: Index data structure
+        """
+        default_index = {
+            'built_at': None,
+            'products': {}
+        }
+        
+        try:
+            if os.path.exists(self.storage_file):
+                try:
+                    with open(self.storage_file, 'r') as f:
+                        return json.load(f)
+                except json.JSONDecodeError as e:
+                    self.logger.error(f"❌ Erro ao ler índice de produtos (JSON corrompido): {str(e)}")
+                    
+                    # O índice pode ser reconstruído a partir da Bagy, então apenas descartamos o arquivo
+                    backup_file = f"{self.storage_file}.bak.{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                    try:
+                        os.rename(self.storage_file, backup_file)
+                        self.logger.info(f"✅ Backup do índice de produtos corrompido criado: {backup_file}")
+                    except Exception as rename_error:
+                        self.logger.error(f"❌ Não foi possível criar backup do índice: {str(rename_error)}")
+                    
+                    return default_index
+            else:
+                return default_index
+        except Exception as e:
+            self.logger.error(f"Error loading product index: {str(e)}")
+            return default_index
+    
+    def _save_index(self):
+        """Save the product index to storage file."""
+        try:
+            temp_file = f"{self.storage_file}.tmp"
+            os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
+            
+            with open(temp_file, 'w') as f:
+                json.dump(self.index, f)
+            
+            os.replace(temp_file, self.storage_file)
+            self.logger.debug("Índice de produtos salvo com sucesso")
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao salvar índice de produtos: {str(e)}")
+            raise
+    
+    def _rebuild_lookups(self):
+        """Rebuild the in-memory external_id and SKU lookups from the stored products."""
+        self._by_external_id, self._by_sku = self._build_lookups(self.index['products'])
+    
+    @staticmethod
+    def _build_lookups(products):
+        """
+        Build external_id and SKU lookups for a set of products.
+        
+        Args:
+            products (dict): Bagy ID → indexed product
+            
+        Returns:
+            tuple: (external_id → Bagy ID, SKU → Bagy ID)
+        """
+        by_external_id = {}
+        by_sku = {}
+        for bagy_id, product in products.items():
+            if product.get('external_id') not in (None, ''):
+                by_external_id[str(product['external_id'])] = bagy_id
+            if product.get('sku') not in (None, ''):
+                by_sku[str(product['sku'])] = bagy_id
+        return by_external_id, by_sku
+    
+    def _add_lookups(self, bagy_id, product):
+        """Register a product in the external_id and SKU lookups."""
+        if product.get('external_id') not in (None, ''):
+            self._by_external_id[str(product['external_id'])] = bagy_id
+        if product.get('sku') not in (None, ''):
+            self._by_sku[str(product['sku'])] = bagy_id
+    
+    def _remove_lookups(self, bagy_id):
+        """Drop a product's current entries from the external_id and SKU lookups."""
+        product = self.index['products'].get(bagy_id)
+        if not product:
+            return
+        if self._by_external_id.get(str(product.get('external_id'))) == bagy_id:
+            del self._by_external_id[str(product.get('external_id'))]
+        if self._by_sku.get(str(product.get('sku'))) == bagy_id:
+            del self._by_sku[str(product.get('sku'))]
+    
+    def _summarize(self, product):
+        """Keep only the indexed fields of a Bagy product payload."""
+        return {field: product.get(field) for field in self.INDEXED_FIELDS if field in product}
+    
+    def is_built(self, max_age_minutes=config.PRODUCT_INDEX_MAX_AGE_MINUTES):
+        """
+        Check whether the index was built from a full crawl recently enough to be trusted.
+        
+        Args:
+            max_age_minutes (int): Maximum age of the last full crawl
+            
+        Returns:
+            bool: True if the index can answer lookups without hitting the API
+        """
+        built_at = self.index.get('built_at')
+        if not built_at:
+            return False
+        try:
+            age = (datetime.now() - datetime.fromisoformat(built_at)).total_seconds() / 60
+        except ValueError:
+            return False
+        return age <= max_age_minutes
+    
+    def rebuild(self, products):
+        """
+        Replace the index contents with the result of a full catalog crawl.
+        
+        The new index is assembled apart and swapped in at the end, so concurrent
+        lookups never see an empty or partial index. Products upserted or removed
+        while the crawl runs are merged into the new index before the swap, since
+        the crawl may have read them before the change.
+        
+        Args:
+            products (iterable): All products returned by Bagy's /products, consumed
+                lazily so that changes made during the crawl are tracked
+        """
+        with self.journal.lock:
+            self._crawl_changes = {}
+        try:
+            indexed = {}
+            for product in products:
+                if product.get('id') is None:
+                    continue
+                indexed[str(product['id'])] = self._summarize(product)
+            
+            with self.journal.lock:
+                for bagy_id, summary in self._crawl_changes.items():
+                    if summary is None:
+                        indexed.pop(bagy_id, None)
+                    else:
+                        indexed[bagy_id] = summary
+                by_external_id, by_sku = self._build_lookups(indexed)
+                self.index = {
+                    'built_at': datetime.now().isoformat(),
+                    'products': indexed
+                }
+                self._by_external_id, self._by_sku = by_external_id, by_sku
+                self.journal.compact()
+        finally:
+            with self.journal.lock:
+                self._crawl_changes = None
+        self.logger.info(f"📇 Índice de produtos reconstruído com {len(self.index['products'])} produtos")
+    
+    def upsert(self, product):
+        """
+        Add or update a product from a Bagy create/update response.
+        
+        Args:
+            product (dict): Product data returned by Bagy (must contain 'id')
+        """
+        if not product or product.get('id') is None:
+            return
+        
+        bagy_id = str(product['id'])
+        with self.journal.lock:
+            self._remove_lookups(bagy_id)
+            
+            summary = self.index['products'].get(bagy_id, {})
+            summary.update(self._summarize(product))
+            self.index['products'][bagy_id] = summary
+            
+            self._add_lookups(bagy_id, summary)
+            self.journal.append('set', ['products', bagy_id], summary)
+            if self._crawl_changes is not None:
+                self._crawl_changes[bagy_id] = summary
+        self.logger.debug(f"Índice de produtos atualizado: Bagy ID {bagy_id}")
+    
+    def remove(self, bagy_id):
+        """
+        Remove a product from the index.
+        
+        Args:
+            bagy_id (str): Bagy product ID
+        """
+        bagy_id = str(bagy_id)
+        with self.journal.lock:
+            if self._crawl_changes is not None:
+                self._crawl_changes[bagy_id] = None
+            if bagy_id in self.index['products']:
+                self._remove_lookups(bagy_id)
+                del self.index['products'][bagy_id]
+                self.journal.append('del', ['products', bagy_id])
+    
+    def get_by_id(self, bagy_id):
+        """
+        Get an indexed product by Bagy ID.
+        
+        Args:
+            bagy_id (str): Bagy product ID
+            
+        Returns:
+            dict or None: Indexed product data if found, None otherwise
+        """
+        return self.index['products'].get(str(bagy_id))
+    
+    def get_by_external_id(self, external_id):
+        """
+        Get an indexed product by external_id.
+        
+        Args:
+            external_id (str): External product ID (GestãoClick ID)
+            
+        Returns:
+            dict or None: Indexed product data if found, None otherwise
+        """
+        bagy_id = self._by_external_id.get(str(external_id))
+        return self.index['products'].get(bagy_id) if bagy_id else None
+    
+    def get_by_sku(self, sku):
+        """
+        Get an indexed product by SKU.
+        
+        Args:
+            sku (str): Product SKU
+            
+        Returns:
+            dict or None: Indexed product data if found, None otherwise
+        """
+        bagy_id = self._by_sku.get(str(sku))
+        return self.index['products'].get(bagy_id) if bagy_id else None
+    
+    def __len__(self):
+        return len(self.index['products'])
+    
+    def flush(self):
+        """Write pending index changes to the journal."""
+        self.journal.flush()
+    
+    def close(self):
+        """Compact pending index changes into the storage file."""
+        self.journal.close()
+
+
+class CustomerIndex:
+    """
+    Local index of GestãoClick customers by CPF/CNPJ and email.
+    
+    The index is built from a single paginated crawl of GestãoClick's /clientes and
+    kept up to date with every create/update response, so duplicate checks are
+    dictionary lookups instead of one search request per document and email.
+    """
+    
+    # Campos mantidos no índice
+    INDEXED_FIELDS = ['id', 'nome', 'cpf_cnpj', 'email']
+    
+    def __init__(self, storage_file=config.CUSTOMER_INDEX_FILE):
+        self.storage_file = storage_file
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.index = self._load_index()
+        self.journal = StorageJournal(self.storage_file, self._save_index)
+        if self.journal.replay(self.index):
+            self.journal.compact()
+        atexit.register(self.close)
+        self._by_document = {}
+        self._by_email = {}
+        # Clientes alterados durante uma varredura em andamento (ID -> resumo)
+        self._crawl_changes = None
+        self._rebuild_lookups()
+    
+    def _load_index(self):
+        """
+        Load the customer index from storage file.
+        
+        Returns:
+            dict: Index data structure
+        """
+        default_index = {
+            'built_at': None,
+            'customers': {}
+        }
+        
+        try:
+            if os.path.exists(self.storage_file):
+                try:
+                    with open(self.storage_file, 'r') as f:
+                        return json.load(f)
+                except json.JSONDecodeError as e:
+                    self.logger.error(f"❌ Erro ao ler índice de clientes (JSON corrompido): {str(e)}")
+                    
+                    # O índice pode ser reconstruído a partir do GestãoClick, então apenas descartamos o arquivo
+                    backup_file = f"{self.storage_file}.bak.{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                    try:
+                        os.rename(self.storage_file, backup_file)
+                        self.logger.info(f"✅ Backup do índice de clientes corrompido criado: {backup_file}")
+                    except Exception as rename_error:
+                        self.logger.error(f"❌ Não foi possível criar backup do índice: {str(rename_error)}")
+                    
+                    return default_index
+            else:
+                return default_index
+        except Exception as e:
+            self.logger.error(f"Error loading customer index: {str(e)}")
+            return default_index
+    
+    def _save_index(self):
+        """Save the customer index to storage file."""
+        try:
+            temp_file = f"{self.storage_file}.tmp"
+            os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
+            
+            with open(temp_file, 'w') as f:
+                json.dump(self.index, f)
+            
+            os.replace(temp_file, self.storage_file)
+            self.logger.debug("Índice de clientes salvo com sucesso")
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao salvar índice de clientes: {str(e)}")
+            raise
+    
+    def _rebuild_lookups(self):
+        """Rebuild the in-memory document and email lookups from the stored customers."""
+        self._by_document, self._by_email = self._build_lookups(self.index['customers'])
+    
+    @staticmethod
+    def _build_lookups(customers):
+        """
+        Build document and email lookups for a set of customers.
+        
+        Args:
+            customers (dict): GestãoClick ID → indexed customer
+            
+        Returns:
+            tuple: (document → ID, email → ID)
+        """
+        by_document = {}
+        by_email = {}
+        for customer_id, customer in customers.items():
+            document = normalize_document(customer.get('cpf_cnpj'))
+            if document:
+                by_document[document] = customer_id
+            email = normalize_email(customer.get('email'))
+            if email:
+                by_email[email] = customer_id
+        return by_document, by_email
+    
+    def _add_lookups(self, customer_id, customer):
+        """Register a customer in the document and email lookups."""
+        document = normalize_document(customer.get('cpf_cnpj'))
+        if document:
+            self._by_document[document] = customer_id
+        email = normalize_email(customer.get('email'))
+        if email:
+            self._by_email[email] = customer_id
+    
+    def _remove_lookups(self, customer_id):
+        """Drop a customer's current entries from the document and email lookups."""
+        customer = self.index['customers'].get(customer_id)
+        if not customer:
+            return
+        document = normalize_document(customer.get('cpf_cnpj'))
+        if self._by_document.get(document) == customer_id:
+            del self._by_document[document]
+        email = normalize_email(customer.get('email'))
+        if self._by_email.get(email) == customer_id:
+            del self._by_email[email]
+    
+    def _summarize(self, customer):
+        """Keep only the indexed fields of a GestãoClick customer payload."""
+        return {field: customer.get(field) for field in self.INDEXED_FIELDS if field in customer}
+    
+    def is_built(self, max_age_minutes=config.CUSTOMER_INDEX_MAX_AGE_MINUTES):
+        """
+        Check whether the index was built from a full crawl recently enough to be trusted.
+        
+        Args:
+            max_age_minutes (int): Maximum age of the last full crawl
+            
+        Returns:
+            bool: True if the index can answer lookups without hitting the API
+        """
+        built_at = self.index.get('built_at')
+        if not built_at:
+            return False
+        try:
+            age = (datetime.now() - datetime.fromisoformat(built_at)).total_seconds() / 60
+        except ValueError:
+            return False
+        return age <= max_age_minutes
+    
+    def rebuild(self, customers):
+        """
+        Replace the index contents with the result of a full crawl.
+        
+        The new index is assembled apart and swapped in only once the crawl has
+        finished: if the crawl fails midway the previous index is kept (and keeps
+        its age), and concurrent lookups never see an empty or partial index.
+        Customers upserted while the crawl runs are merged into the new index
+        before the swap, since the crawl may have read them before the change.
+        
+        Args:
+            customers (iterable): All customers returned by GestãoClick's /clientes,
+                consumed lazily so that changes made during the crawl are tracked
+        """
+        with self.journal.lock:
+            self._crawl_changes = {}
+        try:
+            indexed = {}
+            for customer in customers:
+                if customer.get('id') is None:
+                    continue
+                indexed[str(customer['id'])] = self._summarize(customer)
+            
+            with self.journal.lock:
+                indexed.update(self._crawl_changes)
+                by_document, by_email = self._build_lookups(indexed)
+                self.index = {
+                    'built_at': datetime.now().isoformat(),
+                    'customers': indexed
+                }
+                self._by_document, self._by_email = by_document, by_email
+                self.journal.compact()
+        finally:
+            with self.journal.lock:
+                self._crawl_changes = None
+        self.logger.info(f"📇 Índice de clientes reconstruído com {len(self.index['customers'])} clientes")
+    
+    def upsert(self, customer):
+        """
+        Add or update a customer from a GestãoClick create/update.
+        
+        Args:
+            customer (dict): Customer data (must contain 'id')
+        """
+        if not customer or customer.get('id') is None:
+            return
+        
+        customer_id = str(customer['id'])
+        with self.journal.lock:
+            self._remove_lookups(customer_id)
+            
+            summary = self.index['customers'].get(customer_id, {})
+            summary.update(self._summarize(customer))
+            self.index['customers'][customer_id] = summary
+            
+            self._add_lookups(customer_id, summary)
+            self.journal.append('set', ['customers', customer_id], summary)
+            if self._crawl_changes is not None:
+                self._crawl_changes[customer_id] = summary
+        self.logger.debug(f"Índice de clientes atualizado: GestãoClick ID {customer_id}")
+    
+    def find(self, document=None, email=None):
+        """
+        Find an indexed customer by CPF/CNPJ, then by email.
+        
+        Args:
+            document (str, optional): CPF/CNPJ, formatted or not
+            email (str, optional): Email address
+            
+        Returns:
+            dict or None: Indexed customer data if found, None otherwise
+        """
+        customer_id = self._by_document.get(normalize_document(document)) if document else None
+        if customer_id is None and email:
+            customer_id = self._by_email.get(normalize_email(email))
+        return self.index['customers'].get(customer_id) if customer_id else None
+    
+    def __len__(self):
+        return len(self.index['customers'])
+    
+    def flush(self):
+        """Write pending index changes to the journal."""
+        self.journal.flush()
+    
+    def close(self):
+        """Compact pending index changes into the storage file."""
+        self.journal.close()
+
+
+def open_entity_mapping(storage_file=config.ENTITY_MAPPING_FILE):
+    """
+    Open the entity mapping storage for the configured backend (STORAGE_BACKEND).
+    
+    Args:
+        storage_file (str): JSON file, used by the 'json' backend
+        
+    Returns:
+        EntityMapping or SQLiteEntityMapping: Entity mapping storage
+    """
+    if config.STORAGE_BACKEND == 'sqlite':
+        from sqlite_storage import SQLiteEntityMapping
+        return SQLiteEntityMapping(config.SQLITE_DB_FILE)
+    return EntityMapping(storage_file)
+
+
+def open_sync_history(storage_file=config.SYNC_HISTORY_FILE):
+    """
+    Open the sync history storage for the configured backend (STORAGE_BACKEND).
+    
+    Args:
+        storage_file (str): JSON file, used by the 'json' backend
+        
+    Returns:
+        SyncHistory or SQLiteSyncHistory: Sync history storage
+    """
+    if config.STORAGE_BACKEND == 'sqlite':
+        from sqlite_storage import SQLiteSyncHistory
+        return SQLiteSyncHistory(config.SQLITE_DB_FILE)
+    return SyncHistory(storage_file)
+
+
+def open_incomplete_products_storage(storage_file=config.INCOMPLETE_PRODUCTS_FILE):
+    """
+    Open the incomplete products storage for the configured backend (STORAGE_BACKEND).
+    
+    Args:
+        storage_file (str): JSON file, used by the 'json' backend
+        
+    Returns:
+        IncompleteProductsStorage or SQLiteIncompleteProductsStorage: Incomplete products storage
+    """
+    if config.STORAGE_BACKEND == 'sqlite':
+        from sqlite_storage import SQLiteIncompleteProductsStorage
+        return SQLiteIncompleteProductsStorage(config.SQLITE_DB_FILE)
+    return IncompleteProductsStorage(storage_file)
+
+
+class NameLookupCache:
+    """
+    Disk-backed, TTL'd name -> Bagy ID cache for lookup entities (colors, categories).
+    
+    The cache is warmed from one paginated crawl and updated from create responses.
+    While it is fresh, a name missing from it is known not to exist in Bagy, so
+    callers can create it straight away instead of searching the API again.
+    """
+    
+    def __init__(self, storage_file, ttl_minutes=config.LOOKUP_CACHE_TTL_MINUTES):
+        self.storage_file = storage_file
+        self.ttl_minutes = ttl_minutes
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cache = self._load_cache()
+        self.journal = StorageJournal(self.storage_file, self._save_cache)
+        # Mesmo lock do journal: o snapshot nunca serializa o cache durante uma alteração
+        self._lock = self.journal.lock
+        if self.journal.replay(self.cache):
+            self.journal.compact()
+        atexit.register(self.close)
+    
+    def _load_cache(self):
+        """
+        Load the cache from storage file.
+        
+        Returns:
+            dict: {'warmed_at': ..., 'entries': {lowercase_name: id}}
+        """
+        default_cache = {
+            'warmed_at': None,
+            'entries': {}
+        }
+        
+        try:
+            if os.path.exists(self.storage_file):
+                with open(self.storage_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            # O cache pode ser reconstruído a partir da Bagy
+            self.logger.error(f"❌ Erro ao ler cache {self.storage_file}: {str(e)}")
+        return default_cache
+    
+    def _save_cache(self):
+        """Save the cache to storage file."""
+        try:
+            temp_file = f"{self.storage_file}.tmp"
+            os.makedirs(os.path.dirname(self.storage_file) or '.', exist_ok=True)
+            
+            with open(temp_file, 'w') as f:
+                json.dump(self.cache, f)
+            
+            os.replace(temp_file, self.storage_file)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao salvar cache {self.storage_file}: {str(e)}")
+            raise
+    
+    def is_fresh(self):
+        """
+        Check whether the cache was warmed from Bagy within its TTL.
+        
+        Returns:
+            bool: True if a miss means the name does not exist in Bagy
+        """
+        warmed_at = self.cache.get('warmed_at')
+        if not warmed_at:
+            return False
+        try:
+            age = (datetime.now() - datetime.fromisoformat(warmed_at)).total_seconds() / 60
+        except ValueError:
+            return False
+        return age <= self.ttl_minutes
+    
+    def warm(self, items):
+        """
+        Replace the cache contents with the result of a full crawl.
+        
+        Args:
+            items (list): Entities returned by Bagy (with 'name' and 'id')
+        """
+        with self._lock:
+            self.cache = {
+                'warmed_at': datetime.now().isoformat(),
+                'entries': {
+                    str(item['name']).lower(): item['id']
+                    for item in items
+                    if item.get('name') and item.get('id') is not None
+                }
+            }
+            self.journal.compact()
+        self.logger.info(f"🗂️ Cache {os.path.basename(self.storage_file)} aquecido com {len(self.cache['entries'])} itens")
+    
+    def get(self, name, default=None):
+        """
+        Get the Bagy ID cached for a name (case-insensitive).
+        
+        Args:
+            name (str): Entity name
+            default: Value returned when the name is not cached
+            
+        Returns:
+            ID cached for the name, or default
+        """
+        return self.cache['entries'].get(str(name).lower(), default)
+    
+    def set(self, name, entity_id):
+        """
+        Cache the Bagy ID of a name, e.g. from a create response.
+        
+        Args:
+            name (str): Entity name
+            entity_id: Bagy ID
+        """
+        key = str(name).lower()
+        with self._lock:
+            self.cache['entries'][key] = entity_id
+            self.journal.append('set', ['entries', key], entity_id)
+    
+    def __contains__(self, name):
+        return str(name).lower() in self.cache['entries']
+    
+    def __getitem__(self, name):
+        return self.cache['entries'][str(name).lower()]
+    
+    def __setitem__(self, name, entity_id):
+        self.set(name, entity_id)
+    
+    def __len__(self):
+        return len(self.cache['entries'])
+    
+    def flush(self):
+        """Write pending cache changes to the journal."""
+        self.journal.flush()
+    
+    def close(self):
+        """Compact pending cache changes into the storage file."""
+        self.journal.close()
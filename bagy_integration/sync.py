@@ -8,8 +8,11 @@ From Bagy to GestãoClick:
 From GestãoClick to Bagy:
 - Products
 """
+import itertools
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import traceback
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -18,8 +21,11 @@ from apscheduler.triggers.interval import IntervalTrigger
 import config
 from api_clients import BagyClient, GestaoClickClient
 from models import ProductConverter, CustomerConverter, OrderConverter
-from storage import EntityMapping, SyncHistory, IncompleteProductsStorage
-from utils import generate_entity_version, paginate_all_results, extract_business_entity_id
+from storage import open_entity_mapping, open_sync_history, open_incomplete_products_storage
+from utils import generate_entity_version, paginate_all_results, normalize_document, normalize_email
+from incremental_sync import IncrementalProductFeed, IncrementalOrderFeed
+from sync_pipeline import SyncPipeline, ItemFailed
+from checkpoint import RunCheckpoint
 
 class BidirectionalSynchronizer:
     """
@@ -50,9 +56,23 @@ class BidirectionalSynchronizer:
         self.order_converter = OrderConverter()
         
         # Initialize storage components
-        self.entity_mapping = EntityMapping()
-        self.sync_history = SyncHistory()
-        self.incomplete_products_storage = IncompleteProductsStorage()
+        self.entity_mapping = open_entity_mapping()
+        self.sync_history = open_sync_history()
+        self.incomplete_products_storage = open_incomplete_products_storage()
+        
+        # GestãoClick products changed since the last successful run
+        self.product_feed = IncrementalProductFeed(self.gestaoclick_client)
+        
+        # Bagy orders changed since the last successful run, plus periodic sweeps of open orders
+        self.order_feed = IncrementalOrderFeed(self.bagy_client)
+        
+        # Product writes left in flight by an interrupted run, checked on Bagy before creating
+        self._replay_product_ids = frozenset()
+        
+        # Set by sync_all while customers and orders run concurrently: Bagy customer ID -> Event
+        # set once that customer has been processed, so each order waits only on its own customer
+        self._customer_gates = {}
+        self._customer_gates_ready = None
     
     # Os métodos antigos para gerenciamento de produtos incompletos foram substituídos pela classe IncompleteProductsStorage
             
@@ -70,12 +90,12 @@ class BidirectionalSynchronizer:
             if not category_name:
                 return None
                 
-            # Verifica se a categoria já existe
-            category = self.bagy_client.get_category_by_name(category_name)
+            # Verifica se a categoria já existe (cache de categorias, sem chamada à API enquanto válido)
+            category_id = self.bagy_client.find_category_id(category_name)
             
-            if category:
-                self.logger.debug(f"Categoria '{category_name}' já existe (ID: {category.get('id')})")
-                return category.get('id')
+            if category_id:
+                self.logger.debug(f"Categoria '{category_name}' já existe (ID: {category_id})")
+                return category_id
                 
             # Se não existir, cria a categoria
             self.logger.info(f"🔄 Criando categoria '{category_name}' na Bagy")
@@ -101,10 +121,222 @@ class BidirectionalSynchronizer:
             self.logger.error(f"❌ Erro ao verificar/criar categoria '{category_name}': {str(e)}")
             return None
     
+    def _convert_gestao_product(self, gestao_product):
+        """
+        Pipeline convert stage: check the sync history and convert a GestãoClick product.
+        
+        Args:
+            gestao_product (dict): GestãoClick product
+            
+        Returns:
+            dict or None: Work item for the diff stage, or None if the product is unchanged
+        """
+        product_id = gestao_product.get('id')
+        if not product_id:
+            self.logger.warning("Skipping product without ID")
+            return None
+        
+        # Generate a version hash for the product
+        product_version = generate_entity_version(gestao_product, 'gestaoclick_products')
+        
+        # Check if product should be synchronized
+        if not self.sync_history.should_sync('products_to_bagy', product_id, product_version):
+            self.logger.debug(f"Product {product_id} hasn't changed, skipping")
+            return None
+        
+        # Verificar se o produto estava previamente na lista de incompletos
+        # Se estiver com todos os campos agora, remover da lista
+        product_name = gestao_product.get('nome', 'Produto sem nome')
+        
+        # Log adicional para variações
+        if gestao_product.get('possui_variacao') in ["1", 1, True]:
+            self.logger.info(f"🛒 Produto com variações: {gestao_product.get('nome', '')} (ID: {product_id})")
+            
+            # Verificar se temos o campo variacoes e se não está vazio
+            if 'variacoes' in gestao_product and gestao_product['variacoes']:
+                self.logger.info(f"🛒 Número de variações: {len(gestao_product['variacoes'])}")
+            else:
+                self.logger.warning(f"⚠️ Produto marcado com variações, mas lista de variações vazia ou ausente: {gestao_product.get('nome', '')}")
+        
+        # Log específico para o produto EGG que sabemos ter variações
+        if gestao_product.get('codigo_interno') == 'EGG' or 'egg' in gestao_product.get('nome', '').lower():
+            self.logger.info(f"🥚 Produto EGG encontrado: {gestao_product.get('nome', '')} (ID: {product_id})")
+            self.logger.info(f"🥚 Possui variação marcada: {gestao_product.get('possui_variacao')}")
+        
+        # Convert product to Bagy format
+        result = self.product_converter.gestaoclick_to_bagy(gestao_product)
+        
+        # Verificar se o produto tem todos os campos obrigatórios
+        if isinstance(result, tuple):
+            bagy_product, missing_fields = result
+            
+            # Registramos o produto como incompleto para referência futura
+            # Usar log menos verboso (debug) para não poluir a saída principal
+            self.logger.debug(f"⚠️ Produto {product_name} (ID: {product_id}) tem campos faltando: {', '.join(missing_fields)}")
+            
+            # Armazenar informações sobre produtos incompletos usando a nova classe
+            self.incomplete_products_storage.add_product(product_id, product_name, missing_fields)
+            
+            # Verificar se são apenas dimensões ou SKU faltando
+            campos_criticos = ['descrição']
+            
+            if any(campo in campos_criticos for campo in missing_fields):
+                # Se faltar algum campo crítico, não processar o produto
+                self.logger.warning(f"❌ Produto {product_name} (ID: {product_id}) não pode ser sincronizado. Campo crítico faltando: descrição")
+                raise ItemFailed(product_id)
+            
+            # Neste ponto, temos um produto com campos não críticos faltando (altura, largura, etc)
+            # Vamos continuar com a criação do produto, pois os campos faltantes serão preenchidos pelo API client
+        
+        # Verificar se o resultado da conversão é uma tupla (None, missing_fields)
+        # Isso significa que o produto não tem todos os campos necessários
+        if isinstance(result, tuple) and result[0] is None:
+            missing_fields = result[1]
+            self.logger.warning(f"❌ Produto {product_id} não pode ser sincronizado. Campos críticos faltando: {', '.join(missing_fields)}")
+            # Adicionar à lista de produtos incompletos usando a nova classe
+            product_name = gestao_product.get('nome', '')
+            self.incomplete_products_storage.add_product(product_id, product_name, missing_fields)
+            raise ItemFailed(product_id)
+        
+        # Se chegou aqui, o produto está completo
+        # Remover da lista de incompletos, se existir
+        self.incomplete_products_storage.clear_product(product_id)
+        
+        return {
+            'gestao_product': gestao_product,
+            'product_id': product_id,
+            'product_version': product_version,
+            'bagy_product': result[0] if isinstance(result, tuple) else result
+        }
+    
+    def _diff_gestao_product(self, item):
+        """
+        Pipeline diff stage: resolve the category and compare with the product already in Bagy.
+        
+        Args:
+            item (dict): Work item from the convert stage
+            
+        Returns:
+            dict: Work item for the write stage
+        """
+        gestao_product = item['gestao_product']
+        bagy_product = item['bagy_product']
+        
+        # Verificar e criar categoria, se necessário
+        category_name = gestao_product.get('nome_grupo')
+        category_id = None
+        if category_name:
+            category_id = self._ensure_category_exists(category_name)
+            if category_id:
+                # Atualizar o objeto do produto com o ID da categoria
+                bagy_product["category_default_id"] = str(category_id)
+                bagy_product["category_ids"] = [int(category_id)]  # array de integers
+            else:
+                # Remover os campos de categoria se não conseguimos criar/encontrar a categoria
+                if "category_default_id" in bagy_product:
+                    del bagy_product["category_default_id"]
+                if "category_ids" in bagy_product:
+                    del bagy_product["category_ids"]
+        
+        # Check if product already exists in Bagy
+        bagy_id = self.entity_mapping.get_bagy_id('products', item['product_id'])
+        
+        # Verificação inicial - todos os produtos precisam estar sincronizados corretamente
+        # Inicialmente não forçamos sincronização, a menos que haja uma razão específica
+        force_sync = False
+        
+        # Verificar se o campo SKU precisa ser atualizado (para corrigir produtos criados antes da correção)
+        should_update_sku = False
+        if bagy_id:
+            # Buscar produto atual na Bagy para verificar se o SKU está correto
+            try:
+                current_bagy_product = self.bagy_client.get_product_by_id(bagy_id)
+                
+                # Se o SKU atual é diferente do código interno do GestãoClick, precisamos atualizar
+                if current_bagy_product and (
+                    current_bagy_product.get('sku') != gestao_product.get('codigo_interno') or 
+                    not current_bagy_product.get('sku')
+                ):
+                    self.logger.info(f"🔄 SKU desatualizado detectado: atual={current_bagy_product.get('sku')}, novo={gestao_product.get('codigo_interno')}")
+                    should_update_sku = True
+                    force_sync = True
+            except Exception as e:
+                self.logger.warning(f"Erro ao buscar produto na Bagy para verificar SKU: {str(e)}")
+        
+        item.update({'bagy_id': bagy_id, 'force_sync': force_sync, 'should_update_sku': should_update_sku})
+        return item
+    
+    def _write_gestao_product(self, item):
+        """
+        Pipeline write stage: create or update the product in Bagy and record the sync.
+        
+        Args:
+            item (dict): Work item from the diff stage
+            
+        Returns:
+            dict: The written work item
+        """
+        gestao_product = item['gestao_product']
+        bagy_product = item['bagy_product']
+        product_id = item['product_id']
+        bagy_id = item['bagy_id']
+        
+        if bagy_id and not item['force_sync']:
+            # Update existing product
+            self.logger.info(f"🔄 Atualizando produto {product_id} (Bagy ID: {bagy_id})")
+            result = self.bagy_client.update_product(bagy_id, bagy_product)
+        elif bagy_id and item['force_sync']:
+            # Forçar atualização do produto existente
+            self.logger.info(f"🔄 Atualizando produto {product_id} (Bagy ID: {bagy_id}) - FORÇADO")
+            if item['should_update_sku']:
+                self.logger.info(f"🔄 Atualizando SKU para {gestao_product.get('codigo_interno')}")
+            
+            # Log especial para variações
+            possui_variacao = gestao_product.get('possui_variacao') in ["1", 1, True]
+            if possui_variacao and 'variacoes' in gestao_product and gestao_product['variacoes']:
+                self.logger.info(f"🔄 Sincronizando {len(gestao_product['variacoes'])} variações para o produto {product_id}")
+                for var_item in gestao_product['variacoes']:
+                    var = var_item.get('variacao', {})
+                    if var:
+                        self.logger.info(f"  - Variação: {var.get('nome', 'Sem nome')} (ID: {var.get('id')}, Código: {var.get('codigo', '')})")
+            
+            result = self.bagy_client.update_product(bagy_id, bagy_product)
+        else:
+            # Escrita em andamento quando a execução anterior foi interrompida: o produto pode já
+            # ter sido criado sem que o mapeamento tenha sido gravado
+            replayed = None
+            if str(product_id) in self._replay_product_ids:
+                external_id = bagy_product.get('external_id') or product_id
+                replayed = self.bagy_client.get_product_by_external_id(str(external_id), remote=True)
+            
+            if replayed and replayed.get('id'):
+                self.logger.info(f"🔁 Produto {product_id} já criado na execução interrompida (Bagy ID: {replayed['id']}), atualizando")
+                self.entity_mapping.add_mapping('products', replayed['id'], product_id)
+                result = self.bagy_client.update_product(replayed['id'], bagy_product)
+            else:
+                # Create new product
+                self.logger.info(f"📦 Criando novo produto {product_id} no Bagy")
+                result = self.bagy_client.create_product(bagy_product)
+                
+                # Store the mapping (reverse direction)
+                new_id = result.get('id')
+                if new_id:
+                    self.entity_mapping.add_mapping('products', new_id, product_id)
+        
+        # Update sync history
+        self.sync_history.update_sync('products_to_bagy', product_id, item['product_version'])
+        return item
+    
     def sync_products_from_gestaoclick(self):
         """
         Synchronize products from GestãoClick to Bagy.
         
+        Fetch, convert, diff and write run as pipeline stages connected by bounded
+        queues, so GestãoClick reads, conversion and Bagy writes overlap.
+        
+        Progress is checkpointed (see checkpoint.RunCheckpoint): a run interrupted by a
+        crash or restart is resumed after its last completed page.
+        
         Returns:
             tuple: (success_count, error_count)
         """
@@ -113,177 +345,48 @@ class BidirectionalSynchronizer:
         error_count = 0
         
         try:
-            # Fetch all products from GestãoClick
+            # Load colors and categories once instead of looking them up per product
+            self.bagy_client.warm_lookup_caches()
+            
+            # Stream products changed since the last run (or the whole catalog when a
+            # full reconciliation is due): conversion starts while the next pages are fetched
             self.logger.info("📋 Buscando catálogo de produtos do GestãoClick...")
-            gestao_products = paginate_all_results(
-                fetch_page_func=lambda page: self.gestaoclick_client.get_products(page=page, limit=100),
-                extract_items_func=lambda data: data.get('data', [])
+            checkpoint = RunCheckpoint(
+                'products_to_bagy',
+                flush=(self.entity_mapping, self.sync_history, self.bagy_client.product_index)
+            )
+            resumed = checkpoint.begin(window=self.product_feed.window_state)
+            self._replay_product_ids = checkpoint.replay_ids
+            gestao_products = self.product_feed.iter_products(
+                resume=resumed and resumed.get('window'), start_page=checkpoint.start_page
             )
             
-            self.logger.info(f"📦 Found {len(gestao_products)} products in GestãoClick")
+            source_of = lambda item: item['gestao_product']
+            pipeline = SyncPipeline("products")
+            pipeline.add_stage("convert", checkpoint.tracked(self._convert_gestao_product, 'convert'),
+                               workers=config.PIPELINE_CONVERT_WORKERS)
+            pipeline.add_stage("diff", checkpoint.tracked(self._diff_gestao_product, 'diff', source_of),
+                               workers=config.PIPELINE_DIFF_WORKERS)
+            pipeline.add_stage("write", checkpoint.tracked(self._write_gestao_product, 'write', source_of, writes=True),
+                               workers=config.PIPELINE_WRITE_WORKERS)
+            # Produtos que falharam antes da interrupção, em páginas já concluídas, entram de novo no fim
+            stats = pipeline.run(itertools.chain(
+                checkpoint.track(gestao_products, lambda: self.product_feed.page),
+                checkpoint.requeued(self.gestaoclick_client.get_product_by_id)
+            ))
             
-            # Process each product
-            for gestao_product in gestao_products:
-                try:
-                    product_id = gestao_product.get('id')
-                    if not product_id:
-                        self.logger.warning("Skipping product without ID")
-                        continue
-                    
-                    # Generate a version hash for the product
-                    product_version = generate_entity_version(gestao_product)
-                    
-                    # Check if product should be synchronized
-                    if not self.sync_history.should_sync('products_to_bagy', product_id, product_version):
-                        self.logger.debug(f"Product {product_id} hasn't changed, skipping")
-                        continue
-                    
-                    # Verificar se o produto estava previamente na lista de incompletos
-                    # Se estiver com todos os campos agora, remover da lista
-                    product_name = gestao_product.get('nome', 'Produto sem nome')
-                    
-                    # Log adicional para variações
-                    if gestao_product.get('possui_variacao') in ["1", 1, True]:
-                        self.logger.info(f"🛒 Produto com variações: {gestao_product.get('nome', '')} (ID: {product_id})")
-                        
-                        # Verificar se temos o campo variacoes e se não está vazio
-                        if 'variacoes' in gestao_product and gestao_product['variacoes']:
-                            self.logger.info(f"🛒 Número de variações: {len(gestao_product['variacoes'])}")
-                        else:
-                            self.logger.warning(f"⚠️ Produto marcado com variações, mas lista de variações vazia ou ausente: {gestao_product.get('nome', '')}")
-                    
-                    # Log específico para o produto EGG que sabemos ter variações
-                    if gestao_product.get('codigo_interno') == 'EGG' or 'egg' in gestao_product.get('nome', '').lower():
-                        self.logger.info(f"🥚 Produto EGG encontrado: {gestao_product.get('nome', '')} (ID: {product_id})")
-                        self.logger.info(f"🥚 Possui variação marcada: {gestao_product.get('possui_variacao')}")
-                    
-                    # Convert product to Bagy format
-                    result = self.product_converter.gestaoclick_to_bagy(gestao_product)
-                    
-                    # Verificar se o produto tem todos os campos obrigatórios
-                    if isinstance(result, tuple):
-                        bagy_product, missing_fields = result
-                        
-                        # Registramos o produto como incompleto para referência futura
-                        # Usar log menos verboso (debug) para não poluir a saída principal
-                        self.logger.debug(f"⚠️ Produto {product_name} (ID: {product_id}) tem campos faltando: {', '.join(missing_fields)}")
-                        
-                        # Armazenar informações sobre produtos incompletos usando a nova classe
-                        self.incomplete_products_storage.add_product(product_id, product_name, missing_fields)
-                        
-                        # Verificar se são apenas dimensões ou SKU faltando
-                        campos_criticos = ['descrição']
-                        
-                        if any(campo in campos_criticos for campo in missing_fields):
-                            # Se faltar algum campo crítico, não processar o produto
-                            self.logger.warning(f"❌ Produto {product_name} (ID: {product_id}) não pode ser sincronizado. Campo crítico faltando: descrição")
-                            error_count += 1
-                            continue
-                        
-                        # Neste ponto, temos um produto com campos não críticos faltando (altura, largura, etc)
-                        # Vamos continuar com a criação do produto, pois os campos faltantes serão preenchidos pelo API client
-                    
-                    # Verificar se o resultado da conversão é uma tupla (None, missing_fields)
-                    # Isso significa que o produto não tem todos os campos necessários
-                    if isinstance(result, tuple) and result[0] is None:
-                        missing_fields = result[1]
-                        self.logger.warning(f"❌ Produto {product_id} não pode ser sincronizado. Campos críticos faltando: {', '.join(missing_fields)}")
-                        # Adicionar à lista de produtos incompletos usando a nova classe
-                        product_name = gestao_product.get('nome', '')
-                        self.incomplete_products_storage.add_product(product_id, product_name, missing_fields)
-                        error_count += 1
-                        continue
-                        
-                    # Se chegou aqui, o produto está completo
-                    # Remover da lista de incompletos, se existir
-                    self.incomplete_products_storage.clear_product(product_id)
-                    
-                    bagy_product = result
-                    
-                    # Verificar e criar categoria, se necessário
-                    category_name = gestao_product.get('nome_grupo')
-                    category_id = None
-                    if category_name:
-                        category_id = self._ensure_category_exists(category_name)
-                        if category_id:
-                            # Atualizar o objeto do produto com o ID da categoria
-                            bagy_product["category_default_id"] = str(category_id)
-                            bagy_product["category_ids"] = [int(category_id)]  # array de integers
-                        else:
-                            # Remover os campos de categoria se não conseguimos criar/encontrar a categoria
-                            if "category_default_id" in bagy_product:
-                                del bagy_product["category_default_id"]
-                            if "category_ids" in bagy_product:
-                                del bagy_product["category_ids"]
-                    
-                    # Check if product already exists in Bagy
-                    bagy_id = None
-                    for mapping_id, gestao_id in self.entity_mapping.mapping.get('products', {}).items():
-                        if gestao_id == product_id:
-                            bagy_id = mapping_id
-                            break
-                    
-                    # Verificação inicial - todos os produtos precisam estar sincronizados corretamente
-                    # Inicialmente não forçamos sincronização, a menos que haja uma razão específica
-                    force_sync = False
-                    
-                    # Verificar se o campo SKU precisa ser atualizado (para corrigir produtos criados antes da correção)
-                    should_update_sku = False
-                    if bagy_id:
-                        # Buscar produto atual na Bagy para verificar se o SKU está correto
-                        try:
-                            current_bagy_product = self.bagy_client.get_product_by_id(bagy_id)
-                            
-                            # Se o SKU atual é diferente do código interno do GestãoClick, precisamos atualizar
-                            if current_bagy_product and (
-                                current_bagy_product.get('sku') != gestao_product.get('codigo_interno') or 
-                                not current_bagy_product.get('sku')
-                            ):
-                                self.logger.info(f"🔄 SKU desatualizado detectado: atual={current_bagy_product.get('sku')}, novo={gestao_product.get('codigo_interno')}")
-                                should_update_sku = True
-                                force_sync = True
-                        except Exception as e:
-                            self.logger.warning(f"Erro ao buscar produto na Bagy para verificar SKU: {str(e)}")
-                    
-                    if bagy_id and not force_sync:
-                        # Update existing product
-                        self.logger.info(f"🔄 Atualizando produto {product_id} (Bagy ID: {bagy_id})")
-                        result = self.bagy_client.update_product(bagy_id, bagy_product)
-                    elif bagy_id and force_sync:
-                        # Forçar atualização do produto existente
-                        self.logger.info(f"🔄 Atualizando produto {product_id} (Bagy ID: {bagy_id}) - FORÇADO")
-                        if should_update_sku:
-                            self.logger.info(f"🔄 Atualizando SKU para {gestao_product.get('codigo_interno')}")
-                        
-                        # Log especial para variações
-                        possui_variacao = gestao_product.get('possui_variacao') in ["1", 1, True]
-                        if possui_variacao and 'variacoes' in gestao_product and gestao_product['variacoes']:
-                            self.logger.info(f"🔄 Sincronizando {len(gestao_product['variacoes'])} variações para o produto {product_id}")
-                            for var_item in gestao_product['variacoes']:
-                                var = var_item.get('variacao', {})
-                                if var:
-                                    self.logger.info(f"  - Variação: {var.get('nome', 'Sem nome')} (ID: {var.get('id')}, Código: {var.get('codigo', '')})")
-                        
-                        result = self.bagy_client.update_product(bagy_id, bagy_product)
-                    else:
-                        # Create new product
-                        self.logger.info(f"📦 Criando novo produto {product_id} no Bagy")
-                        result = self.bagy_client.create_product(bagy_product)
-                        
-                        # Store the mapping (reverse direction)
-                        new_id = result.get('id')
-                        if new_id:
-                            self.entity_mapping.add_mapping('products', new_id, product_id)
-                    
-                    # Update sync history
-                    self.sync_history.update_sync('products_to_bagy', product_id, product_version)
-                    success_count += 1
-                    
-                except Exception as e:
-                    self.logger.error(f"Error synchronizing product {gestao_product.get('id')} to Bagy: {str(e)}")
-                    self.logger.debug(traceback.format_exc())
-                    error_count += 1
+            success_count = stats['write']['emitted']
+            error_count = sum(stage['errors'] for stage in stats.values())
             
+            # Incomplete products are re-fetched once they are edited in GestãoClick,
+            # so only fetch/diff/write failures (including those of the interrupted
+            # part of a resumed run that were not retried successfully) hold the
+            # high-water mark back
+            self.product_feed.commit(success=not stats['fetch']['errors'] and not checkpoint.has_failures())
+            checkpoint.finish(interrupted=stats['fetch']['errors'] > 0)
+            self._replay_product_ids = frozenset()
+            
+            self.logger.info(f"📦 Processed {stats['fetch']['emitted']} products from GestãoClick")
             self.logger.info(f"✨ Sincronização de produtos para Bagy concluída: {success_count} com sucesso, {error_count} erros")
             
         except Exception as e:
@@ -322,7 +425,7 @@ class BidirectionalSynchronizer:
                         continue
                     
                     # Generate a version hash for the product
-                    product_version = generate_entity_version(bagy_product)
+                    product_version = generate_entity_version(bagy_product, 'bagy_products')
                     
                     # Check if product should be synchronized
                     if not self.sync_history.should_sync('products', product_id, product_version):
@@ -401,6 +504,10 @@ class BidirectionalSynchronizer:
             )
             
             self.logger.info(f"👥 Encontrados {len(bagy_customers)} clientes no Bagy")
+            self._open_customer_gates(bagy_customers)
+            
+            # Carregar os clientes do GestãoClick uma vez; a deduplicação passa a ser uma consulta local
+            self.gestaoclick_client.build_customer_index()
             
             # Process each customer
             for bagy_customer in bagy_customers:
@@ -411,7 +518,7 @@ class BidirectionalSynchronizer:
                         continue
                     
                     # Generate a version hash for the customer
-                    customer_version = generate_entity_version(bagy_customer)
+                    customer_version = generate_entity_version(bagy_customer, 'bagy_customers')
                     
                     # Check if customer should be synchronized
                     if not self.sync_history.should_sync('customers', customer_id, customer_version):
@@ -429,45 +536,24 @@ class BidirectionalSynchronizer:
                         self.logger.info(f"👤 Atualizando cliente {customer_id} (GestãoClick ID: {existing_id})")
                         result = self.gestaoclick_client.update_customer(existing_id, gestao_customer)
                     else:
-                        # Check for duplicate using document
-                        if gestao_customer.get('documento'):
-                            doc_search_result = self.gestaoclick_client.get_customer_by_document(gestao_customer['documento'])
-                            
-                            if doc_search_result and 'data' in doc_search_result and doc_search_result['data']:
-                                # Customer exists with the same document
-                                existing_customer = doc_search_result['data'][0]
-                                existing_id = existing_customer.get('id')
-                                
-                                self.logger.info(f"Found existing customer with document {gestao_customer['documento']} (GestãoClick ID: {existing_id})")
-                                
-                                # Update the existing customer
-                                result = self.gestaoclick_client.update_customer(existing_id, gestao_customer)
-                                
-                                # Store the mapping
-                                self.entity_mapping.add_mapping('customers', customer_id, existing_id)
-                                self.sync_history.update_sync('customers', customer_id, customer_version)
-                                success_count += 1
-                                continue
+                        # Check for duplicate by document, then email (local customer index)
+                        existing_customer = self.gestaoclick_client.find_customer(
+                            document=gestao_customer.get('cpf_cnpj'),
+                            email=gestao_customer.get('email')
+                        )
                         
-                        # Check for duplicate using email
-                        if gestao_customer.get('email'):
-                            email_search_result = self.gestaoclick_client.get_customer_by_email(gestao_customer['email'])
+                        if existing_customer:
+                            existing_id = existing_customer.get('id')
+                            self.logger.info(f"Found existing customer {existing_customer.get('cpf_cnpj') or existing_customer.get('email')} (GestãoClick ID: {existing_id})")
+                            
+                            # Update the existing customer
+                            result = self.gestaoclick_client.update_customer(existing_id, gestao_customer)
                             
-                            if email_search_result and 'data' in email_search_result and email_search_result['data']:
-                                # Customer exists with the same email
-                                existing_customer = email_search_result['data'][0]
-                                existing_id = existing_customer.get('id')
-                                
-                                self.logger.info(f"Found existing customer with email {gestao_customer['email']} (GestãoClick ID: {existing_id})")
-                                
-                                # Update the existing customer
-                                result = self.gestaoclick_client.update_customer(existing_id, gestao_customer)
-                                
-                                # Store the mapping
-                                self.entity_mapping.add_mapping('customers', customer_id, existing_id)
-                                self.sync_history.update_sync('customers', customer_id, customer_version)
-                                success_count += 1
-                                continue
+                            # Store the mapping
+                            self.entity_mapping.add_mapping('customers', customer_id, existing_id)
+                            self.sync_history.update_sync('customers', customer_id, customer_version)
+                            success_count += 1
+                            continue
                         
                         # Create new customer
                         self.logger.info(f"👤 Criando novo cliente {customer_id}")
@@ -486,15 +572,60 @@ class BidirectionalSynchronizer:
                     self.logger.error(f"Error synchronizing customer {bagy_customer.get('id')}: {str(e)}")
                     self.logger.debug(traceback.format_exc())
                     error_count += 1
+                finally:
+                    self._release_customer_gate(bagy_customer.get('id'))
             
             self.logger.info(f"✨ Sincronização de clientes concluída: {success_count} com sucesso, {error_count} erros")
             
         except Exception as e:
             self.logger.error(f"Error during customer synchronization: {str(e)}")
             self.logger.debug(traceback.format_exc())
+        finally:
+            # Nenhum pedido pode ficar esperando por um cliente que não será mais processado
+            self._release_all_customer_gates()
         
         return success_count, error_count
     
+    def _open_customer_gates(self, bagy_customers):
+        """Register one gate per customer of this run when orders run concurrently (see sync_all)."""
+        if self._customer_gates_ready is None:
+            return
+        self._customer_gates = {
+            str(customer['id']): threading.Event() for customer in bagy_customers if customer.get('id')
+        }
+        self._customer_gates_ready.set()
+    
+    def _release_customer_gate(self, customer_id):
+        """Let the orders of a processed customer proceed."""
+        gate = self._customer_gates.get(str(customer_id))
+        if gate:
+            gate.set()
+    
+    def _release_all_customer_gates(self):
+        """Release every gate (end of the customer sync, successful or not)."""
+        for gate in self._customer_gates.values():
+            gate.set()
+        if self._customer_gates_ready is not None:
+            self._customer_gates_ready.set()
+    
+    def _wait_for_customer(self, customer_id):
+        """
+        Wait until a customer processed by the concurrent customer sync has its mapping.
+        
+        Customers outside the current customer sync are not waited for; the order
+        sync resolves them itself.
+        
+        Args:
+            customer_id (str): Bagy customer ID
+        """
+        ready = self._customer_gates_ready
+        if ready is None:
+            return
+        ready.wait(config.SYNC_DEPENDENCY_TIMEOUT_SECONDS)
+        gate = self._customer_gates.get(str(customer_id))
+        if gate and not gate.wait(config.SYNC_DEPENDENCY_TIMEOUT_SECONDS):
+            self.logger.warning(f"⚠️ Tempo esgotado aguardando o cliente {customer_id}, seguindo com o pedido")
+    
     def sync_orders(self):
         """
         Synchronize orders from Bagy to GestãoClick.
@@ -505,17 +636,15 @@ class BidirectionalSynchronizer:
         self.logger.info("🔄 Iniciando sincronização de pedidos do Bagy para GestãoClick")
         success_count = 0
         error_count = 0
+        fetched_count = 0
         
         try:
-            # Fetch all orders from Bagy
-            bagy_orders = paginate_all_results(
-                fetch_page_func=lambda page: self.bagy_client.get_orders(page=page, limit=100),
-                extract_items_func=lambda data: data.get('data', [])
-            )
-            
-            self.logger.info(f"🛒 Encontrados {len(bagy_orders)} pedidos no Bagy")
+            # Only orders in the cursor window (and open orders, when a sweep is due)
+            bagy_orders = list(self.order_feed.iter_orders())
+            fetched_count = len(bagy_orders)
             
-            # Process each order
+            # Orders that changed since their last synchronization
+            pending_orders = []
             for bagy_order in bagy_orders:
                 try:
                     order_id = bagy_order.get('id')
@@ -524,13 +653,26 @@ class BidirectionalSynchronizer:
                         continue
                     
                     # Generate a version hash for the order
-                    order_version = generate_entity_version(bagy_order)
+                    order_version = generate_entity_version(bagy_order, 'bagy_orders')
                     
                     # Check if order should be synchronized
                     if not self.sync_history.should_sync('orders', order_id, order_version):
                         self.logger.debug(f"Order {order_id} hasn't changed, skipping")
                         continue
                     
+                    pending_orders.append((bagy_order, order_version))
+                except Exception as e:
+                    self.logger.error(f"❌ Erro ao sincronizar pedido {bagy_order.get('id')}: {str(e)}")
+                    self.logger.debug(traceback.format_exc())
+                    error_count += 1
+            
+            # Resolve every unmapped customer of the batch once, before processing the orders
+            self._resolve_order_customers([bagy_order for bagy_order, _ in pending_orders])
+            
+            for bagy_order, order_version in pending_orders:
+                try:
+                    order_id = bagy_order.get('id')
+                    
                     # Get the customer ID from the mapping
                     customer_bagy_id = bagy_order.get('cliente_id')
                     customer_gestao_id = None
@@ -538,38 +680,7 @@ class BidirectionalSynchronizer:
                     if customer_bagy_id:
                         customer_gestao_id = self.entity_mapping.get_gestaoclick_id('customers', customer_bagy_id)
                         if not customer_gestao_id:
-                            self.logger.warning(f"⚠️ Cliente {customer_bagy_id} não encontrado no GestãoClick, sincronizando cliente primeiro")
-                            
-                            # Try to get customer details from Bagy
-                            try:
-                                bagy_customer = self.bagy_client.get_customer_by_id(customer_bagy_id)
-                                if bagy_customer:
-                                    # Convert and create/update customer
-                                    gestao_customer = self.customer_converter.bagy_to_gestaoclick(bagy_customer)
-                                    
-                                    # Check if customer already exists by document or email
-                                    if gestao_customer.get('documento'):
-                                        doc_search_result = self.gestaoclick_client.get_customer_by_document(gestao_customer['documento'])
-                                        if doc_search_result and 'data' in doc_search_result and doc_search_result['data']:
-                                            existing_customer = doc_search_result['data'][0]
-                                            customer_gestao_id = existing_customer.get('id')
-                                            self.entity_mapping.add_mapping('customers', customer_bagy_id, customer_gestao_id)
-                                    
-                                    if not customer_gestao_id and gestao_customer.get('email'):
-                                        email_search_result = self.gestaoclick_client.get_customer_by_email(gestao_customer['email'])
-                                        if email_search_result and 'data' in email_search_result and email_search_result['data']:
-                                            existing_customer = email_search_result['data'][0]
-                                            customer_gestao_id = existing_customer.get('id')
-                                            self.entity_mapping.add_mapping('customers', customer_bagy_id, customer_gestao_id)
-                                    
-                                    if not customer_gestao_id:
-                                        # Create new customer
-                                        result = self.gestaoclick_client.create_customer(gestao_customer)
-                                        customer_gestao_id = result.get('id')
-                                        if customer_gestao_id:
-                                            self.entity_mapping.add_mapping('customers', customer_bagy_id, customer_gestao_id)
-                            except Exception as e:
-                                self.logger.error(f"❌ Erro ao sincronizar cliente para pedido: {str(e)}")
+                            self.logger.warning(f"⚠️ Cliente {customer_bagy_id} não encontrado no GestãoClick, pedido {order_id} enviado sem cliente")
                     
                     # Convert order to GestãoClick format
                     gestao_order = self.order_converter.bagy_to_gestaoclick(bagy_order, customer_gestao_id)
@@ -616,6 +727,8 @@ class BidirectionalSynchronizer:
                     self.logger.debug(traceback.format_exc())
                     error_count += 1
             
+            self.order_feed.commit(success=error_count == 0)
+            self.logger.info(f"🛒 {fetched_count} pedidos lidos da Bagy")
             self.logger.info(f"✨ Sincronização de pedidos concluída: {success_count} com sucesso, {error_count} erros")
             
         except Exception as e:
@@ -624,6 +737,200 @@ class BidirectionalSynchronizer:
         
         return success_count, error_count
     
+    def _resolve_order_customers(self, bagy_orders):
+        """
+        Map every distinct, still unmapped customer of a batch of orders to GestãoClick.
+        
+        The customers are fetched from Bagy in parallel, grouped by CPF/CNPJ (or email)
+        so that one person behind several Bagy IDs is created only once, then found in
+        or created on GestãoClick in parallel. Repeated buyers cost a single resolution.
+        
+        Args:
+            bagy_orders (list): Bagy orders about to be synchronized
+        """
+        distinct_ids = []
+        seen = set()
+        for bagy_order in bagy_orders:
+            customer_bagy_id = bagy_order.get('cliente_id')
+            if not customer_bagy_id or str(customer_bagy_id) in seen:
+                continue
+            seen.add(str(customer_bagy_id))
+            distinct_ids.append(customer_bagy_id)
+        
+        if not distinct_ids:
+            return
+        
+        gated_ids, ungated_ids = self._split_gated_customers(distinct_ids)
+        customer_ids = [
+            customer_bagy_id for customer_bagy_id in ungated_ids
+            if not self.entity_mapping.get_gestaoclick_id('customers', customer_bagy_id)
+        ]
+        workers = max(1, min(config.ORDER_CUSTOMER_WORKERS, len(distinct_ids)))
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="order-customers") as executor:
+            # Clientes ainda em processamento pela sincronização de clientes concorrente:
+            # as esperas correm em paralelo, e só os que continuarem sem mapeamento são resolvidos aqui
+            customer_ids.extend(
+                customer_bagy_id for customer_bagy_id in executor.map(self._await_unmapped_customer, gated_ids)
+                if customer_bagy_id
+            )
+            
+            if not customer_ids:
+                return
+            
+            self.logger.info(f"👥 Resolvendo {len(customer_ids)} clientes sem mapeamento de {len(seen)} clientes dos pedidos")
+            
+            # Carregar o índice de clientes antes de dividir o trabalho entre as threads
+            self.gestaoclick_client.build_customer_index()
+            
+            fetched = list(executor.map(self._fetch_order_customer, customer_ids))
+            
+            # Bagy IDs of the same person (CPF/CNPJ, then email) share one GestãoClick customer
+            groups = {}
+            for customer_bagy_id, gestao_customer in fetched:
+                if not gestao_customer:
+                    continue
+                key = (normalize_document(gestao_customer.get('cpf_cnpj'))
+                       or normalize_email(gestao_customer.get('email'))
+                       or f"bagy:{customer_bagy_id}")
+                groups.setdefault(key, (gestao_customer, []))[1].append(customer_bagy_id)
+            
+            resolved = list(executor.map(
+                lambda group: self._find_or_create_order_customer(group[0]), groups.values()
+            ))
+        
+        resolved_count = 0
+        for (_, customer_bagy_ids), customer_gestao_id in zip(groups.values(), resolved):
+            if not customer_gestao_id:
+                continue
+            for customer_bagy_id in customer_bagy_ids:
+                self.entity_mapping.add_mapping('customers', customer_bagy_id, customer_gestao_id)
+                resolved_count += 1
+        
+        self.logger.info(f"👥 {resolved_count} de {len(customer_ids)} clientes dos pedidos mapeados ({len(groups)} clientes distintos no GestãoClick)")
+    
+    def _split_gated_customers(self, customer_ids):
+        """
+        Separate the customers being processed by a concurrent customer sync (see sync_all).
+        
+        Args:
+            customer_ids (list): Bagy customer IDs
+            
+        Returns:
+            tuple: (IDs with a customer-sync gate, IDs without one)
+        """
+        ready = self._customer_gates_ready
+        if ready is None:
+            return [], list(customer_ids)
+        
+        # Uma única espera pela lista de clientes da sincronização concorrente
+        ready.wait(config.SYNC_DEPENDENCY_TIMEOUT_SECONDS)
+        gates = self._customer_gates
+        gated = [customer_id for customer_id in customer_ids if str(customer_id) in gates]
+        ungated = [customer_id for customer_id in customer_ids if str(customer_id) not in gates]
+        return gated, ungated
+    
+    def _await_unmapped_customer(self, customer_bagy_id):
+        """
+        Wait for a customer handled by the concurrent customer sync and check its mapping.
+        
+        Args:
+            customer_bagy_id (str): Bagy customer ID
+            
+        Returns:
+            str or None: The ID if the customer is still unmapped, None otherwise
+        """
+        self._wait_for_customer(customer_bagy_id)
+        if self.entity_mapping.get_gestaoclick_id('customers', customer_bagy_id):
+            return None
+        return customer_bagy_id
+    
+    def _fetch_order_customer(self, customer_bagy_id):
+        """
+        Fetch an order's customer from Bagy and convert it to GestãoClick format.
+        
+        Args:
+            customer_bagy_id (str): Bagy customer ID
+            
+        Returns:
+            tuple: (customer_bagy_id, GestãoClick customer data or None)
+        """
+        try:
+            bagy_customer = self.bagy_client.get_customer_by_id(customer_bagy_id)
+            if not bagy_customer:
+                return customer_bagy_id, None
+            return customer_bagy_id, self.customer_converter.bagy_to_gestaoclick(bagy_customer)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao buscar cliente {customer_bagy_id} do pedido: {str(e)}")
+            return customer_bagy_id, None
+    
+    def _find_or_create_order_customer(self, gestao_customer):
+        """
+        Find a customer on GestãoClick by document or email, creating it if missing.
+        
+        Args:
+            gestao_customer (dict): Customer data in GestãoClick format
+            
+        Returns:
+            str or None: GestãoClick customer ID
+        """
+        try:
+            # Check if customer already exists by document or email (local customer index)
+            existing_customer = self.gestaoclick_client.find_customer(
+                document=gestao_customer.get('cpf_cnpj'),
+                email=gestao_customer.get('email')
+            )
+            if existing_customer and existing_customer.get('id'):
+                return existing_customer.get('id')
+            
+            result = self.gestaoclick_client.create_customer(gestao_customer)
+            return result.get('id') if result else None
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao sincronizar cliente para pedido: {str(e)}")
+            return None
+    
+    def _run_entities_in_sequence(self):
+        """
+        Run products → customers → orders one after another.
+        
+        Returns:
+            dict: Entity → (success_count, error_count)
+        """
+        self.logger.info("📦 Iniciando sincronização de produtos do GestãoClick para Bagy...")
+        outcomes = {'products_to_bagy': self.sync_products_from_gestaoclick()}
+        self.logger.info("👥 Iniciando sincronização de clientes do Bagy para GestãoClick...")
+        outcomes['customers_to_gestaoclick'] = self.sync_customers()
+        self.logger.info("🛒 Iniciando sincronização de pedidos do Bagy para GestãoClick...")
+        outcomes['orders_to_gestaoclick'] = self.sync_orders()
+        return outcomes
+    
+    def _run_entity_graph(self):
+        """
+        Run the entity syncs as a dependency graph.
+        
+        Products (GestãoClick → Bagy) share nothing with customers and orders
+        (Bagy → GestãoClick), so the three run concurrently; each order waits only
+        for its own customer (see _wait_for_customer). Requests stay within the
+        per-host concurrency and rate limits shared by the API clients.
+        
+        Returns:
+            dict: Entity → (success_count, error_count)
+        """
+        self.logger.info("🔀 Sincronizando produtos, clientes e pedidos em paralelo")
+        self._customer_gates = {}
+        self._customer_gates_ready = threading.Event()
+        try:
+            with ThreadPoolExecutor(max_workers=3, thread_name_prefix="sync-all") as executor:
+                futures = {
+                    'products_to_bagy': executor.submit(self.sync_products_from_gestaoclick),
+                    'customers_to_gestaoclick': executor.submit(self.sync_customers),
+                    'orders_to_gestaoclick': executor.submit(self.sync_orders),
+                }
+                return {entity: future.result() for entity, future in futures.items()}
+        finally:
+            self._customer_gates_ready = None
+            self._customer_gates = {}
+    
     def sync_all(self):
         """
         Run a full bidirectional synchronization of all entities.
@@ -661,23 +968,14 @@ class BidirectionalSynchronizer:
         }
         
         try:
-            # Sync products from GestãoClick to Bagy
-            self.logger.info("📦 Iniciando sincronização de produtos do GestãoClick para Bagy...")
-            product_success, product_errors = self.sync_products_from_gestaoclick()
-            results['products_to_bagy']['success'] = product_success
-            results['products_to_bagy']['errors'] = product_errors
-            
-            # Sync customers from Bagy to GestãoClick
-            self.logger.info("👥 Iniciando sincronização de clientes do Bagy para GestãoClick...")
-            customer_success, customer_errors = self.sync_customers()
-            results['customers_to_gestaoclick']['success'] = customer_success
-            results['customers_to_gestaoclick']['errors'] = customer_errors
-            
-            # Sync orders from Bagy to GestãoClick
-            self.logger.info("🛒 Iniciando sincronização de pedidos do Bagy para GestãoClick...")
-            order_success, order_errors = self.sync_orders()
-            results['orders_to_gestaoclick']['success'] = order_success
-            results['orders_to_gestaoclick']['errors'] = order_errors
+            if config.SYNC_ALL_PARALLEL:
+                outcomes = self._run_entity_graph()
+            else:
+                outcomes = self._run_entities_in_sequence()
+            
+            for entity, (entity_success, entity_errors) in outcomes.items():
+                results[entity]['success'] = entity_success
+                results[entity]['errors'] = entity_errors
             
         except Exception as e:
             self.logger.error(f"❌ Erro inesperado durante a sincronização completa: {str(e)}")
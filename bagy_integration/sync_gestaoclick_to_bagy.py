@@ -1,6 +1,34 @@
-import json
+import argparse
+import os
+import re
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from snapshot import iter_snapshot
+
+# Operações simultâneas na Bagy durante a reconciliação
+MAX_WORKERS = int(os.getenv("BAGY_SYNC_WORKERS", "4"))
+PAGE_LIMIT = 100
+
+# Snapshot gerado pelo erp_polling (array JSON ou .ndjson)
+SNAPSHOT_PATH = os.getenv("PRODUTOS_SNAPSHOT", "bagy_integration/data/produtos.json")
+
+# Exclusões só são aplicadas se o snapshot tiver ao menos esta fração dos produtos da Bagy
+# (snapshot vazio ou truncado não apaga o catálogo)
+MIN_SNAPSHOT_RATIO = float(os.getenv("BAGY_SYNC_MIN_SNAPSHOT_RATIO", "0.5"))
+
+# external_id gerado pelas versões antigas do script: "<id>-<timestamp>"
+LEGACY_EXTERNAL_ID = re.compile(r'^(\d+)-\d{10}$')
+
+# Campos comparados para decidir se um produto existente precisa ser atualizado
+CAMPOS_COMPARADOS = (
+    "name", "description", "price", "cost_price", "stock", "reference", "sku", "code", "active",
+    "weight", "width", "height", "depth"
+)
+
+# Campos comparados em cada variação (variações pareadas pelo nome)
+CAMPOS_VARIACAO = ("price", "stock", "sku")
 
 class DummyLogger:
     def info(self, msg):
@@ -32,28 +60,37 @@ class BagyClient:
         raise Exception(f"Erro após {retries} tentativas: não foi possível acessar {url}")
 
     def list_all_products(self):
-        return self._make_request("GET", "products")
+        produtos = []
+        page = 1
+        while True:
+            resposta = self._make_request("GET", f"products?page={page}&limit={PAGE_LIMIT}")
+            data = resposta.get("data") if isinstance(resposta, dict) and "data" in resposta else resposta
+            data = data or []
+            produtos.extend(data)
+            if len(data) < PAGE_LIMIT:
+                return produtos
+            page += 1
 
     def delete_product(self, product_id):
         endpoint = f"products/{product_id}"
-        try:
-            response = requests.request("DELETE", f"{self.base_url}{endpoint}", headers={
-                "Authorization": f"Bearer {self.api_key}"
-            }, timeout=30)
-            if response.ok:
-                print(f"🗑️ Produto {product_id} deletado com sucesso.")
-            else:
-                print(f"Erro ao deletar produto {product_id}: {response.status_code} - {response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao deletar produto {product_id}: {e}")
+        response = requests.request("DELETE", f"{self.base_url}{endpoint}", headers={
+            "Authorization": f"Bearer {self.api_key}"
+        }, timeout=30)
+        if not response.ok:
+            raise Exception(f"Erro ao deletar produto {product_id}: {response.status_code} - {response.text}")
+        print(f"🗑️ Produto {product_id} deletado com sucesso.")
 
     def create_product(self, product_data):
         self.logger.info(f"Creating new product in Bagy: {product_data['name']}")
         return self._make_request("POST", "products", json_data=product_data)
 
-def carregar_produtos_do_gestaoclick():
-    with open('bagy_integration/data/produtos.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+    def update_product(self, product_id, product_data):
+        self.logger.info(f"Updating product in Bagy: {product_data['name']} (ID: {product_id})")
+        return self._make_request("PUT", f"products/{product_id}", json_data=product_data)
+
+def carregar_produtos_do_gestaoclick(caminho=SNAPSHOT_PATH):
+    """Lê o snapshot (array JSON ou NDJSON) um produto por vez."""
+    return iter_snapshot(caminho)
 
 def converter_para_bagy(produto):
     def safe_float(value, default=0.1):
@@ -96,7 +133,7 @@ def converter_para_bagy(produto):
             "name": produto.get("nome"),
             "description": produto.get("descricao", ""),
             "code": str(produto.get("id")),
-            "external_id": f"{produto.get('id')}-{int(time.time())}",
+            "external_id": str(produto.get("id")),
             "reference": str(produto.get("codigo_interno") or ""),
             "sku": str(produto.get("codigo_barra") or f"SKU{produto.get('id')}"),
             "active": produto.get("ativo") == "1",
@@ -113,7 +150,7 @@ def converter_para_bagy(produto):
         "reference": str(produto.get("codigo_interno") or ""),
         "sku": str(produto.get("codigo_barra") or f"SKU{produto.get('id')}"),
         "code": str(produto.get("id")),
-        "external_id": f"{produto.get('id')}-{int(time.time())}",
+        "external_id": str(produto.get("id")),
         "weight": safe_float(produto.get("peso")),
         "width": safe_float(produto.get("largura")),
         "height": safe_float(produto.get("altura")),
@@ -127,14 +164,134 @@ def excluir_todos_os_produtos(cliente_bagy):
         produtos_existentes = cliente_bagy.list_all_products()
         data = produtos_existentes.get("data") if isinstance(produtos_existentes, dict) and "data" in produtos_existentes else produtos_existentes
         for produto in data:
-            cliente_bagy.delete_product(produto['id'])
+            try:
+                cliente_bagy.delete_product(produto['id'])
+            except Exception as e:
+                print("❌", e)
     except Exception as e:
         print("Erro ao excluir produtos:", e)
 
-def main():
-    cliente_bagy = BagyClient()
+def _normalizar(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return round(float(valor), 3)
+    if isinstance(valor, str):
+        try:
+            return round(float(valor), 3)
+        except ValueError:
+            return valor.strip()
+    return valor
+
+def _external_id_estavel(produto_remoto):
+    external_id = str(produto_remoto.get("external_id") or "")
+    legado = LEGACY_EXTERNAL_ID.match(external_id)
+    return legado.group(1) if legado else external_id
+
+def precisa_atualizar(desejado, remoto):
+    """Compara o produto convertido com o produto na Bagy (campos ausentes na resposta são ignorados)."""
+    if str(remoto.get("external_id") or "") != desejado["external_id"]:
+        return True
+    for campo in CAMPOS_COMPARADOS:
+        if campo in desejado and campo in remoto and _normalizar(desejado[campo]) != _normalizar(remoto[campo]):
+            return True
+    if "variations" in desejado:
+        remotas = {str(v.get("name") or ""): v for v in remoto.get("variations") or []}
+        if not remotas:
+            return False
+        desejadas = {str(v.get("name") or ""): v for v in desejado["variations"]}
+        if set(remotas) != set(desejadas):
+            return True
+        for nome, variacao in desejadas.items():
+            remota = remotas[nome]
+            for campo in CAMPOS_VARIACAO:
+                if campo in variacao and campo in remota and _normalizar(variacao[campo]) != _normalizar(remota[campo]):
+                    return True
+    return False
+
+def calcular_delta(produtos, produtos_remotos):
+    """
+    Calcula o conjunto mínimo de operações para alinhar a Bagy ao snapshot.
+
+    Produtos que falharam na conversão nunca são excluídos, e nenhuma exclusão é
+    feita quando o snapshot tem menos de MIN_SNAPSHOT_RATIO dos produtos da Bagy.
+
+    Returns:
+        tuple: (criar, atualizar, excluir) - listas de produto convertido,
+            (id na Bagy, produto convertido) e id na Bagy
+    """
+    desejados = {}
+    falhas = set()
+    for produto in produtos:
+        if produto.get('ativo') != '1':
+            continue
+        try:
+            produto_formatado = converter_para_bagy(produto)
+            desejados[produto_formatado["external_id"]] = produto_formatado
+        except Exception as e:
+            falhas.add(str(produto.get("id")))
+            print("❌ Erro ao converter produto:", produto.get("nome"), e)
+
+    atualizar, excluir = [], []
+    encontrados = set()
+    for remoto in produtos_remotos:
+        external_id = _external_id_estavel(remoto)
+        if external_id in falhas:
+            # Produto do snapshot que não pôde ser convertido: mantido como está na Bagy
+            continue
+        desejado = desejados.get(external_id)
+        if desejado is None or external_id in encontrados:
+            # Fora do snapshot, inativo ou duplicado
+            excluir.append(remoto["id"])
+            continue
+        encontrados.add(external_id)
+        if precisa_atualizar(desejado, remoto):
+            atualizar.append((remoto["id"], desejado))
+
+    criar = [desejado for external_id, desejado in desejados.items() if external_id not in encontrados]
+
+    if excluir and len(desejados) + len(falhas) < MIN_SNAPSHOT_RATIO * len(produtos_remotos):
+        print(f"⚠️ Snapshot com {len(desejados) + len(falhas)} produtos ativos para {len(produtos_remotos)} na Bagy: "
+              f"{len(excluir)} exclusões canceladas (snapshot vazio ou incompleto?)")
+        excluir = []
+    return criar, atualizar, excluir
+
+def aplicar_delta(cliente_bagy, criar, atualizar, excluir, max_workers=MAX_WORKERS):
+    """Aplica as operações na Bagy com paralelismo limitado."""
+    resumo = {"criados": 0, "atualizados": 0, "excluidos": 0, "erros": 0}
+    operacoes = (
+        [("criados", produto["name"], cliente_bagy.create_product, (produto,)) for produto in criar] +
+        [("atualizados", produto["name"], cliente_bagy.update_product, (product_id, produto)) for product_id, produto in atualizar] +
+        [("excluidos", product_id, cliente_bagy.delete_product, (product_id,)) for product_id in excluir]
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(funcao, *args): (tipo, nome) for tipo, nome, funcao, args in operacoes}
+        for future in as_completed(futures):
+            tipo, nome = futures[future]
+            try:
+                future.result()
+                resumo[tipo] += 1
+                if tipo != "excluidos":
+                    print(f"✅ Produto {'enviado' if tipo == 'criados' else 'atualizado'}:", nome)
+            except Exception as e:
+                resumo["erros"] += 1
+                print(f"❌ Erro ao processar produto {nome}:", e)
+    return resumo
+
+def reconciliar(cliente_bagy, produtos):
+    produtos_remotos = cliente_bagy.list_all_products()
+    criar, atualizar, excluir = calcular_delta(produtos, produtos_remotos)
+    print(f"📊 Delta: {len(criar)} a criar, {len(atualizar)} a atualizar, {len(excluir)} a excluir "
+          f"({len(produtos_remotos)} produtos na Bagy)")
+    resumo = aplicar_delta(cliente_bagy, criar, atualizar, excluir)
+    print(f"✨ Reconciliação concluída: {resumo}")
+    return resumo
+
+def recriar_todos(cliente_bagy, produtos):
+    produtos = list(produtos)
+    if not any(produto.get('ativo') == '1' for produto in produtos):
+        print("⚠️ Snapshot sem produtos ativos, recriação cancelada para não esvaziar a loja")
+        return
     excluir_todos_os_produtos(cliente_bagy)
-    produtos = carregar_produtos_do_gestaoclick()
     for produto in produtos:
         if produto.get('ativo') != '1':
             continue
@@ -145,5 +302,18 @@ def main():
         except Exception as e:
             print("❌ Erro ao enviar produto:", produto.get("nome"), e)
 
+def main():
+    parser = argparse.ArgumentParser(description='Sincroniza o snapshot de produtos do GestãoClick com a Bagy')
+    parser.add_argument('--recriar', action='store_true',
+                        help='Excluir todos os produtos da Bagy e recriá-los (comportamento antigo)')
+    args = parser.parse_args()
+
+    cliente_bagy = BagyClient()
+    produtos = carregar_produtos_do_gestaoclick()
+    if args.recriar:
+        recriar_todos(cliente_bagy, produtos)
+    else:
+        reconciliar(cliente_bagy, produtos)
+
 if __name__ == '__main__':
     main()
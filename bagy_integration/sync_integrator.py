@@ -16,7 +16,8 @@ class SyncIntegrator:
     Integrador de sincronização que utiliza o VariationHandler para tratar
     variações como produtos independentes na Bagy.
     """
-    def __init__(self, gestaoclick_client, bagy_client, product_converter, entity_mapping, incomplete_products_storage=None):
+    def __init__(self, gestaoclick_client, bagy_client, product_converter, entity_mapping, incomplete_products_storage=None,
+                 sync_history=None):
         """
         Inicializa o integrador de sincronização.
         
@@ -26,6 +27,7 @@ class SyncIntegrator:
             product_converter: Conversor de produtos
             entity_mapping: Mapeamento de entidades
             incomplete_products_storage: Armazenamento de produtos incompletos
+            sync_history: Histórico de sincronização (hash do último payload enviado por produto)
         """
         self.logger = logging.getLogger(self.__class__.__name__)
         self.gc_client = gestaoclick_client
@@ -35,7 +37,7 @@ class SyncIntegrator:
         self.incomplete_products_storage = incomplete_products_storage
         
         # Criar o manipulador de variações
-        self.variation_handler = VariationHandler(bagy_client, product_converter)
+        self.variation_handler = VariationHandler(bagy_client, product_converter, sync_history=sync_history)
     
     def sync_products_to_bagy(self):
         """
@@ -47,6 +49,7 @@ class SyncIntegrator:
         stats = {
             'success': 0,
             'errors': 0,
+            'skipped': 0,
             'incomplete': 0
         }
         
@@ -86,6 +89,7 @@ class SyncIntegrator:
                     # Atualizar estatísticas
                     stats['success'] += variation_stats['success']
                     stats['errors'] += variation_stats['errors']
+                    stats['skipped'] += variation_stats['skipped']
                     
                     # Se nenhuma variação foi processada com sucesso, incrementar contador de produtos incompletos
                     if variation_stats['success'] == 0 and variation_stats['errors'] > 0:
@@ -106,6 +110,7 @@ class SyncIntegrator:
                     # Atualizar estatísticas
                     stats['success'] += product_stats['success']
                     stats['errors'] += product_stats['errors']
+                    stats['skipped'] += product_stats['skipped']
                     
                     # Se o produto não foi processado com sucesso, incrementar contador de produtos incompletos
                     if product_stats['success'] == 0 and product_stats['errors'] > 0:
@@ -115,5 +120,5 @@ class SyncIntegrator:
                 self.logger.error(f"❌ Erro ao processar produto {gc_product.get('nome', 'Desconhecido')} (ID: {gc_product.get('id', 'Desconhecido')}): {str(e)}")
                 stats['errors'] += 1
         
-        self.logger.info(f"✨ Sincronização de produtos para Bagy concluída: {stats['success']} com sucesso, {stats['errors']} erros, {stats['incomplete']} incompletos")
+        self.logger.info(f"✨ Sincronização de produtos para Bagy concluída: {stats['success']} escritos, {stats['skipped']} inalterados, {stats['errors']} erros, {stats['incomplete']} incompletos")
         return stats
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Staged sync pipeline: fetch → convert → diff → write.
+
+Each stage runs in its own worker threads and hands items to the next stage
+through a bounded queue, so a slow stage applies backpressure upstream instead
+of letting items pile up in memory. While one product is being written to Bagy
+the next ones are already being fetched, converted and diffed, so a full run is
+bounded by the slowest stage rather than by the sum of all latencies.
+"""
+import logging
+import queue
+import threading
+import time
+import traceback
+import config
+
+# Marca o fim do fluxo de itens em uma fila
+_END = object()
+
+
+class ItemFailed(Exception):
+    """Raised by a stage function to count the item as an error without logging it again."""
+
+
+class PipelineStage:
+    """
+    One stage of a SyncPipeline.
+
+    The stage function receives one item and returns the item for the next stage,
+    None to drop it (e.g. unchanged or incomplete product), or, with fan_out=True,
+    an iterable of items (e.g. one Bagy product per GestãoClick variation).
+    """
+
+    def __init__(self, name, func, workers=1, fan_out=False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.fan_out = fan_out
+        self.processed = 0
+        self.emitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def record(self, emitted, dropped, errors, busy_seconds):
+        """Accumulate the result of one item (thread-safe)."""
+        with self._lock:
+            self.processed += 1
+            self.emitted += emitted
+            self.dropped += dropped
+            self.errors += errors
+            self.busy_seconds += busy_seconds
+
+    def get_statistics(self):
+        """
+        Get the stage counters and throughput.
+
+        Returns:
+            dict: processed, emitted, dropped, errors, workers, elapsed_seconds,
+                busy_seconds and items_per_second
+        """
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at if self.started_at else 0.0
+        return {
+            'processed': self.processed,
+            'emitted': self.emitted,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'workers': self.workers,
+            'elapsed_seconds': round(elapsed, 3),
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.processed / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+
+class SyncPipeline:
+    """
+    Runs a source iterable through a chain of stages connected by bounded queues.
+
+    Example:
+        pipeline = SyncPipeline("produtos")
+        pipeline.add_stage("convert", converter.gestaoclick_to_bagy, workers=2, fan_out=True)
+        pipeline.add_stage("diff", find_existing, workers=4)
+        pipeline.add_stage("write", write_to_bagy, workers=4)
+        stats = pipeline.run(pagination.iter_items(gc_client.get_products))
+    """
+
+    def __init__(self, name, queue_size=config.PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            name (str): Name used in logs
+            queue_size (int): Capacity of each queue between stages
+        """
+        self.name = name
+        self.queue_size = max(1, queue_size)
+        self.stages = []
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def add_stage(self, name, func, workers=1, fan_out=False):
+        """
+        Append a stage to the pipeline.
+
+        Args:
+            name (str): Stage name used in statistics
+            func (callable): func(item) -> item, iterable of items (fan_out) or None
+            workers (int): Number of worker threads for this stage
+            fan_out (bool): Whether func returns an iterable of items
+
+        Returns:
+            SyncPipeline: self, to allow chaining
+        """
+        self.stages.append(PipelineStage(name, func, workers, fan_out))
+        return self
+
+    def run(self, source, source_name='fetch'):
+        """
+        Feed every item of `source` through the stages and wait for completion.
+
+        Args:
+            source (iterable): Items for the first stage; iterated in its own thread
+            source_name (str): Name of the source stage in statistics
+
+        Returns:
+            dict: {stage_name: statistics} in pipeline order, including the source
+        """
+        source_stage = PipelineStage(source_name, None)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(
+            target=self._feed, args=(source_stage, source, queues[0] if queues else None),
+            name=f"{self.name}-{source_name}", daemon=True
+        )]
+
+        for index, stage in enumerate(self.stages):
+            output = queues[index + 1] if index + 1 < len(queues) else None
+            next_workers = self.stages[index + 1].workers if output is not None else 0
+            remaining = [stage.workers]
+            for number in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(stage, queues[index], output, next_workers, remaining),
+                    name=f"{self.name}-{stage.name}-{number + 1}", daemon=True
+                ))
+
+        self.logger.info(f"🚀 Pipeline '{self.name}' iniciado: " + " → ".join(
+            [source_name] + [f"{stage.name}({stage.workers})" for stage in self.stages]
+        ))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        statistics = {stage.name: stage.get_statistics() for stage in [source_stage] + self.stages}
+        self._log_statistics(statistics)
+        return statistics
+
+    def _feed(self, stage, source, output):
+        """Iterate the source and push items into the first queue."""
+        stage.started_at = time.monotonic()
+        try:
+            iterator = iter(source)
+            while True:
+                start = time.monotonic()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stage.record(1, 0, 0, time.monotonic() - start)
+                if output is not None:
+                    output.put(item)
+        except Exception as e:
+            with stage._lock:
+                stage.errors += 1
+            self.logger.error(f"❌ Erro na etapa '{stage.name}' do pipeline '{self.name}': {str(e)}")
+            self.logger.debug(traceback.format_exc())
+        finally:
+            stage.finished_at = time.monotonic()
+            if output is not None:
+                for _ in range(self.stages[0].workers):
+                    output.put(_END)
+
+    def _work(self, stage, input_queue, output, next_workers, remaining):
+        """Worker loop: take items, run the stage function and pass results on."""
+        with stage._lock:
+            if stage.started_at is None:
+                stage.started_at = time.monotonic()
+
+        while True:
+            item = input_queue.get()
+            if item is _END:
+                break
+
+            start = time.monotonic()
+            try:
+                result = stage.func(item)
+                if result is None:
+                    results = []
+                elif stage.fan_out:
+                    results = list(result)
+                else:
+                    results = [result]
+                stage.record(len(results), 0 if results else 1, 0, time.monotonic() - start)
+            except ItemFailed:
+                results = []
+                stage.record(0, 0, 1, time.monotonic() - start)
+            except Exception as e:
+                results = []
+                stage.record(0, 0, 1, time.monotonic() - start)
+                self.logger.error(f"❌ Erro na etapa '{stage.name}' do pipeline '{self.name}': {str(e)}")
+                self.logger.debug(traceback.format_exc())
+
+            if output is not None:
+                for result in results:
+                    # Bloqueia quando a próxima etapa está atrasada (backpressure)
+                    output.put(result)
+
+        with stage._lock:
+            remaining[0] -= 1
+            last_worker = remaining[0] == 0
+            if last_worker:
+                stage.finished_at = time.monotonic()
+
+        # O último worker da etapa encerra os workers da próxima
+        if last_worker and output is not None:
+            for _ in range(next_workers):
+                output.put(_END)
+
+    def _log_statistics(self, statistics):
+        """Log per-stage throughput."""
+        self.logger.info(f"📊 Pipeline '{self.name}' concluído:")
+        for name, stats in statistics.items():
+            self.logger.info(
+                f"   {name:<10} {stats['processed']:>6} itens em {stats['elapsed_seconds']:.2f}s "
+                f"({stats['items_per_second']:.2f}/s, {stats['workers']} workers, ocupado {stats['busy_seconds']:.2f}s) - "
+                f"emitidos: {stats['emitted']}, descartados: {stats['dropped']}, erros: {stats['errors']}"
+            )
@@ -0,0 +1,63 @@
+"""
+Testes da serialização por chave (SingleFlight.lock) e da criação de clientes sem duplicatas
+"""
+import threading
+
+from api_clients import GestaoClickClient, SingleFlight
+from storage import CustomerIndex
+
+
+def test_key_lock_is_dropped_once_released():
+    single_flight = SingleFlight()
+
+    for n in range(100):
+        with single_flight.lock(('customer', str(n))):
+            with single_flight.lock(('customer', str(n))):
+                pass
+
+    assert single_flight._key_locks == {}
+
+
+def test_key_lock_serializes_concurrent_callers():
+    single_flight = SingleFlight()
+    active, overlaps = [], []
+
+    def worker():
+        with single_flight.lock(('customer', '123')):
+            active.append(1)
+            overlaps.append(len(active))
+            threading.Event().wait(0.01)
+            active.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlaps) == 1
+    assert single_flight._key_locks == {}
+
+
+def test_concurrent_creates_of_the_same_customer_reuse_the_first(tmp_path):
+    client = GestaoClickClient('key', 'secret', customer_index=CustomerIndex(str(tmp_path / "customer_index.json")))
+    requests_sent = []
+
+    def fake_request(method, endpoint, data=None, headers=None, **kwargs):
+        requests_sent.append(data)
+        return {'id': str(len(requests_sent)), **data}
+
+    client._make_request = fake_request
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.create_customer({'nome': 'Ana', 'cpf_cnpj': '123.456.789-09'})))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(requests_sent) == 1
+    assert {result['id'] for result in results} == {'1'}
+    assert client.single_flight._key_locks == {}
@@ -0,0 +1,88 @@
+"""
+Testes dos índices locais (ProductCatalogIndex, CustomerIndex): alterações feitas durante a reconstrução
+"""
+from storage import CustomerIndex, ProductCatalogIndex
+
+
+def _crawl(items, during=None):
+    """Simula a varredura paginada, executando `during` no meio dela"""
+    for position, item in enumerate(items):
+        if position == 1 and during:
+            during()
+        yield item
+
+
+def test_product_rebuild_keeps_upsert_made_during_crawl(tmp_path):
+    """Um produto criado/atualizado durante a varredura não é perdido na troca do índice"""
+    index = ProductCatalogIndex(str(tmp_path / "product_index.json"))
+    crawl = [
+        {'id': 1, 'external_id': 'e1', 'sku': 's1', 'price': 10},
+        {'id': 2, 'external_id': 'e2', 'sku': 's2', 'price': 20},
+    ]
+
+    def during():
+        # Produto novo, criado depois que a página foi lida, e um produto já lido (preço antigo na varredura)
+        index.upsert({'id': 3, 'external_id': 'e3', 'sku': 's3', 'price': 30})
+        index.upsert({'id': 1, 'external_id': 'e1', 'sku': 's1', 'price': 15})
+
+    index.rebuild(_crawl(crawl, during))
+
+    assert index.get_by_external_id('e3')['id'] == 3
+    assert index.get_by_id('1')['price'] == 15
+    assert index.get_by_sku('s2')['id'] == 2
+
+    reloaded = ProductCatalogIndex(str(tmp_path / "product_index.json"))
+    assert reloaded.get_by_external_id('e3')['id'] == 3
+
+
+def test_product_rebuild_keeps_removal_made_during_crawl(tmp_path):
+    """Um produto removido durante a varredura não volta ao índice"""
+    index = ProductCatalogIndex(str(tmp_path / "product_index.json"))
+    crawl = [
+        {'id': 1, 'external_id': 'e1', 'sku': 's1'},
+        {'id': 2, 'external_id': 'e2', 'sku': 's2'},
+    ]
+
+    index.rebuild(_crawl(crawl, lambda: index.remove(1)))
+
+    assert index.get_by_id('1') is None
+    assert index.get_by_external_id('e1') is None
+    assert index.get_by_id('2')['external_id'] == 'e2'
+
+
+def test_product_rebuild_failure_keeps_previous_index(tmp_path):
+    """Se a varredura falhar, o índice anterior continua em uso e o rastreamento é encerrado"""
+    index = ProductCatalogIndex(str(tmp_path / "product_index.json"))
+    index.rebuild([{'id': 1, 'external_id': 'e1', 'sku': 's1'}])
+
+    def failing_crawl():
+        yield {'id': 2, 'external_id': 'e2', 'sku': 's2'}
+        raise RuntimeError("timeout")
+
+    try:
+        index.rebuild(failing_crawl())
+    except RuntimeError:
+        pass
+
+    assert index.get_by_external_id('e1')['id'] == 1
+    assert index.get_by_external_id('e2') is None
+    assert index._crawl_changes is None
+
+
+def test_customer_rebuild_keeps_upsert_made_during_crawl(tmp_path):
+    """Um cliente criado durante a varredura continua encontrável após a troca do índice"""
+    index = CustomerIndex(str(tmp_path / "customer_index.json"))
+    crawl = [
+        {'id': 1, 'cpf_cnpj': '111.444.777-35', 'email': 'a@example.com'},
+        {'id': 2, 'cpf_cnpj': '222.333.444-05', 'email': 'b@example.com'},
+    ]
+
+    def during():
+        index.upsert({'id': 3, 'cpf_cnpj': '123.456.789-09', 'email': 'C@Example.com'})
+
+    index.rebuild(_crawl(crawl, during))
+
+    assert index.find(document='12345678909')['id'] == 3
+    assert index.find(email='c@example.com')['id'] == 3
+    assert index.find(email='b@example.com')['id'] == 2
+    assert index._crawl_changes is None
@@ -0,0 +1,114 @@
+"""
+Testes dos checkpoints de execução (RunCheckpoint) e da página informada pelo feed incremental
+"""
+import config
+from checkpoint import RunCheckpoint
+from incremental_sync import IncrementalProductFeed
+from storage import SyncCheckpoints, SyncCursors
+
+
+def _checkpoint(tmp_path):
+    checkpoint = RunCheckpoint('variations_to_bagy', checkpoints=SyncCheckpoints(str(tmp_path / "checkpoints.json")),
+                               interval=3600, enabled=True)
+    checkpoint.begin(window=lambda: None)
+    return checkpoint
+
+
+def _read(checkpoint, pages):
+    """Lê os itens de cada página pelo track(), como o pipeline faz"""
+    state = {'page': None}
+
+    def items():
+        for page, page_items in pages:
+            state['page'] = page
+            yield from page_items
+
+    return list(checkpoint.track(items(), lambda: state['page']))
+
+
+def test_fan_out_item_is_done_only_after_all_its_parts(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    convert = checkpoint.tracked(lambda product: [{'external_id': f"{product['id']}-{n}"} for n in (1, 2)],
+                                 'convert', fan_out=True)
+    write = checkpoint.tracked(lambda diff_result: diff_result[0], 'write', lambda diff_result: diff_result[0],
+                               writes=True)
+
+    first, second = _read(checkpoint, [(1, [{'id': 1}]), (2, [{'id': 2}])])
+    parts = convert(first)
+    convert(second)
+
+    write((parts[0], None))
+    assert checkpoint.completed_page == 0
+    write((parts[1], None))
+    assert checkpoint.completed_page == 1
+    assert not checkpoint.has_failures()
+
+
+def test_failed_part_marks_its_source_item_as_failed(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    convert = checkpoint.tracked(lambda product: [{'external_id': f"{product['id']}-{n}"} for n in (1, 2)],
+                                 'convert', fan_out=True)
+    # Escrita que devolve None: falha, como nos sincronizadores de variações
+    write = checkpoint.tracked(lambda diff_result: diff_result[0] if diff_result[1] else None, 'write',
+                               lambda diff_result: diff_result[0], writes=True)
+
+    (product,) = _read(checkpoint, [(1, [{'id': 7}])])
+    parts = convert(product)
+    write((parts[0], None))
+    write((parts[1], {'id': 70}))
+
+    assert checkpoint.has_failures()
+    assert checkpoint.failed == {'7': 'write'}
+    assert checkpoint.completed_page == 1
+
+
+def test_incomplete_product_without_parts_is_done(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    convert = checkpoint.tracked(lambda product: [], 'convert', fan_out=True)
+
+    (product,) = _read(checkpoint, [(1, [{'id': 3}])])
+    convert(product)
+
+    assert checkpoint.completed_page == 1
+    assert not checkpoint.has_failures()
+
+
+def test_replayed_write_is_recognized_from_a_part(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    convert = checkpoint.tracked(lambda product: [{'external_id': f"{product['id']}-1"}], 'convert', fan_out=True)
+    # Checkpoint gravado enquanto a escrita está em andamento (a execução é interrompida em seguida)
+    write = checkpoint.tracked(lambda diff_result: checkpoint.save() or diff_result[0], 'write',
+                               lambda diff_result: diff_result[0], writes=True)
+    (product,) = _read(checkpoint, [(1, [{'id': 5}])])
+    (part,) = convert(product)
+    write((part, None))
+
+    resumed = _checkpoint(tmp_path)
+    convert = resumed.tracked(lambda product: [{'external_id': f"{product['id']}-1"}], 'convert', fan_out=True)
+    (product,) = _read(resumed, [(1, [{'id': 5}])])
+    (part,) = convert(product)
+
+    assert resumed.is_replayed(part)
+    assert not resumed.is_replayed({'external_id': '6-1'})
+
+
+class _FakeGestaoClick:
+    """Devolve páginas maiores que o limite pedido, como quando a API ignora o parâmetro"""
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+
+    def get_products(self, page=1, limit=100, modified_since=None):
+        if page > len(self.sizes):
+            return {'data': []}
+        return {'data': [{'id': f"{page}-{n}"} for n in range(self.sizes[page - 1])]}
+
+
+def test_feed_page_comes_from_pagination(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'INCREMENTAL_SYNC_ENABLED', False)
+    feed = IncrementalProductFeed(_FakeGestaoClick([150, 150, 10]), cursors=SyncCursors(str(tmp_path / "cursors.json")))
+
+    pages = {product['id']: feed.page for product in feed.iter_products(start_page=1)}
+
+    assert len(pages) == 310
+    assert all(pages[product_id] == int(product_id.split('-')[0]) for product_id in pages)
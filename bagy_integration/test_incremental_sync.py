@@ -0,0 +1,92 @@
+"""
+Testes dos limites do cursor de pedidos (IncrementalOrderFeed): mesmo instante, janela de sobreposição e falhas
+"""
+import pytest
+
+import config
+from incremental_sync import IncrementalOrderFeed
+from storage import SyncCursors
+
+MARK = '2024-05-01T12:00:00'
+
+
+class _FakeBagy:
+    """Devolve sempre os mesmos pedidos, ignorando o filtro (o feed também filtra localmente)"""
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.requests = []
+
+    def get_orders(self, page=1, limit=100, updated_since=None, status=None):
+        self.requests.append({'updated_since': updated_since, 'status': status})
+        return {'data': self.orders if page == 1 and status is None else []}
+
+
+@pytest.fixture
+def cursors(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'INCREMENTAL_SYNC_ENABLED', True)
+    monkeypatch.setattr(config, 'INCREMENTAL_SYNC_OVERLAP_SECONDS', 300)
+    cursors = SyncCursors(str(tmp_path / "sync_cursors.json"))
+    # Varredura dos pedidos em aberto recente: apenas a janela do cursor é lida
+    cursors.update('bagy_orders', order_updated_at=MARK, last_open_sweep='2999-01-01T00:00:00')
+    return cursors
+
+
+def _order(order_id, updated_at):
+    return {'id': order_id, 'status': 'paid', 'updated_at': updated_at}
+
+
+def _run(cursors, orders):
+    feed = IncrementalOrderFeed(_FakeBagy(orders), cursors=cursors)
+    return feed, [order['id'] for order in feed.iter_orders()]
+
+
+def test_orders_at_the_mark_timestamp_are_read_again(cursors):
+    """Pedidos no mesmo instante da marca voltam, qualquer que seja o ID (o hash evita a reescrita)"""
+    feed, ids = _run(cursors, [
+        _order(900, '2024-05-01T12:00:00Z'),
+        _order(5, '2024-05-01T12:00:00Z'),
+    ])
+
+    assert ids == [900, 5]
+    feed.commit(success=True)
+    assert cursors.get('bagy_orders')['order_updated_at'] == MARK
+
+
+def test_overlap_window_keeps_late_writes_and_drops_older_orders(cursors):
+    feed, ids = _run(cursors, [
+        _order(1, '2024-05-01T11:56:00Z'),   # dentro da margem de 5 minutos
+        _order(2, '2024-05-01T11:54:59Z'),   # antes da janela
+        _order(3, '2024-05-01T12:30:00Z'),   # alterado depois da marca
+    ])
+
+    assert ids == [1, 3]
+    assert feed.bagy_client.requests[0]['updated_since'] == '2024-05-01 11:55:00'
+
+
+def test_mark_advances_to_newest_order_on_success(cursors):
+    feed, _ = _run(cursors, [_order(3, '2024-05-01T12:30:00Z'), _order(4, '2024-05-01T12:10:00-03:00')])
+
+    feed.commit(success=True)
+
+    # 12:10 em -03:00 é 15:10 UTC, o pedido mais recente
+    assert cursors.get('bagy_orders')['order_updated_at'] == '2024-05-01T15:10:00'
+
+
+def test_failed_run_keeps_the_mark(cursors):
+    feed, _ = _run(cursors, [_order(3, '2024-05-01T12:30:00Z')])
+
+    feed.commit(success=False)
+
+    assert cursors.get('bagy_orders')['order_updated_at'] == MARK
+    _, ids = _run(cursors, [_order(3, '2024-05-01T12:30:00Z')])
+    assert ids == [3]
+
+
+def test_mark_never_moves_backwards(cursors):
+    feed, ids = _run(cursors, [_order(1, '2024-05-01T11:58:00Z')])
+
+    feed.commit(success=True)
+
+    assert ids == [1]
+    assert cursors.get('bagy_orders')['order_updated_at'] == MARK
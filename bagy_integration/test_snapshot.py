@@ -0,0 +1,53 @@
+"""
+Testes da leitura em streaming do snapshot de produtos (snapshot.py)
+"""
+import io
+import json
+import os
+
+import pytest
+
+from snapshot import iter_json_array, iter_snapshot, write_snapshot
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'data', 'produtos.json')
+
+# Itens que costumam cair na fronteira entre blocos: números com expoente, escapes e colchetes dentro de strings
+TRICKY_DOCUMENT = '''[
+  2.5e3, -0.125, 10, 1E-2, true, false, null, "",
+  "vírgula, colchete ] e chave }", "escape \\" e \\\\", "\\u00e1gua",
+  {"nome": "Egg [SPIDER]", "valores": [{"preco": 19.90}, {"preco": 2.5e3}], "vazio": {}},
+  [], [[1, 2], [3.0]], {"a": {"b": {"c": [null]}}}
+]'''
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64])
+def test_chunk_boundaries_match_json_load(chunk_size):
+    items = list(iter_json_array(io.StringIO(TRICKY_DOCUMENT), chunk_size=chunk_size))
+    assert items == json.loads(TRICKY_DOCUMENT)
+
+
+@pytest.mark.parametrize('document', ['[]', ' [ ] ', '[1]', '[ 7 ]', '["x"]', '[2.5]'])
+def test_small_arrays_with_one_char_chunks(document):
+    assert list(iter_json_array(io.StringIO(document), chunk_size=1)) == json.loads(document)
+
+
+def test_fixture_with_one_char_chunks_matches_json_load():
+    with open(FIXTURE, encoding='utf-8') as fp:
+        expected = json.load(fp)
+    with open(FIXTURE, encoding='utf-8') as fp:
+        assert list(iter_json_array(fp, chunk_size=1)) == expected
+
+
+@pytest.mark.parametrize('document', ['{"a": 1}', '[1, 2', '[1 2]', '[{"a": 1}', '[2.5e'])
+def test_invalid_or_truncated_documents_raise(document):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(document), chunk_size=1))
+
+
+@pytest.mark.parametrize('name', ['produtos.json', 'produtos.ndjson'])
+def test_written_snapshot_reads_back(tmp_path, name):
+    records = [json.loads(TRICKY_DOCUMENT)[11], {'id': '2', 'nome': 'Óleo'}]
+    path = str(tmp_path / name)
+
+    assert write_snapshot(records, path) == 2
+    assert list(iter_snapshot(path)) == records
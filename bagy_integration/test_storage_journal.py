@@ -0,0 +1,132 @@
+"""
+Testes do journal de armazenamento (StorageJournal): recuperação, compactação e falha do snapshot
+"""
+import json
+import os
+import threading
+
+import storage
+from storage import EntityMapping, StorageJournal
+
+
+def _mapping_file(tmp_path):
+    return str(tmp_path / "entity_mapping.json")
+
+
+def test_journal_replay_recovers_unsnapshotted_mappings(tmp_path):
+    """Mapeamentos gravados só no journal são recuperados por uma nova instância"""
+    mapping = EntityMapping(_mapping_file(tmp_path))
+    mapping.add_mapping('products', 'b1', 'g1')
+    mapping.add_mapping('customers', 'b2', 'g2')
+    mapping.flush()
+
+    # Nenhum snapshot ainda: o estado está apenas no journal
+    assert not os.path.exists(_mapping_file(tmp_path))
+    assert os.path.exists(mapping.journal.journal_file)
+
+    reloaded = EntityMapping(_mapping_file(tmp_path))
+    assert reloaded.get_gestaoclick_id('products', 'b1') == 'g1'
+    assert reloaded.get_bagy_id('customers', 'g2') == 'b2'
+
+
+def test_journal_replay_ignores_truncated_last_line(tmp_path):
+    """Uma última linha incompleta (gravação interrompida) é ignorada"""
+    journal = StorageJournal(str(tmp_path / "doc.json"), write_snapshot=lambda: None)
+    with open(journal.journal_file, 'w') as f:
+        f.write(json.dumps({'op': 'set', 'path': ['a', 'x'], 'value': 1}) + '\n')
+        f.write(json.dumps({'op': 'set', 'path': ['a', 'y'], 'value': 2}) + '\n')
+        f.write(json.dumps({'op': 'del', 'path': ['a', 'x']}) + '\n')
+        f.write('{"op": "set", "path": ["a", "z"], "val')
+
+    document = {}
+    assert journal.replay(document) == 3
+    assert document == {'a': {'y': 2}}
+
+
+def test_compact_writes_snapshot_and_truncates_journal(tmp_path):
+    """A compactação grava o snapshot completo e remove o journal"""
+    mapping = EntityMapping(_mapping_file(tmp_path))
+    mapping.add_mapping('products', 'b1', 'g1')
+    mapping.flush()
+
+    assert mapping.journal.compact() is True
+    assert not os.path.exists(mapping.journal.journal_file)
+    with open(_mapping_file(tmp_path)) as f:
+        assert json.load(f)['products'] == {'b1': 'g1'}
+
+    reloaded = EntityMapping(_mapping_file(tmp_path))
+    assert reloaded.get_gestaoclick_id('products', 'b1') == 'g1'
+
+
+def test_failed_snapshot_keeps_journal_and_pending_records(tmp_path, monkeypatch):
+    """Se o snapshot falhar, o journal é mantido e os registros pendentes não se perdem"""
+    mapping = EntityMapping(_mapping_file(tmp_path))
+    mapping.add_mapping('products', 'b1', 'g1')
+    mapping.flush()
+    # Registro ainda pendente (não gravado no journal) no momento da compactação
+    mapping.add_mapping('products', 'b2', 'g2')
+
+    def failing_dump(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(storage.json, 'dump', failing_dump)
+    assert mapping.journal.compact() is False
+    monkeypatch.undo()
+
+    assert os.path.exists(mapping.journal.journal_file)
+    assert not os.path.exists(_mapping_file(tmp_path))
+
+    reloaded = EntityMapping(_mapping_file(tmp_path))
+    assert reloaded.get_gestaoclick_id('products', 'b1') == 'g1'
+    assert reloaded.get_gestaoclick_id('products', 'b2') == 'g2'
+
+
+def test_failed_snapshot_keeps_previous_snapshot(tmp_path, monkeypatch):
+    """Uma falha ao substituir o snapshot preserva o snapshot anterior e o journal"""
+    mapping = EntityMapping(_mapping_file(tmp_path))
+    mapping.add_mapping('products', 'b1', 'g1')
+    assert mapping.journal.compact() is True
+
+    mapping.add_mapping('products', 'b2', 'g2')
+    mapping.flush()
+
+    def failing_replace(*args, **kwargs):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(storage.os, 'replace', failing_replace)
+    monkeypatch.setattr(storage.os, 'rename', failing_replace)
+    assert mapping.journal.close() is False
+    monkeypatch.undo()
+
+    with open(_mapping_file(tmp_path)) as f:
+        assert json.load(f)['products'] == {'b1': 'g1'}
+
+    reloaded = EntityMapping(_mapping_file(tmp_path))
+    assert reloaded.get_gestaoclick_id('products', 'b1') == 'g1'
+    assert reloaded.get_gestaoclick_id('products', 'b2') == 'g2'
+
+
+def test_compact_during_concurrent_mutations(tmp_path):
+    """Compactar enquanto outras threads alteram o mapeamento não corrompe o snapshot"""
+    mapping = EntityMapping(_mapping_file(tmp_path))
+    errors = []
+
+    def writer(prefix):
+        try:
+            for i in range(500):
+                mapping.add_mapping('products', f'{prefix}{i}', f'g{prefix}{i}')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(prefix,)) for prefix in 'abcd']
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        assert mapping.journal.compact() is True
+    for thread in threads:
+        thread.join()
+    mapping.journal.close()
+
+    assert not errors
+    reloaded = EntityMapping(_mapping_file(tmp_path))
+    assert len(reloaded.mapping['products']) == 2000
@@ -0,0 +1,106 @@
+"""
+Testes do cálculo de delta da reconciliação GestãoClick -> Bagy (calcular_delta)
+"""
+from sync_gestaoclick_to_bagy import calcular_delta, converter_para_bagy
+
+
+def _produto(produto_id=1, **campos):
+    produto = {
+        "id": str(produto_id),
+        "nome": f"Produto {produto_id}",
+        "descricao": "Descrição",
+        "valor_venda": "10.00",
+        "valor_custo": "4.00",
+        "estoque": "5",
+        "codigo_interno": f"REF{produto_id}",
+        "codigo_barra": f"789{produto_id}",
+        "peso": "1", "largura": "2", "altura": "3", "comprimento": "4",
+        "ativo": "1",
+        "fotos": ["https://example.com/foto.png"],
+    }
+    produto.update(campos)
+    return produto
+
+
+def _produto_com_variacoes(produto_id=2, preco_p="10.00", preco_m="12.00"):
+    return _produto(
+        produto_id,
+        possui_variacao="1",
+        variacoes=[{"nome": "Tamanho"}],
+        valores=[
+            {"variacao": "P", "preco_venda": preco_p, "codigo_barra": "111"},
+            {"variacao": "M", "preco_venda": preco_m, "codigo_barra": "222"},
+        ],
+    )
+
+
+def _remoto(produto, bagy_id, **campos):
+    """Produto como a Bagy o devolve após a última sincronização"""
+    remoto = dict(converter_para_bagy(produto), id=bagy_id)
+    remoto.update(campos)
+    return remoto
+
+
+def test_unchanged_products_produce_no_operations():
+    produtos = [_produto(1), _produto_com_variacoes(2)]
+    remotos = [_remoto(produtos[0], 101), _remoto(produtos[1], 102)]
+
+    assert calcular_delta(produtos, remotos) == ([], [], [])
+
+
+def test_stock_only_change_is_updated():
+    remoto = _remoto(_produto(1), 101)
+    produto = _produto(1, estoque="7")
+
+    criar, atualizar, excluir = calcular_delta([produto], [remoto])
+
+    assert criar == [] and excluir == []
+    assert [(bagy_id, desejado["stock"]) for bagy_id, desejado in atualizar] == [(101, 7)]
+
+
+def test_variation_price_change_is_updated():
+    remoto = _remoto(_produto_com_variacoes(2), 102)
+    produto = _produto_com_variacoes(2, preco_m="15.00")
+
+    criar, atualizar, excluir = calcular_delta([produto], [remoto])
+
+    assert criar == [] and excluir == []
+    assert [bagy_id for bagy_id, _ in atualizar] == [102]
+
+
+def test_legacy_external_id_is_adopted_instead_of_recreated():
+    produto = _produto(12)
+    remoto = _remoto(produto, 112, external_id="12-1700000000")
+
+    criar, atualizar, excluir = calcular_delta([produto], [remoto])
+
+    assert criar == [] and excluir == []
+    assert [(bagy_id, desejado["external_id"]) for bagy_id, desejado in atualizar] == [(112, "12")]
+
+
+def test_duplicates_in_bagy_are_deleted():
+    produto = _produto(1)
+    remotos = [_remoto(produto, 101), _remoto(produto, 201, external_id="1-1700000000")]
+
+    criar, atualizar, excluir = calcular_delta([produto], remotos)
+
+    assert criar == [] and atualizar == []
+    assert excluir == [201]
+
+
+def test_deletions_are_cancelled_for_an_incomplete_snapshot():
+    produto = _produto(1)
+    remotos = [_remoto(produto, 101)] + [_remoto(_produto(n), 100 + n) for n in (2, 3, 4)]
+
+    criar, atualizar, excluir = calcular_delta([produto], remotos)
+
+    assert (criar, atualizar, excluir) == ([], [], [])
+
+
+def test_products_that_failed_conversion_are_not_deleted():
+    produtos = [_produto(1), _produto(2, estoque="indisponível")]
+    remotos = [_remoto(produtos[0], 101), _remoto(_produto(2), 102)]
+
+    criar, atualizar, excluir = calcular_delta(produtos, remotos)
+
+    assert (criar, atualizar, excluir) == ([], [], [])
@@ -2,8 +2,11 @@
 Utilities for the Bagy to GestãoClick synchronization tool.
 """
 import logging
-import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import config
+from fingerprint import entity_version
 
 class Pagination:
     """
@@ -13,6 +16,82 @@ class Pagination:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
     
+    def iter_items(self, fetcher, data_key='data', page_param='page', limit_param='limit', limit=100,
+                   prefetch=config.PAGINATION_PREFETCH_PAGES, start_page=1, on_page=None):
+        """
+        Yield items from a paginated API as pages arrive.
+        
+        While the caller processes one page, the next `prefetch` pages are fetched in
+        background threads. Pagination stops at the first empty or short page.
+        
+        Args:
+            fetcher (callable): Function to fetch a page (fetcher(page=n, limit=m))
+            data_key (str): Key in the response that contains the data array
+            page_param (str): Parameter name for page in the fetcher
+            limit_param (str): Parameter name for limit in the fetcher
+            limit (int): Number of items per page
+            prefetch (int): Number of pages fetched ahead of the one being consumed (0 disables)
+            start_page (int): First page to fetch (e.g. when resuming an interrupted run)
+            on_page (callable, optional): Called with the page number before its items are yielded
+            
+        Yields:
+            dict: Items from each page, in page order
+        """
+        def fetch(page):
+            return fetcher(**{page_param: page, limit_param: limit})
+        
+        executor = ThreadPoolExecutor(max_workers=prefetch + 1, thread_name_prefix="pagination") if prefetch > 0 else None
+        pending = deque()
+        next_page = start_page
+        total_items = 0
+        pages = 0
+        
+        def schedule():
+            nonlocal next_page
+            while executor and len(pending) <= prefetch:
+                pending.append((next_page, executor.submit(fetch, next_page)))
+                next_page += 1
+        
+        try:
+            while True:
+                if executor:
+                    schedule()
+                    page, future = pending.popleft()
+                    response = future.result()
+                else:
+                    page = next_page
+                    next_page += 1
+                    response = fetch(page)
+                
+                # Check if data is available
+                if not response or data_key not in response:
+                    self.logger.warning(f"API response missing '{data_key}' key in page {page}")
+                    break
+                
+                # Get items from response
+                items = response[data_key]
+                
+                # Check if we have items
+                if not items:
+                    self.logger.info(f"GestãoClick API retornou array vazio em '{data_key}' na página {page}, finalizando paginação")
+                    break
+                
+                pages = page
+                total_items += len(items)
+                if on_page:
+                    on_page(page)
+                yield from items
+                
+                # A short page is the last one
+                if len(items) < limit:
+                    break
+        finally:
+            if executor:
+                # Descartar páginas buscadas à frente que não serão consumidas
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        self.logger.info(f"Recuperado um total de {total_items} itens de {pages} páginas")
+    
     def get_all_pages(self, fetcher, data_key='data', page_param='page', limit_param='limit', limit=100):
         """
         Get all pages from a paginated API using the provided fetcher function.
@@ -27,46 +106,40 @@ class Pagination:
         Returns:
             list: All items from all pages
         """
-        all_items = []
-        page = 1
-        keep_fetching = True
+        return list(self.iter_items(fetcher, data_key, page_param, limit_param, limit))
+
+def iter_paginated_results(fetch_page_func, extract_items_func, limit=100, prefetch=config.PAGINATION_PREFETCH_PAGES):
+    """
+    Yield items from a paginated API as pages arrive, prefetching the next pages.
+    
+    Args:
+        fetch_page_func (callable): Function to fetch a page (fetch_page_func(page))
+        extract_items_func (callable): Function returning the item list from a page response
+        limit (int): Page size used by fetch_page_func; a shorter page ends pagination
+        prefetch (int): Number of pages fetched ahead of the one being consumed
         
-        while keep_fetching:
-            # Build fetcher parameters
-            params = {
-                page_param: page,
-                limit_param: limit
-            }
-            
-            # Fetch current page
-            response = fetcher(**params)
-            
-            # Check if data is available
-            if not response or data_key not in response:
-                self.logger.warning(f"API response missing '{data_key}' key in page {page}")
-                break
-            
-            # Get items from response
-            items = response[data_key]
-            
-            # Check if we have items
-            if not items or len(items) == 0:
-                self.logger.info(f"GestãoClick API retornou array vazio em '{data_key}' na página {page}, finalizando paginação")
-                break
-            
-            # Add items to result
-            all_items.extend(items)
-            
-            # Check if we have more pages
-            if len(items) < limit:
-                # This was the last page
-                keep_fetching = False
-            else:
-                # Continue to next page
-                page += 1
+    Yields:
+        dict: Items from each page, in page order
+    """
+    yield from Pagination().iter_items(
+        fetcher=lambda page, limit: {'data': extract_items_func(fetch_page_func(page) or {})},
+        limit=limit,
+        prefetch=prefetch
+    )
+
+def paginate_all_results(fetch_page_func, extract_items_func, limit=100):
+    """
+    Get all items from a paginated API.
+    
+    Args:
+        fetch_page_func (callable): Function to fetch a page (fetch_page_func(page))
+        extract_items_func (callable): Function returning the item list from a page response
+        limit (int): Page size used by fetch_page_func; a shorter page ends pagination
         
-        self.logger.info(f"Recuperado um total de {len(all_items)} itens de {page} páginas")
-        return all_items
+    Returns:
+        list: All items from all pages
+    """
+    return list(iter_paginated_results(fetch_page_func, extract_items_func, limit))
 
 def get_current_datetime():
     """
@@ -94,4 +167,90 @@ def format_duration(seconds):
         return f"{minutes:.2f} minutos"
     else:
         hours = seconds / 3600
-        return f"{hours:.2f} horas"
\ No newline at end of file
+        return f"{hours:.2f} horas"
+
+# Campos de produto efetivamente enviados à Bagy nas atualizações; mudanças em outros
+# campos do GestãoClick não geram escrita
+BAGY_PRODUCT_SYNC_FIELDS = (
+    'name', 'description', 'price', 'price_compare', 'balance',
+    'height', 'width', 'depth', 'weight', 'sku'
+)
+
+def hash_bagy_payload(bagy_product, fields=BAGY_PRODUCT_SYNC_FIELDS):
+    """
+    Hash a converted Bagy product, projected onto the fields pushed to Bagy.
+    
+    Args:
+        bagy_product (dict): Product converted to the Bagy format
+        fields (tuple): Fields included in the hash
+        
+    Returns:
+        str: Compact fingerprint; equal values mean the write would send the same data
+    """
+    return entity_version(bagy_product, fields=fields)
+
+def generate_entity_version(entity, entity_type=None):
+    """
+    Generate the version stored in the sync history for an entity.
+    
+    Only the sync-relevant fields of the entity type are hashed (see
+    fingerprint.ENTITY_FIELDS) and volatile fields such as 'updated_at' are
+    ignored, so the version only changes when a resync would change something.
+    
+    Args:
+        entity (dict): API payload
+        entity_type (str, optional): 'gestaoclick_products', 'bagy_products',
+            'bagy_customers' or 'bagy_orders'; None hashes every non-volatile field
+        
+    Returns:
+        str: Compact 128-bit fingerprint
+    """
+    return entity_version(entity, entity_type)
+
+def normalize_document(document):
+    """
+    Normalize a CPF/CNPJ for comparison (digits only).
+    
+    Args:
+        document (str): Document as typed by the customer
+        
+    Returns:
+        str: Digits of the document ('' if none)
+    """
+    return ''.join(ch for ch in str(document or '') if ch.isdigit())
+
+
+def normalize_email(email):
+    """
+    Normalize an email for comparison (trimmed, lowercase).
+    
+    Args:
+        email (str): Email address
+        
+    Returns:
+        str: Normalized email ('' if none)
+    """
+    return str(email or '').strip().lower()
+
+
+def extract_business_entity_id(entity, entity_type):
+    """
+    Extract the business key that identifies an entity on both platforms.
+    
+    Args:
+        entity (dict): API payload
+        entity_type (str): 'products', 'customers' or 'orders'
+        
+    Returns:
+        str or None: SKU/internal code for products, CPF/CNPJ (digits only) or
+            email for customers, order code for orders
+    """
+    if entity_type == 'products':
+        key = entity.get('sku') or entity.get('codigo_interno') or entity.get('external_id')
+    elif entity_type == 'customers':
+        key = normalize_document(entity.get('cgc') or entity.get('cpf_cnpj')) or normalize_email(entity.get('email'))
+    elif entity_type == 'orders':
+        key = entity.get('code') or entity.get('codigo')
+    else:
+        key = entity.get('id')
+    return str(key) if key else None
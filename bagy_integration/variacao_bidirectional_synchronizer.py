@@ -3,16 +3,55 @@ Versão final do sincronizador bidirecional com suporte total para variações c
 Esta implementação garante que cada variação de produto seja tratada como um produto 
 completamente independente na Bagy.
 """
+import itertools
 import logging
 import time
 from datetime import datetime
 import os
-import json
 
 from api_clients import BagyClient, GestaoClickClient
 from new_product_converter import ProductConverter
-from storage import IncompleteProductsStorage, EntityMapping
-from utils import Pagination
+from storage import open_incomplete_products_storage, open_entity_mapping, open_sync_history, SyncCheckpoints
+from utils import Pagination, hash_bagy_payload
+from sync_pipeline import SyncPipeline
+from incremental_sync import IncrementalProductFeed
+from checkpoint import RunCheckpoint
+import config
+
+def build_update_data(bagy_product, existing_product):
+    """
+    Monta o payload de atualização de um produto já existente na Bagy.
+    
+    Args:
+        bagy_product (dict): Produto convertido para o formato da Bagy
+        existing_product (dict): Produto atual na Bagy
+        
+    Returns:
+        dict: Dados para update_product
+    """
+    update_data = {
+        'name': bagy_product.get('name'),
+        'description': bagy_product.get('description'),
+        'price': bagy_product.get('price'),
+        'price_compare': bagy_product.get('price_compare'),
+        'balance': bagy_product.get('balance'),
+        'height': bagy_product.get('height'),
+        'width': bagy_product.get('width'),
+        'depth': bagy_product.get('depth'),
+        'weight': bagy_product.get('weight')
+    }
+    
+    # Verificar se SKU precisa ser atualizado
+    current_sku = existing_product.get('sku')
+    new_sku = bagy_product.get('sku')
+    
+    if current_sku != new_sku and new_sku:
+        update_data['sku'] = str(new_sku)
+        update_data['reference'] = str(new_sku)
+        update_data['code'] = str(new_sku)
+    
+    return update_data
+
 
 class VariacaoBidirectionalSynchronizer:
     """
@@ -41,12 +80,90 @@ class VariacaoBidirectionalSynchronizer:
         storage_dir = os.environ.get('STORAGE_DIR', './data')
         os.makedirs(storage_dir, exist_ok=True)
         
-        self.incomplete_products = incomplete_products_storage or IncompleteProductsStorage(f"{storage_dir}/incomplete_products.json")
-        self.entity_mapping = EntityMapping(f"{storage_dir}/entity_mapping.json")
+        self.incomplete_products = incomplete_products_storage or open_incomplete_products_storage(f"{storage_dir}/incomplete_products.json")
+        self.entity_mapping = open_entity_mapping(f"{storage_dir}/entity_mapping.json")
+        # Hash do último payload enviado por produto, para pular escritas sem mudanças
+        self.sync_history = open_sync_history(f"{storage_dir}/sync_history.json")
+        
+        # Produtos do GestãoClick alterados desde a última execução bem-sucedida
+        self.product_feed = IncrementalProductFeed(self.gc_client)
+        # Progresso da execução em andamento, retomado após uma interrupção
+        self.sync_checkpoints = SyncCheckpoints(f"{storage_dir}/sync_checkpoints.json")
+        self._checkpoint = None
         
         # Configurar conversor de produtos
         self.product_converter = product_converter or ProductConverter(incomplete_products_storage=self.incomplete_products)
     
+    def _find_existing_product(self, bagy_product):
+        """
+        Etapa de diff: busca o produto correspondente já existente na Bagy.
+        
+        Args:
+            bagy_product (dict): Produto convertido para o formato da Bagy
+            
+        Returns:
+            tuple or None: (bagy_product, produto existente na Bagy ou None), ou None se
+                o payload for idêntico ao último enviado (nada a escrever)
+        """
+        external_id = bagy_product.get('external_id')
+        if not self.sync_history.should_sync('bagy_products', external_id, hash_bagy_payload(bagy_product)):
+            self.logger.debug(f"⏭️ Produto inalterado desde a última sincronização: {bagy_product.get('name')} (external_id: {external_id})")
+            return None
+        
+        # Escrita em andamento quando a execução anterior foi interrompida: o produto pode já
+        # ter sido criado na Bagy sem que o índice local tenha sido gravado
+        remote = self._checkpoint is not None and self._checkpoint.is_replayed(bagy_product)
+        existing_product = self.bagy_client.get_product_by_external_id(external_id, remote=remote)
+        return bagy_product, existing_product
+    
+    def _write_bagy_product(self, diff_result):
+        """
+        Etapa de escrita: cria ou atualiza o produto na Bagy.
+        
+        Args:
+            diff_result (tuple): (bagy_product, produto existente na Bagy ou None)
+            
+        Returns:
+            dict or None: Produto criado/atualizado, ou None em caso de falha
+        """
+        bagy_product, existing_product = diff_result
+        external_id = bagy_product.get('external_id')
+        product_name = bagy_product.get('name')
+        
+        if not existing_product:
+            # Criar novo produto
+            self.logger.info(f"📦 Criando produto na Bagy: {product_name} (external_id: {external_id})")
+            new_product = self.bagy_client.create_product(bagy_product)
+            
+            if new_product and 'id' in new_product:
+                # Produto criado com sucesso, registrar no mapeamento
+                self.entity_mapping.add_mapping(
+                    entity_type='products',
+                    bagy_id=new_product['id'],
+                    gestaoclick_id=external_id
+                )
+                self.sync_history.update_sync('bagy_products', external_id, hash_bagy_payload(bagy_product))
+                self.logger.info(f"✅ Produto criado com sucesso: {product_name} (ID: {new_product['id']})")
+                return new_product
+            
+            self.logger.error(f"❌ Falha ao criar produto: {product_name}")
+            return None
+        
+        # Atualizar produto existente
+        bagy_id = existing_product.get('id')
+        self.logger.info(f"🔄 Atualizando produto: {product_name} (ID: {bagy_id})")
+        
+        # Atualizar produto
+        updated_product = self.bagy_client.update_product(bagy_id, build_update_data(bagy_product, existing_product))
+        
+        if updated_product:
+            self.sync_history.update_sync('bagy_products', external_id, hash_bagy_payload(bagy_product))
+            self.logger.info(f"✅ Produto atualizado com sucesso: {product_name} (ID: {bagy_id})")
+            return updated_product
+        
+        self.logger.error(f"❌ Falha ao atualizar produto: {product_name} (ID: {bagy_id})")
+        return None
+    
     def _process_product_variation(self, gc_product):
         """
         Processa um produto e suas variações como produtos independentes.
@@ -55,11 +172,12 @@ class VariacaoBidirectionalSynchronizer:
             gc_product (dict): Produto do GestãoClick
             
         Returns:
-            dict: Estatísticas de processamento (sucesso, erros)
+            dict: Estatísticas de processamento (sucesso, erros, inalterados)
         """
         stats = {
             'success': 0,
-            'errors': 0
+            'errors': 0,
+            'skipped': 0
         }
         
         # Converter o produto em uma lista de produtos Bagy (um para cada variação)
@@ -72,65 +190,13 @@ class VariacaoBidirectionalSynchronizer:
         # Processar cada produto convertido
         for bagy_product in bagy_products:
             try:
-                external_id = bagy_product.get('external_id')
-                product_name = bagy_product.get('name')
-                
-                # Verificar se o produto já existe na Bagy
-                existing_product = self.bagy_client.get_product_by_external_id(external_id)
-                
-                if not existing_product:
-                    # Criar novo produto
-                    self.logger.info(f"📦 Criando produto na Bagy: {product_name} (external_id: {external_id})")
-                    new_product = self.bagy_client.create_product(bagy_product)
-                    
-                    if new_product and 'id' in new_product:
-                        # Produto criado com sucesso, registrar no mapeamento
-                        self.entity_mapping.add_mapping(
-                            entity_type='product',
-                            bagy_id=new_product['id'],
-                            gestaoclick_id=external_id
-                        )
-                        stats['success'] += 1
-                        self.logger.info(f"✅ Produto criado com sucesso: {product_name} (ID: {new_product['id']})")
-                    else:
-                        stats['errors'] += 1
-                        self.logger.error(f"❌ Falha ao criar produto: {product_name}")
+                diff_result = self._find_existing_product(bagy_product)
+                if diff_result is None:
+                    stats['skipped'] += 1
+                elif self._write_bagy_product(diff_result):
+                    stats['success'] += 1
                 else:
-                    # Atualizar produto existente
-                    bagy_id = existing_product.get('id')
-                    self.logger.info(f"🔄 Atualizando produto: {product_name} (ID: {bagy_id})")
-                    
-                    # Preparar dados para atualização
-                    update_data = {
-                        'name': bagy_product.get('name'),
-                        'description': bagy_product.get('description'),
-                        'price': bagy_product.get('price'),
-                        'price_compare': bagy_product.get('price_compare'),
-                        'balance': bagy_product.get('balance'),
-                        'height': bagy_product.get('height'),
-                        'width': bagy_product.get('width'),
-                        'depth': bagy_product.get('depth'),
-                        'weight': bagy_product.get('weight')
-                    }
-                    
-                    # Verificar se SKU precisa ser atualizado
-                    current_sku = existing_product.get('sku')
-                    new_sku = bagy_product.get('sku')
-                    
-                    if current_sku != new_sku and new_sku:
-                        update_data['sku'] = str(new_sku)
-                        update_data['reference'] = str(new_sku)
-                        update_data['code'] = str(new_sku)
-                    
-                    # Atualizar produto
-                    updated_product = self.bagy_client.update_product(bagy_id, update_data)
-                    
-                    if updated_product:
-                        stats['success'] += 1
-                        self.logger.info(f"✅ Produto atualizado com sucesso: {product_name} (ID: {bagy_id})")
-                    else:
-                        stats['errors'] += 1
-                        self.logger.error(f"❌ Falha ao atualizar produto: {product_name} (ID: {bagy_id})")
+                    stats['errors'] += 1
             
             except Exception as e:
                 stats['errors'] += 1
@@ -138,64 +204,83 @@ class VariacaoBidirectionalSynchronizer:
         
         return stats
     
+    def _convert_gestaoclick_product(self, gc_product):
+        """
+        Etapa de conversão: converte um produto do GestãoClick em produtos Bagy.
+        
+        Args:
+            gc_product (dict): Produto do GestãoClick
+            
+        Returns:
+            list: Produtos Bagy (um para cada variação); vazia se o produto estiver incompleto
+        """
+        if gc_product.get('variacoes'):
+            self.logger.info(f"🔀 Produto {gc_product.get('nome', 'Desconhecido')} (ID: {gc_product.get('id')}) tem variações")
+            self.logger.info(f"   Número de variações: {len(gc_product['variacoes'])}")
+        
+        return self.product_converter.gestaoclick_to_bagy(gc_product) or []
+    
     def sync_products_from_gestaoclick(self):
         """
         Sincroniza produtos do GestãoClick para a Bagy, tratando variações como produtos independentes.
         
+        Busca, conversão, diff e escrita rodam como etapas de um pipeline com filas
+        limitadas, de modo que as chamadas à GestãoClick e à Bagy se sobrepõem.
+        
+        O progresso é salvo em checkpoints (ver checkpoint.RunCheckpoint): uma execução
+        interrompida é retomada após a última página concluída.
+        
         Returns:
             tuple: (sucesso, erros)
         """
-        total_success = 0
-        total_errors = 0
-        incomplete_count = 0
-        
         self.logger.info("🔄 Iniciando sincronização de produtos do GestãoClick para Bagy")
-        
-        # Obter todos os produtos da GestãoClick
         self.logger.info("📋 Buscando catálogo de produtos do GestãoClick...")
         
-        try:
-            # Usar paginação para obter todos os produtos
-            pagination = Pagination()
-            all_gestaoclick_products = pagination.get_all_pages(
-                fetcher=self.gc_client.get_products,
-                data_key='data'
-            )
-            
-            self.logger.info(f"📦 Encontrados {len(all_gestaoclick_products)} produtos no GestãoClick")
-        except Exception as e:
-            self.logger.error(f"❌ Erro ao obter produtos do GestãoClick: {str(e)}")
-            return 0, 1
+        # Carregar cores e categorias uma única vez, em vez de consultá-las a cada produto
+        self.bagy_client.warm_lookup_caches()
         
-        # Processar cada produto
-        for gc_product in all_gestaoclick_products:
-            try:
-                product_id = gc_product.get('id')
-                product_name = gc_product.get('nome', 'Desconhecido')
-                
-                # Verificar se o produto tem variações
-                has_variations = 'variacoes' in gc_product and gc_product['variacoes']
-                
-                if has_variations:
-                    self.logger.info(f"🔀 Produto {product_name} (ID: {product_id}) tem variações")
-                    self.logger.info(f"   Número de variações: {len(gc_product['variacoes'])}")
-                
-                # Processar o produto (e suas variações, se houver)
-                stats = self._process_product_variation(gc_product)
-                
-                # Atualizar contadores
-                total_success += stats['success']
-                total_errors += stats['errors']
-                
-                # Se não tivemos sucesso com nenhuma variação, incrementar contador de incompletos
-                if stats['success'] == 0 and stats['errors'] > 0:
-                    incomplete_count += 1
-            
-            except Exception as e:
-                total_errors += 1
-                self.logger.error(f"❌ Erro ao processar produto {gc_product.get('nome', 'Desconhecido')} (ID: {gc_product.get('id', 'Desconhecido')}): {str(e)}")
+        checkpoint = RunCheckpoint(
+            'variations_to_bagy', checkpoints=self.sync_checkpoints,
+            flush=(self.entity_mapping, self.sync_history, self.bagy_client.product_index)
+        )
+        resumed = checkpoint.begin(window=self.product_feed.window_state)
+        self._checkpoint = checkpoint
+        # Apenas produtos alterados desde a última execução, ou o catálogo completo
+        # quando a reconciliação periódica estiver vencida
+        gc_products = self.product_feed.iter_products(
+            resume=resumed and resumed.get('window'), start_page=checkpoint.start_page
+        )
+        
+        pipeline = SyncPipeline("produtos")
+        pipeline.add_stage("convert", checkpoint.tracked(self._convert_gestaoclick_product, 'convert', fan_out=True),
+                           workers=config.PIPELINE_CONVERT_WORKERS, fan_out=True)
+        pipeline.add_stage("diff", checkpoint.tracked(self._find_existing_product, 'diff'),
+                           workers=config.PIPELINE_DIFF_WORKERS)
+        pipeline.add_stage("write", checkpoint.tracked(self._write_bagy_product, 'write',
+                                                       lambda diff_result: diff_result[0], writes=True),
+                           workers=config.PIPELINE_WRITE_WORKERS)
+        
+        # Produtos que falharam antes da interrupção, em páginas já concluídas, entram de novo no fim
+        stats = pipeline.run(itertools.chain(
+            checkpoint.track(gc_products, lambda: self.product_feed.page),
+            checkpoint.requeued(self.gc_client.get_product_by_id)
+        ))
         
-        self.logger.info(f"✨ Sincronização de produtos concluída: {total_success} com sucesso, {total_errors} erros, {incomplete_count} incompletos")
+        # Produtos incompletos voltam a ser buscados quando forem editados no GestãoClick,
+        # então só falhas de busca/diff/escrita (inclusive as da parte interrompida de uma
+        # execução retomada) seguram a marca de sincronização
+        self.product_feed.commit(success=not stats['fetch']['errors'] and not checkpoint.has_failures())
+        checkpoint.finish(interrupted=stats['fetch']['errors'] > 0)
+        self._checkpoint = None
+        
+        total_success = stats['write']['emitted']
+        total_errors = stats['write']['dropped'] + sum(stage['errors'] for stage in stats.values())
+        incomplete_count = stats['convert']['dropped']
+        # Descartados no diff: payload idêntico ao último enviado, sem busca nem escrita
+        skipped_count = stats['diff']['dropped']
+        
+        self.logger.info(f"📦 Processados {stats['fetch']['emitted']} produtos do GestãoClick")
+        self.logger.info(f"✨ Sincronização de produtos concluída: {total_success} escritos, {skipped_count} inalterados, {total_errors} erros, {incomplete_count} incompletos")
         return total_success, total_errors
     
     def sync_customers(self):